@@ -0,0 +1,474 @@
+"""
+    File: Benchmark_Scan.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Benchmark Scan
+
+    Benchmarks for the scan pipeline, run from the command line.
+
+        Benchmarks
+
+        - row-writer: Appends rows with `SheetRowWriter` and reports the cost per row for each chunk of rows, which
+          should stay flat as the sheet grows. `--legacy-rows` also times the old `sheet.dimensions` based append for
+          comparison, keep it small as its cost per row grows with the sheet.
+        - corpus: Generates a folder of synthetic filled 1348-1A PDFs from the blank training form, with made up values
+          typed into every box of the form template. The same seed always gives the same values, so a corpus can be
+          rebuilt on another machine to compare results.
+        - scan: Scans a corpus folder end to end (extract, write part files, compact) without moving the files, and
+          reports pages and files per second, the per-stage timings and the peak memory. `--save-baseline` stores the
+          result as JSON, `--baseline` compares the run to a stored result and exits with 1 if it regressed.
+        - startup: Times importing the app (`main.py`) with `python -X importtime` in a fresh interpreter, which is
+          the wait before its window shows, and exits with 1 if it is over the budget or pulls in a heavy library
+          that is only needed once a button is clicked. tests/test_startup_budget.py runs the same check under pytest.
+
+        Usage
+
+        - python Benchmark_Scan.py row-writer [--rows 100000] [--chunk 10000] [--legacy-rows 0]
+        - python Benchmark_Scan.py corpus ./Benchmark/corpus_1k [--pages 1000] [--pages-per-file 1] [--seed 1348]
+        - python Benchmark_Scan.py scan ./Benchmark/corpus_1k [--workers 0] [--mode words]
+              [--save-baseline ./Benchmark/baseline.json | --baseline ./Benchmark/baseline.json]
+        - python Benchmark_Scan.py startup [--module main] [--budget-ms 100] [--runs 5]
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/page.html#Page.insert_textbox
+        - https://docs.python.org/3/library/resource.html
+        - https://docs.python.org/3/using/cmdline.html#cmdoption-X
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+import openpyxl
+import pymupdf as pmu
+
+from openpyxl.styles import Font, colors
+from Form_Template import load_template
+from Folder_Walker import walk_folder
+from Scan_Metrics import ScanMetrics
+from Spreadsheet_Writer import CsvPartWriter, SheetRowWriter, build_row, compact_parts
+from Scan_Folder_Extract_Data import EXTRACTION_MODES, process_files
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, peak memory is left out of the results there
+    resource = None
+
+
+# The blank, fillable 1348-1A the synthetic corpus is typed onto
+CORPUS_BASE_PDF = "./Documents/DD-13481a - Example to Train.pdf"
+
+# Made up values for the 1348-1A fields, in the format the real forms use; other fields get a generic value
+SYNTHETIC_VALUES = {
+    "Document Number": lambda rng: f"W{rng.randint(10000, 99999)}{rng.randint(10000000, 99999999)}",
+    "Nomenclature": lambda rng: rng.choice(["TRUCK, CARGO", "GENERATOR SET", "RADIO SET", "TENT, GENERAL PURPOSE"]),
+    "NSN": lambda rng: f"{rng.randint(1000, 9999)}-01-{rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+    "Unit of Issue": lambda rng: rng.choice(["EA", "BX", "PR", "SE"]),
+    "Quantity": lambda rng: f"{rng.randint(1, 99999):05d}",
+    "Unit Price": lambda rng: f"{rng.randint(1, 99999)} {rng.randint(0, 99):02d}",
+    "Total Price": lambda rng: f"{rng.randint(1, 999999)} {rng.randint(0, 99):02d}",
+    "DA Code": lambda rng: rng.choice("ABCNX"),
+    "DeMIL Code": lambda rng: rng.choice("ABCDEFQ"),
+    "SC Code": lambda rng: rng.choice("ABCDEFGH"),
+    "Shipper": lambda rng: f"W{rng.randint(10, 99)}{rng.choice('ABCDEFGH')}{rng.choice('ABCDEFGH')}U",
+    "Receiver": lambda rng: f"SG{rng.randint(1000, 9999)}",
+    "POC Name": lambda rng: f"POC: {rng.choice(['John', 'Jane', 'Alex', 'Sam'])} {rng.choice(['Doe', 'Roe', 'Poe'])}",
+    "POC Phone": lambda rng: f"Phone {rng.randint(200, 999)}-{rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+    "POC Email": lambda rng: f"Email {rng.choice(['john.doe', 'jane.roe', 'alex.poe'])}@mail.mil",
+}
+
+# Result keys compared against a baseline, and whether a bigger value is better
+BASELINE_METRICS = {"pages_per_s": True, "files_per_s": True, "peak_rss_mb": False}
+
+# Stages faster than this (mean milliseconds in the baseline) are shown but never flagged,
+#  their timings are mostly noise
+STAGE_NOISE_FLOOR_MS = 1.0
+
+# The most the app's module may take to import before its window shows, in milliseconds
+STARTUP_BUDGET_MS = 100.0
+
+# Libraries the app must only import when a button needs them, each takes longer to import than the whole window
+STARTUP_DEFERRED_MODULES = ("matplotlib", "PIL", "openpyxl", "pymupdf", "fitz", "numpy")
+
+
+def _sample_fields(template, row_number) -> tuple:
+    # A processed row of made up field text the size of a real 1348-1A row, with an empty validation message
+    return tuple(f"{name} {row_number:06d}" for name in template.field_names) + ("",)
+
+
+def benchmark_row_writer(template, rows, chunk) -> list:
+    """
+    Times appending rows with `SheetRowWriter`.
+
+    Args:
+        template(FormTemplate): The compiled form template the rows are built with.
+        rows(int): The number of rows to append.
+        chunk(int): The number of rows timed together.
+
+    Returns:
+        list: The average microseconds per row of each chunk.
+
+    Raises:
+        None.
+    """
+
+    workbook = openpyxl.Workbook()
+    writer = SheetRowWriter(workbook)
+
+    per_row = []
+    for start in range(0, rows, chunk):
+        count = min(chunk, rows - start)
+        started = time.perf_counter()
+        for row_number in range(start, start + count):
+            writer.write_row(_sample_fields(template, row_number), "benchmark.pdf", template)
+        per_row.append((time.perf_counter() - started) / count * 1e6)
+    return per_row
+
+
+def benchmark_legacy_append(template, rows, chunk) -> list:
+    """
+    Times the old append, which read `sheet.dimensions` for the header check and the row number of every row.
+
+    Args:
+        template(FormTemplate): The compiled form template the rows are built with.
+        rows(int): The number of rows to append.
+        chunk(int): The number of rows timed together.
+
+    Returns:
+        list: The average microseconds per row of each chunk.
+
+    Raises:
+        None.
+    """
+
+    sheet = openpyxl.Workbook().active
+
+    per_row = []
+    for start in range(0, rows, chunk):
+        count = min(chunk, rows - start)
+        started = time.perf_counter()
+        for row_number in range(start, start + count):
+            hyper_link_font = Font(color=colors.BLUE, underline='single')
+            if sheet.dimensions == "A1:A1":
+                sheet.append(["filename"] + template.column_names)
+            sheet.append(build_row(_sample_fields(template, row_number), "benchmark.pdf", template))
+            sheet.cell(row=int(sheet.dimensions[4:]), column=1).font = hyper_link_font
+        per_row.append((time.perf_counter() - started) / count * 1e6)
+    return per_row
+
+
+def _print_chunks(label, per_row, chunk) -> None:
+    # One line per chunk with its cost per row, then the growth from the first chunk to the last
+    for index, micro_seconds in enumerate(per_row):
+        print(f"{label} rows {index * chunk + 1:>7}-{(index + 1) * chunk:<7} {micro_seconds:9.1f} us/row")
+    print(f"{label} last/first chunk cost: {per_row[-1] / per_row[0]:.2f}x")
+
+
+def _synthetic_value(field_name, rng) -> str:
+    # A made up value for a field, generic for fields the 1348-1A does not have
+    generator = SYNTHETIC_VALUES.get(field_name)
+    return generator(rng) if generator else f"{field_name.upper()} {rng.randint(0, 99999)}"
+
+
+def generate_corpus(corpus_folder, template, pages, pages_per_file=1, seed=1348, base_pdf=CORPUS_BASE_PDF) -> list:
+    """
+    Generates synthetic filled forms by copying the first page of a blank form and typing a made up value into each
+    box of the form template.
+
+    Args:
+        corpus_folder(str): The folder to save the PDF files to, created if needed.
+        template(FormTemplate): The compiled form template whose boxes are filled.
+        pages(int): The total number of pages (forms) to generate.
+        pages_per_file(int): The number of pages in each file, the last file gets what is left over.
+        seed(int): The seed for the made up values.
+        base_pdf(str): The path to the blank form.
+
+    Returns:
+        list: The paths of the generated files.
+
+    Raises:
+        OSError: If a file cannot be saved.
+    """
+
+    os.makedirs(corpus_folder, exist_ok=True)
+    rng = random.Random(seed)
+    base = pmu.open(base_pdf)
+    paths = []
+
+    try:
+        for file_number, start in enumerate(range(0, pages, pages_per_file)):
+            doc = pmu.open()
+            for _ in range(min(pages_per_file, pages - start)):
+                doc.insert_pdf(base, from_page=0, to_page=0, widgets=False)
+                page = doc[-1]
+                for field in template.fields:
+                    # a small font so the value fits inside the box and is not cut off
+                    font_size = max(4.0, min(8.0, field.rect.height * 0.6))
+                    page.insert_textbox(field.rect, _synthetic_value(field.name, rng), fontsize=font_size)
+
+            path = os.path.join(corpus_folder, f"synthetic_1348_{file_number:06d}.pdf")
+            doc.save(path, garbage=3, deflate=True)
+            doc.close()
+            paths.append(path)
+    finally:
+        base.close()
+
+    print(f"Generated {pages} pages in {len(paths)} files in '{corpus_folder}'")
+    return paths
+
+
+def _peak_rss_mb():
+    # Peak resident memory of this process and its finished worker processes, in MB; None if it cannot be read
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    unit = 1 if sys.platform == "darwin" else 1024
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit
+    children_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit
+    return round(max(self_rss, children_rss) / (1024 * 1024), 1)
+
+
+def benchmark_scan(corpus_folder, template, workers=1, mode="words") -> dict:
+    """
+    Scans a corpus folder end to end into a temporary folder, leaving the corpus in place for the next run.
+
+    Args:
+        corpus_folder(str): The folder of PDF files to scan.
+        template(FormTemplate): The compiled form template.
+        workers(int): The number of processes to extract with.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+
+    Returns:
+        dict: The run report of `ScanMetrics` with the workers, mode and peak memory added.
+
+    Raises:
+        OSError: If the corpus folder cannot be read.
+    """
+
+    output_folder = tempfile.mkdtemp(prefix="benchmark_scan_")
+    parts_folder = os.path.join(output_folder, "parts")
+    metrics = ScanMetrics()
+
+    try:
+        writer = CsvPartWriter(parts_folder)
+        try:
+            file_paths = (item.path for item in walk_folder(corpus_folder))
+            process_files(file_paths, output_folder, template, writer, workers, mode, metrics=metrics)
+        finally:
+            with metrics.stage("save"):
+                writer.close()
+        with metrics.stage("compact"):
+            compact_parts(parts_folder, os.path.join(output_folder, "scanned_data.xlsx"))
+        report = metrics.report()
+        print(metrics.summary_line(report))
+    finally:
+        shutil.rmtree(output_folder, ignore_errors=True)
+
+    report["workers"] = workers
+    report["mode"] = mode
+    report["peak_rss_mb"] = _peak_rss_mb()
+    return report
+
+
+def _import_times(module) -> list:
+    # Imports a module in a fresh interpreter with -X importtime, in this folder so its own modules are found, and
+    #  returns (name, depth, self microseconds, cumulative microseconds) for each import in the order they finished
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing '{module}' failed:\n{completed.stderr.strip()}")
+
+    imports = []
+    for line in completed.stderr.splitlines():
+        # 'import time:       self [us] |  cumulative | imported package', nested imports are indented by 2
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split('|')
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def benchmark_startup(module="main", runs=5) -> dict:
+    """
+    Times importing a module in a fresh interpreter, the start up cost of a script before it does anything.
+
+    Args:
+        module(str): The module to import, e.g. 'main' for the app whose window should show straight away.
+        runs(int): The number of fresh interpreters to time, the median is reported.
+
+    Returns:
+        dict: The median import time in milliseconds, the slowest imports of the last run and the deferred
+            libraries that were imported.
+
+    Raises:
+        RuntimeError: If the module cannot be imported.
+    """
+
+    times = []
+    for _ in range(runs):
+        imports = _import_times(module)
+        end = next(index for index, (name, depth, _, _) in enumerate(imports) if name == module and depth == 0)
+        times.append(imports[end][3])
+
+    # the module's own imports are listed just before it, after the interpreter's start up imports
+    start = end
+    while start > 0 and imports[start - 1][1] > 0:
+        start -= 1
+    own = imports[start:end]
+    imported = {name.split('.')[0] for name, _, _, _ in own}
+    slowest = sorted((item for item in own if item[1] == 1), key=lambda item: item[3], reverse=True)[:10]
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(times) / 1000, 1),
+        "slowest": [(name, round(cumulative / 1000, 1)) for name, _, _, cumulative in slowest],
+        "deferred_imported": [name for name in STARTUP_DEFERRED_MODULES if name in imported],
+    }
+
+
+def compare_to_baseline(result, baseline, tolerance) -> bool:
+    """
+    Prints the change from a baseline result for the throughput, peak memory and the mean time of each stage.
+
+    Args:
+        result(dict): The result of `benchmark_scan`.
+        baseline(dict): A stored result of `benchmark_scan`.
+        tolerance(float): The fraction a value may get worse by before it counts as a regression, e.g. 0.1.
+
+    Returns:
+        bool: True if any value regressed by more than the tolerance.
+
+    Raises:
+        None.
+    """
+
+    # (name, baseline value, current value, bigger is better, can regress)
+    checks = [(name, baseline.get(name), result.get(name), bigger_is_better, True)
+              for name, bigger_is_better in BASELINE_METRICS.items()]
+    for stage, stats in result["stages"].items():
+        baseline_stats = baseline.get("stages", {}).get(stage)
+        if baseline_stats:
+            checks.append((f"{stage} mean_ms", baseline_stats["mean_ms"], stats["mean_ms"], False,
+                           baseline_stats["mean_ms"] >= STAGE_NOISE_FLOOR_MS))
+
+    if (baseline.get("pages"), baseline.get("workers"), baseline.get("mode")) != \
+            (result["pages"], result["workers"], result["mode"]):
+        print("Warning: the baseline was run with a different number of pages, workers or mode")
+
+    regressed = False
+    print(f"{'metric':<22}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, old, new, bigger_is_better, can_regress in checks:
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if bigger_is_better else change
+        flag = "  REGRESSION" if can_regress and worse > tolerance else ""
+        regressed = regressed or bool(flag)
+        print(f"{name:<22}{old:>12.3f}{new:>12.3f}{change:>+10.1%}{flag}")
+    return regressed
+
+
+def main() -> int:
+    """
+    Runs the benchmark named on the command line.
+
+    Args:
+        N/A
+
+    Returns:
+        int: The exit code, 1 if the scan benchmark regressed from its baseline or the start up is over its budget,
+            otherwise 0.
+
+    Raises:
+        None
+    """
+
+    parser = argparse.ArgumentParser(description="Benchmarks for the scan pipeline.")
+    parser.add_argument("--template", default="./Form Templates/1348.json", help="form template to benchmark with")
+    benchmarks = parser.add_subparsers(dest="benchmark", required=True)
+
+    row_writer = benchmarks.add_parser("row-writer", help="cost per appended row as the sheet grows")
+    row_writer.add_argument("--rows", type=int, default=100000)
+    row_writer.add_argument("--chunk", type=int, default=10000)
+    row_writer.add_argument("--legacy-rows", type=int, default=0,
+                            help="also time the old sheet.dimensions append for this many rows")
+
+    corpus = benchmarks.add_parser("corpus", help="generate synthetic filled 1348-1A PDFs")
+    corpus.add_argument("folder", help="folder to save the PDF files to")
+    corpus.add_argument("--pages", type=int, default=1000, help="total number of pages, 1 to 100000 (default: 1000)")
+    corpus.add_argument("--pages-per-file", type=int, default=1,
+                        help="pages in each file, more than 1 for multi-page files (default: 1)")
+    corpus.add_argument("--seed", type=int, default=1348)
+    corpus.add_argument("--base", default=CORPUS_BASE_PDF, help="blank form to fill in")
+
+    scan = benchmarks.add_parser("scan", help="end to end and per-stage throughput and peak memory of a corpus scan")
+    scan.add_argument("folder", help="corpus folder to scan")
+    scan.add_argument("--workers", type=int, default=1,
+                      help="number of processes to extract with, 0 to use every CPU core (default: 1)")
+    scan.add_argument("--mode", choices=EXTRACTION_MODES, default="words")
+    scan.add_argument("--save-baseline", metavar="JSON", help="save the result as the baseline to compare to")
+    scan.add_argument("--baseline", metavar="JSON", help="compare the result to a saved baseline")
+    scan.add_argument("--tolerance", type=float, default=0.1,
+                      help="fraction a value may get worse by before it is a regression (default: 0.1)")
+
+    startup = benchmarks.add_parser("startup", help="import time of the app before its window shows")
+    startup.add_argument("--module", default="main", help="module to import (default: main)")
+    startup.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                         help=f"most the import may take, in milliseconds (default: {STARTUP_BUDGET_MS:g})")
+    startup.add_argument("--runs", type=int, default=5, help="fresh interpreters to time (default: 5)")
+
+    args = parser.parse_args()
+    template = load_template(args.template)
+
+    if args.benchmark == "row-writer":
+        _print_chunks("SheetRowWriter", benchmark_row_writer(template, args.rows, args.chunk), args.chunk)
+        if args.legacy_rows:
+            legacy_chunk = max(1, args.legacy_rows // 5)
+            _print_chunks("legacy append", benchmark_legacy_append(template, args.legacy_rows, legacy_chunk),
+                          legacy_chunk)
+
+    elif args.benchmark == "corpus":
+        generate_corpus(args.folder, template, args.pages, args.pages_per_file, args.seed, args.base)
+
+    elif args.benchmark == "scan":
+        result = benchmark_scan(args.folder, template, args.workers or os.cpu_count(), args.mode)
+        print(f"Peak memory: {result['peak_rss_mb']} MB")
+
+        if args.save_baseline:
+            with open(args.save_baseline, 'w') as file:
+                json.dump(result, file, indent=4)
+            print(f"Baseline saved to '{args.save_baseline}'")
+        if args.baseline:
+            with open(args.baseline, 'r') as file:
+                baseline = json.load(file)
+            if compare_to_baseline(result, baseline, args.tolerance):
+                return 1
+
+    elif args.benchmark == "startup":
+        result = benchmark_startup(args.module, args.runs)
+        for name, cumulative_ms in result["slowest"]:
+            print(f"{name:<32}{cumulative_ms:>10.1f} ms")
+        print(f"Importing '{result['module']}' took {result['import_ms']} ms (budget {args.budget_ms:g} ms)")
+        if result["deferred_imported"]:
+            print(f"REGRESSION: '{result['module']}' imports {', '.join(result['deferred_imported'])} at start up")
+            return 1
+        if result["import_ms"] > args.budget_ms:
+            print("REGRESSION: over the start up budget")
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+    File: Folder_Walker.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Folder Walker
+
+    Walks a folder tree with `os.scandir` and yields the files to scan one at a time, so the scanner can start
+    extracting the first file before the rest of the tree has been listed. Folders are read one at a time and the
+    entries are filtered with the information `os.scandir` already has, only calling stat when a size or date filter
+    needs it.
+
+        Features
+
+        - Streaming: Files are yielded as each folder is read, large trees never have to be listed up front.
+        - Include/Exclude Globs: Match file names or paths relative to the scanned folder (e.g. '*.pdf', 'archive/*').
+        - Max Depth: 0 scans only the top folder, None scans every subfolder.
+        - Size and Date Filters: Minimum/maximum file size and modified after/before times.
+        - Ordering: By name, by modification time, or in the order the file system returns them.
+
+        Refs
+
+        - https://docs.python.org/3/library/os.html#os.scandir
+        - https://docs.python.org/3/library/fnmatch.html
+"""
+
+import os
+import fnmatch
+
+
+# Orders files can be yielded in, within each folder
+WALK_ORDERS = ("name", "mtime", "none")
+
+
+class WorkItem:
+    """
+    A file found by the folder walker.
+
+    Attributes:
+        path(str): The full path to the file.
+        name(str): The file name.
+        relative_path(str): The path relative to the scanned folder, with forward slashes.
+        depth(int): The number of folders below the scanned folder, 0 for the scanned folder itself.
+    """
+
+    def __init__(self, entry, relative_path, depth):
+        self._entry = entry
+        self.path = entry.path
+        self.name = entry.name
+        self.relative_path = relative_path
+        self.depth = depth
+
+    def __repr__(self):
+        return f"WorkItem({self.relative_path!r})"
+
+    def stat(self) -> os.stat_result:
+        """
+        The stat of the file, cached by `os.DirEntry` after the first call.
+        """
+
+        return self._entry.stat()
+
+    @property
+    def size(self) -> int:
+        """
+        The size of the file in bytes, cached by `os.DirEntry`.
+        """
+
+        return self.stat().st_size
+
+    @property
+    def mtime(self) -> float:
+        """
+        The modification time of the file, cached by `os.DirEntry`.
+        """
+
+        return self.stat().st_mtime
+
+
+def _matches(patterns, name, relative_path) -> bool:
+    # Case-insensitive glob match against either the name or the relative path
+    name = name.lower()
+    relative_path = relative_path.lower()
+    return any(fnmatch.fnmatchcase(name, pattern) or fnmatch.fnmatchcase(relative_path, pattern)
+               for pattern in patterns)
+
+
+def _mtime_key(entry) -> float:
+    # Sort key for the "mtime" order, a file that went away before it could be stat'ed sorts last
+    try:
+        return entry.stat().st_mtime
+    except OSError:
+        return float("inf")
+
+
+def _passes_filters(stat, min_size, max_size, modified_after, modified_before) -> bool:
+    # Whether a file's size and modification time are within the walk's limits
+    if min_size is not None and stat.st_size < min_size:
+        return False
+    if max_size is not None and stat.st_size > max_size:
+        return False
+    if modified_after is not None and stat.st_mtime <= modified_after:
+        return False
+    if modified_before is not None and stat.st_mtime >= modified_before:
+        return False
+    return True
+
+
+def walk_folder(folder, include=("*.pdf",), exclude=(), max_depth=0, min_size=None, max_size=None,
+                modified_after=None, modified_before=None, order="name"):
+    """
+    Yields the files in a folder tree that pass the filters, folder by folder.
+
+    Within a folder the files are yielded first, then each subfolder is walked in the same order.
+
+    Args:
+        folder(str): The path to the folder to walk.
+        include(Iterable[str]): Globs a file name or relative path must match, empty to include every file.
+        exclude(Iterable[str]): Globs for file or folder names or relative paths to skip.
+        max_depth(int): The deepest level of subfolders to walk, 0 for only the top folder, None for no limit.
+        min_size(int): The smallest file size in bytes to include, None for no minimum.
+        max_size(int): The largest file size in bytes to include, None for no maximum.
+        modified_after(float): Only include files modified after this timestamp, None for no limit.
+        modified_before(float): Only include files modified before this timestamp, None for no limit.
+        order(str): One of WALK_ORDERS.
+
+    Returns:
+        Generator[WorkItem]: The files that pass the filters.
+
+    Raises:
+        ValueError: If the order is unknown.
+        OSError: If the top folder cannot be read.
+    """
+
+    if order not in WALK_ORDERS:
+        raise ValueError(f"Unknown order '{order}', expected one of {WALK_ORDERS}")
+
+    include = [pattern.lower() for pattern in include]
+    exclude = [pattern.lower() for pattern in exclude]
+    needs_stat = min_size is not None or max_size is not None or modified_after is not None \
+        or modified_before is not None
+
+    # folders waiting to be read, as (path, relative path, depth); a stack keeps the walk depth first
+    pending = [(folder, "", 0)]
+    while pending:
+        path, relative_folder, depth = pending.pop()
+        subfolders = []
+        try:
+            with os.scandir(path) as entries:
+                entries = list(entries) if order != "none" else entries
+                if order == "name":
+                    entries.sort(key=lambda entry: entry.name.lower())
+                elif order == "mtime":
+                    entries.sort(key=_mtime_key)
+
+                for entry in entries:
+                    relative_path = relative_folder + entry.name
+                    if exclude and _matches(exclude, entry.name, relative_path):
+                        continue
+
+                    # a file moved or deleted since the folder was listed is skipped on its own
+                    try:
+                        if entry.is_dir():
+                            if max_depth is None or depth < max_depth:
+                                subfolders.append((entry.path, relative_path + "/", depth + 1))
+                            continue
+                        if not entry.is_file():
+                            continue
+                        if include and not _matches(include, entry.name, relative_path):
+                            continue
+                        if needs_stat and not _passes_filters(entry.stat(), min_size, max_size, modified_after,
+                                                              modified_before):
+                            continue
+                    except OSError:
+                        continue
+
+                    yield WorkItem(entry, relative_path, depth)
+        except OSError as e:
+            # an unreadable subfolder is reported and skipped, an unreadable top folder is an error
+            if depth == 0:
+                raise
+            print(f"Could not read folder '{relative_folder}': {e}")
+
+        # push in reverse so the first subfolder is walked next
+        pending.extend(reversed(subfolders))
@@ -0,0 +1,375 @@
+"""
+    File: Form_Classifier.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Form Classifier
+
+    Works out which form template a page belongs to, so a folder or a single PDF holding several kinds of forms can be
+    scanned in one run. Each form is fingerprinted from its size and its fixed content, the parts every copy of the form
+    has whatever is filled in: the printed labels in its text layer and, for forms scanned to an image, the embedded
+    image of the blank form. The fingerprints are kept in a precomputed index, and a page is matched against the index
+    with an inverted token lookup, so classifying a page costs a fraction of a millisecond on top of reading its words.
+
+        Features
+
+        - Page Size: Only templates made for a page of the same size (within 2%) are considered, if there are any.
+        - Anchor Tokens: Each printed word with its grid cell, e.g. the labels and titles of a form.
+        - Image Tokens: Each embedded image by its pixel size and stream length, e.g. the blank form under typed values.
+        - Variants: A template can have several fingerprints, e.g. for the fillable form and for a scan of it.
+        - Precomputed Index: Built once from blank or sample PDFs of each template and saved as JSON next to the
+          templates. Words typed over a full page image of the form are values, so they are left out.
+        - Scoring: The share of a fingerprint's tokens found on the page, so the filled in values do not count against
+          a match.
+        - Fallback: A page that matches no template well enough is left to the template chosen for the run.
+
+        Usage
+
+        - python Form_Classifier.py add "./Form Templates/1348.json" "./Documents/DD-13481a - Example to Train.pdf"
+          ./Documents/1348_FILLED_OUT1.pdf [...]
+        - python Form_Classifier.py classify ./To Scan/some.pdf [...]
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/textpage.html#TextPage.extractWORDS
+        - https://en.wikipedia.org/wiki/Inverted_index
+"""
+
+import os
+import sys
+import json
+import zlib
+import argparse
+import pymupdf as pmu
+
+
+FORM_INDEX_PATH = "./Form Templates/forms.index"
+
+# Size of the grid word positions are snapped to, in PDF points, coarse enough to absorb small print offsets
+FINGERPRINT_GRID = 12
+
+# Fraction of the sample pages of a variant a token must be on to be part of its fingerprint
+STABLE_TOKEN_SHARE = 0.5
+
+# Lowest share of a fingerprint's tokens a page must have to be routed to its template; sample pages whose tokens
+#  overlap less than this (Dice coefficient) make separate variants
+MIN_MATCH_SCORE = 0.5
+
+# Share of the page an image must cover for the words on it to be treated as values typed onto a scanned form
+FORM_IMAGE_SHARE = 0.5
+
+# Version of the index file, fingerprints of another version are built differently and must be rebuilt
+INDEX_VERSION = 2
+
+# Anchor tokens are below this, image tokens at or above it, so the two kinds never collide
+_IMAGE_BASE = 1 << 56
+
+# Loaded indexes keyed by absolute path, stored with the mtime they were loaded from
+_index_cache = {}
+
+
+def page_size_key(page) -> tuple:
+    """
+    Gets the size of a page as it is displayed, rounded to whole points.
+
+    Args:
+        page(pmu.Page): The page.
+
+    Returns:
+        tuple: (width, height) in points.
+
+    Raises:
+        None.
+    """
+
+    return round(page.rect.width), round(page.rect.height)
+
+
+def image_tokens(page) -> set:
+    """
+    Fingerprints the images a page draws, from their pixel size and stream length; the image data is not decoded.
+
+    Args:
+        page(pmu.Page): The page.
+
+    Returns:
+        set: The image tokens of the page.
+
+    Raises:
+        None.
+    """
+
+    tokens = set()
+    for image in page.get_images():
+        length = page.parent.xref_get_key(image[0], "Length")[1]
+        tokens.add(_IMAGE_BASE + zlib.crc32(f"{image[2]}x{image[3]} {length}".encode()))
+    return tokens
+
+
+def page_tokens(words, images=()) -> set:
+    """
+    Fingerprints a page from its words and images.
+
+    Args:
+        words(list): The page's words from `Page.get_text("words")`.
+        images(Iterable[int]): The page's image tokens from `image_tokens`.
+
+    Returns:
+        set: The anchor and image tokens of the page.
+
+    Raises:
+        None.
+    """
+
+    tokens = set(images)
+    for word in words:
+        cell = int(word[0] // FINGERPRINT_GRID) << 10 | int(word[3] // FINGERPRINT_GRID)
+        tokens.add((zlib.crc32(word[4].lower().encode()) << 20) | cell)
+    return tokens
+
+
+def _form_words(page, words) -> list:
+    # The words printed on the form itself; words over an image covering most of the page were typed onto a scan
+    page_area = abs(page.rect) or 1.0
+    covers = [rect for rect in (page.get_image_bbox(image) for image in page.get_images(full=True))
+              if rect.is_valid and abs(rect & page.rect) >= FORM_IMAGE_SHARE * page_area]
+    return [word for word in words if not any(rect.contains(pmu.Rect(word[:4])) for rect in covers)]
+
+
+def _dice(first, second) -> float:
+    # Similarity of two token sets
+    return 2 * len(first & second) / (len(first) + len(second)) if first or second else 0.0
+
+
+class FormIndex:
+    """
+    The fingerprints of the known form templates, with an inverted index from token to template.
+
+    Attributes:
+        path(str): The path to the index file.
+        entries(list): A dict per fingerprint with its 'template' file name, 'page_size' and 'tokens'; a template
+            has one per variant of its form.
+    """
+
+    def __init__(self, path=FORM_INDEX_PATH, entries=None):
+        self.path = os.path.abspath(path)
+        self.entries = entries or []
+        self._build()
+
+    def _build(self) -> None:
+        # token -> ids of the templates with it, and the number of tokens of each template
+        self._postings = {}
+        self._sizes = []
+        for entry_id, entry in enumerate(self.entries):
+            for token in entry["tokens"]:
+                self._postings.setdefault(token, []).append(entry_id)
+            self._sizes.append(len(entry["tokens"]))
+
+    @classmethod
+    def load(cls, path=FORM_INDEX_PATH):
+        """
+        Loads an index, reusing the loaded copy if the file has not changed since.
+
+        Args:
+            path(str): The path to the index file, which does not have to exist yet.
+
+        Returns:
+            FormIndex: The index.
+
+        Raises:
+            ValueError: If the file is not a valid index or was built by another version.
+        """
+
+        path = os.path.abspath(path)
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        cached = _index_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        entries = []
+        if mtime is not None:
+            with open(path, 'r') as file:
+                data = json.load(file)
+            if data.get("version") != INDEX_VERSION or data.get("grid") != FINGERPRINT_GRID:
+                raise ValueError(f"The form index '{path}' was built by another version, rebuild it with "
+                                 f"'python Form_Classifier.py add TEMPLATE SAMPLE.pdf'")
+            entries = data["templates"]
+        index = cls(path, entries)
+        _index_cache[path] = (mtime, index)
+        return index
+
+    def save(self) -> None:
+        """
+        Saves the index.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the index cannot be written.
+        """
+
+        with open(self.path, 'w') as file:
+            json.dump({"version": INDEX_VERSION, "grid": FINGERPRINT_GRID, "templates": self.entries}, file)
+
+    def template_path(self, entry) -> str:
+        # Template file names are stored relative to the index so the folder can be moved
+        return os.path.join(os.path.dirname(self.path), entry["template"])
+
+    def add_template(self, template_path, sample_paths) -> list:
+        """
+        Fingerprints a template from PDFs of its form and adds it to the index, replacing its old fingerprints.
+
+        The fingerprint is the form's fixed content, so the samples are best a blank or fillable copy of the form;
+        filled in copies work too, as values that differ between them are dropped. Samples that look different,
+        e.g. the fillable form and a scan of it, each make a variant of the template's fingerprint.
+
+        Args:
+            template_path(str): The path to the form template JSON, in the index's folder.
+            sample_paths(list): The paths to PDFs of the template's form, every page is used.
+
+        Returns:
+            list: The template's index entries, one per variant.
+
+        Raises:
+            ValueError: If the samples have no pages with text or images.
+        """
+
+        # each variant is [tokens of its first page, token counts, page size counts, pages]
+        variants = []
+        for sample_path in sample_paths:
+            with pmu.open(sample_path) as doc:
+                for page in doc:
+                    tokens = page_tokens(_form_words(page, page.get_text("words")), image_tokens(page))
+                    if not tokens:
+                        continue
+                    variant = next((variant for variant in variants
+                                    if _dice(variant[0], tokens) >= MIN_MATCH_SCORE), None)
+                    if variant is None:
+                        variant = [tokens, {}, {}, 0]
+                        variants.append(variant)
+                    variant[3] += 1
+                    size = page_size_key(page)
+                    variant[2][size] = variant[2].get(size, 0) + 1
+                    for token in tokens:
+                        variant[1][token] = variant[1].get(token, 0) + 1
+        if not variants:
+            raise ValueError(f"No sample pages with text or images for '{template_path}'")
+
+        # keep the tokens most pages of a variant share, the ones that come from the form rather than the values
+        template = os.path.relpath(os.path.abspath(template_path), os.path.dirname(self.path))
+        entries = []
+        for _, counts, page_sizes, pages in variants:
+            threshold = max(1, int(pages * STABLE_TOKEN_SHARE))
+            entries.append({
+                "template": template,
+                "page_size": list(max(page_sizes, key=page_sizes.get)),
+                "samples": pages,
+                "tokens": sorted(token for token, count in counts.items() if count >= threshold),
+            })
+        self.entries = [other for other in self.entries if other["template"] != template] + entries
+        self._build()
+        return entries
+
+    def classify(self, page, words=None):
+        """
+        Finds the template a page belongs to.
+
+        Args:
+            page(pmu.Page): The page.
+            words(list): The page's words if they have already been read, e.g. `WordIndex.words`.
+
+        Returns:
+            tuple: (template path, score) of the best match, or (None, score) if no template matches well enough.
+
+        Raises:
+            None.
+        """
+
+        if not self.entries:
+            return None, 0.0
+        if words is None:
+            words = page.get_text("words")
+        tokens = page_tokens(words, image_tokens(page))
+        if not tokens:
+            return None, 0.0
+
+        # templates for a page of this size, all of them if none are
+        width, height = page_size_key(page)
+        candidates = {entry_id for entry_id, entry in enumerate(self.entries)
+                      if abs(entry["page_size"][0] - width) <= 0.02 * width
+                      and abs(entry["page_size"][1] - height) <= 0.02 * height}
+
+        votes = {}
+        for token in tokens:
+            for entry_id in self._postings.get(token, ()):
+                votes[entry_id] = votes.get(entry_id, 0) + 1
+
+        # the share of the form's fixed content on the page, the more of it the better on a tie
+        best_id, best_key = None, (0.0, 0)
+        for entry_id, shared in votes.items():
+            if candidates and entry_id not in candidates:
+                continue
+            key = (shared / self._sizes[entry_id], shared)
+            if key > best_key:
+                best_id, best_key = entry_id, key
+
+        if best_id is None or best_key[0] < MIN_MATCH_SCORE:
+            return None, best_key[0]
+        return self.template_path(self.entries[best_id]), best_key[0]
+
+
+def main() -> None:
+    """
+    Adds templates to the form index or classifies the pages of PDF files, from the command line.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+
+    parser = argparse.ArgumentParser(description="Build the form index and classify pages by form template.")
+    parser.add_argument("--index", default=FORM_INDEX_PATH, help=f"form index file (default: {FORM_INDEX_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="fingerprint a template from PDFs of its form and add it to the index")
+    add.add_argument("template", help="form template JSON")
+    add.add_argument("samples", nargs="+", help="blank, fillable or filled in PDFs of the template's form")
+
+    classify = commands.add_parser("classify", help="print the template each page of PDF files matches")
+    classify.add_argument("pdfs", nargs="+")
+
+    args = parser.parse_args()
+
+    if args.command == "add":
+        try:
+            index = FormIndex.load(args.index)
+        except ValueError as e:
+            # an index from another version cannot be added to, it is started again
+            print(f"Starting a new index: {e}")
+            index = FormIndex(args.index)
+        entries = index.add_template(args.template, args.samples)
+        index.save()
+        for entry in entries:
+            print(f"Added '{entry['template']}' from {entry['samples']} pages ({len(entry['tokens'])} tokens) to "
+                  f"'{index.path}'")
+    else:
+        index = FormIndex.load(args.index)
+        for pdf_path in args.pdfs:
+            with pmu.open(pdf_path) as doc:
+                for page in doc:
+                    template_path, score = index.classify(page)
+                    name = os.path.basename(template_path) if template_path else "(no match)"
+                    print(f"{os.path.basename(pdf_path)} page {page.number + 1}: {name} {score:.2f}")
+
+
+if __name__ == '__main__':
+
+    main()
+    sys.exit(0)
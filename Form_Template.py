@@ -0,0 +1,358 @@
+"""
+    File: Form_Template.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Form Template
+
+    Compiles the JSON form templates saved by the PDF viewers into a reusable object so the scanner only has to read and
+    parse a template once per run instead of once per page.
+
+        Features
+
+        - Compiled Boxes: Builds the `pymupdf.Rect` for every field once, in the order they appear in the template.
+        - Post-Processing: Resolves the per-field clean up (e.g. 'Phone ' prefix removal) when the template is loaded.
+        - Validation: Checks cleaned values against per-field formats (e.g. NSN) and row rules (e.g. quantity times
+          unit price equals total price), both chosen by field name or set in the template JSON.
+        - Block Processing: Cleans and validates all the rows of a file a column at a time, adding a validation
+          message column instead of indexing fields by position.
+        - Page Geometry: Keeps the page size the boxes were drawn on and anchor strings printed on the form, so the
+          boxes can be moved onto pages that are shifted or scaled (see Page_Alignment.py).
+        - Form Fields: Keeps which AcroForm fields of a fillable form each field is read from, if the template maps
+          them (see Form_Widgets.py).
+        - Content Hash: Hashes the template file so results can be tied to the exact template version used.
+        - Caching: Caches compiled templates by path and modification time so repeated runs reuse them.
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/rect.html
+        - https://docs.python.org/3/library/hashlib.html
+"""
+
+import os
+import re
+import json
+import hashlib
+import pymupdf as pmu
+
+from decimal import Decimal, InvalidOperation
+from Template_Schema import TEMPLATE_SCHEMA_VERSION, schema_version
+
+
+# Named post-processing steps a template box can ask for with a "postprocess" key
+POSTPROCESSORS = {
+    "space_to_decimal": lambda text: text.replace(' ', '.'),  # '12000 00' -> '12000.00'
+    "strip_phone_label": lambda text: text.replace('Phone ', ''),  # 'Phone 123-456-7890' -> '123-456-7890'
+    "strip_email_label": lambda text: text.replace('Email ', ''),  # 'Email a@b.mil' -> 'a@b.mil'
+}
+
+# Named formats a template box can check its cleaned value against with a "validate" key; empty values are not checked
+VALIDATORS = {
+    "nsn": re.compile(r"\d{4}-\d{2}-\d{3}-\d{4}").fullmatch,  # '2320-01-494-5874'
+    "integer": re.compile(r"\d+").fullmatch,  # '00001'
+    "decimal": re.compile(r"\d[\d,]*(\.\d+)?").fullmatch,  # '12000.00'
+    "phone": re.compile(r"\(?\d{3}\)?[-. ]?\d{3}[-. ]?\d{4}").fullmatch,  # '123-456-7890'
+    "email": re.compile(r"[^@\s]+@[^@\s]+\.[A-Za-z]{2,}").fullmatch,  # 'John.Doe@mail.mil'
+}
+
+# Post-processing used when a box does not name one, keyed by field name (matches the 1348-1A template)
+DEFAULT_FIELD_POSTPROCESS = {
+    "Unit Price": "space_to_decimal",
+    "Total Price": "space_to_decimal",
+    "POC Phone": "strip_phone_label",
+    "POC Email": "strip_email_label",
+}
+
+# Validation used when a box does not name one, keyed by field name (matches the 1348-1A template)
+DEFAULT_FIELD_VALIDATE = {
+    "NSN": "nsn",
+    "Quantity": "integer",
+    "Unit Price": "decimal",
+    "Total Price": "decimal",
+    "POC Phone": "phone",
+    "POC Email": "email",
+}
+
+
+def _product_matches(quantity, unit_price, total_price) -> bool:
+    # quantity x unit price == total price, values that are not numbers are left to the field validators
+    try:
+        return Decimal(quantity.replace(',', '')) * Decimal(unit_price.replace(',', '')) == \
+            Decimal(total_price.replace(',', ''))
+    except InvalidOperation:
+        return True
+
+
+# Named rules across the fields of a row, given the field values in the order of the check's "fields"
+ROW_RULES = {
+    "product": (_product_matches, "{2} is not {0} x {1}"),
+}
+
+# Row checks used when the template JSON has no "row_checks" list; a check is skipped if the template lacks its fields
+DEFAULT_ROW_CHECKS = [
+    {"rule": "product", "fields": ["Quantity", "Unit Price", "Total Price"]},
+]
+
+# The column after the fields that holds the validation problems of each row, empty if there are none
+VALIDATION_COLUMN = "Validation"
+
+# Compiled templates keyed by absolute path, stored with the mtime they were compiled from
+_template_cache = {}
+
+
+class TemplateField:
+    """
+    A single named box of a compiled form template.
+
+    Attributes:
+        name(str): The field name, used as the spreadsheet column header.
+        rect(pmu.Rect): The box to extract text from.
+        postprocess(str): The name of the post-processing step for this field, or None.
+        validate(str): The name of the format the cleaned value is checked against, or None.
+    """
+
+    def __init__(self, name, rect, postprocess=None, validate=None):
+        self.name = name
+        self.rect = rect
+        self.postprocess = postprocess
+        self.validate = validate
+        self._postprocessor = POSTPROCESSORS[postprocess] if postprocess else None
+        self._validator = VALIDATORS[validate] if validate else None
+
+    def clean(self, text) -> str:
+        """
+        Applies the field's post-processing step to extracted text.
+
+        Args:
+            text(str): The extracted text.
+
+        Returns:
+            str: The cleaned text.
+
+        Raises:
+            None.
+        """
+
+        return self._postprocessor(text) if self._postprocessor else text
+
+
+class RowCheck:
+    """
+    A rule checked across several fields of each row, e.g. quantity x unit price == total price.
+
+    Attributes:
+        rule(str): The name of the rule in ROW_RULES.
+        field_names(list): The fields the rule is given, in order.
+        indexes(list): The column index of each of those fields.
+    """
+
+    def __init__(self, rule, field_names, indexes):
+        self.rule = rule
+        self.field_names = field_names
+        self.indexes = indexes
+        self._check, self._message = ROW_RULES[rule]
+
+    def failing(self, columns):
+        """
+        Finds the rows that break the rule, skipping rows with any of the fields empty.
+
+        Args:
+            columns(list): The cleaned values of a block of rows, one list per field.
+
+        Returns:
+            Generator[tuple]: (row index, message) for each row that breaks the rule.
+
+        Raises:
+            None.
+        """
+
+        for row_index, values in enumerate(zip(*(columns[index] for index in self.indexes))):
+            if all(values) and not self._check(*values):
+                yield row_index, self._message.format(*self.field_names)
+
+
+class FormTemplate:
+    """
+    A form template compiled from its JSON file.
+
+    Attributes:
+        path(str): The absolute path to the template file.
+        name(str): The template name, taken from the file name.
+        fields(list): The `TemplateField` objects for page 1, in template order.
+        field_names(list): The field names, in template order.
+        column_names(list): The columns of a processed row, the field names then VALIDATION_COLUMN.
+        row_checks(list): The `RowCheck` objects applied to each row.
+        content_hash(str): The SHA-256 hex digest of the template file.
+        mtime(float): The modification time of the template file when it was compiled.
+        page_size(tuple): The (width, height) of the page the boxes were drawn on, in points, or None if unknown.
+        anchors(list): (text, pmu.Rect) of each anchor string and where it is on that page.
+        widgets(dict): The qualified names of the form fields each field is read from on a fillable form, as a tuple
+            by field name. Fields that are not mapped are always read from their boxes.
+        widget_names(set): Every form field name in `widgets`.
+    """
+
+    def __init__(self, path, fields, content_hash, mtime, row_checks=(), page_size=None, anchors=(), widgets=None):
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.fields = fields
+        self.field_names = [field.name for field in fields]
+        self.column_names = self.field_names + [VALIDATION_COLUMN]
+        self.row_checks = list(row_checks)
+        self.content_hash = content_hash
+        self.mtime = mtime
+        self.page_size = page_size
+        self.anchors = list(anchors)
+        self.widgets = dict(widgets or {})
+        self.widget_names = {name for names in self.widgets.values() for name in names}
+
+    def __repr__(self):
+        return f"FormTemplate({self.name!r}, {len(self.fields)} fields, {self.content_hash[:12]})"
+
+    def postprocess(self, texts) -> list:
+        """
+        Applies each field's post-processing step to a row of extracted text.
+
+        Args:
+            texts(list): The extracted text for each field, in template order.
+
+        Returns:
+            list: The cleaned text for each field, in template order.
+
+        Raises:
+            None.
+        """
+
+        return [field.clean(text) for field, text in zip(self.fields, texts)]
+
+    def process_block(self, rows) -> list:
+        """
+        Cleans and validates a block of extracted rows, such as all the pages of a file, one column at a time.
+
+        Each field's post-processing step and validator are run down its column, then each row check across its
+        columns. The problems found in a row are joined into its validation message.
+
+        Args:
+            rows(list): The extracted text of each row, one value per field in template order.
+
+        Returns:
+            list: A tuple per row with the cleaned text of each field followed by the validation message, which is
+                empty if the row passed every check.
+
+        Raises:
+            None.
+        """
+
+        if not rows:
+            return []
+
+        columns = [list(column) for column in zip(*rows)]
+        problems = [[] for _ in rows]
+
+        for index, field in enumerate(self.fields):
+            if field._postprocessor is not None:
+                columns[index] = list(map(field._postprocessor, columns[index]))
+            if field._validator is not None:
+                validator = field._validator
+                for row_index, value in enumerate(columns[index]):
+                    if value and not validator(value):
+                        problems[row_index].append(f"{field.name} is not a valid {field.validate}")
+
+        for check in self.row_checks:
+            for row_index, message in check.failing(columns):
+                problems[row_index].append(message)
+
+        messages = ['; '.join(row_problems) for row_problems in problems]
+        return [row + (message,) for row, message in zip(zip(*columns), messages)]
+
+
+def compile_template(path, raw=None) -> FormTemplate:
+    """
+    Compiles a JSON form template without using the cache.
+
+    Args:
+        path(str): The path to the form template JSON file.
+        raw(bytes): The file contents if they have already been read, otherwise the file is read from disk.
+
+    Returns:
+        FormTemplate: The compiled template.
+
+    Raises:
+        KeyError: If the template has no boxes for page 1 or names an unknown post-processing step, validator or
+            row rule, an anchor has no text or coords, or form fields are mapped to a field it does not have.
+        ValueError: If the template was saved with a newer schema than this version reads.
+    """
+
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+    if raw is None:
+        with open(path, 'rb') as file:
+            raw = file.read()
+
+    form_fields = json.loads(raw)
+    if schema_version(form_fields) > TEMPLATE_SCHEMA_VERSION:
+        raise ValueError(f"{path} is template schema version {schema_version(form_fields)}, this version reads up to "
+                         f"{TEMPLATE_SCHEMA_VERSION}")
+
+    # Build the rects once; the scanner only uses the boxes for the first page
+    fields = []
+    for box in form_fields["page number: 1"]:
+        coords = box['coords']
+        postprocess = box.get('postprocess', DEFAULT_FIELD_POSTPROCESS.get(box['name']))
+        if postprocess and postprocess not in POSTPROCESSORS:
+            raise KeyError(f"Unknown postprocess '{postprocess}' for field '{box['name']}' in {path}")
+        validate = box.get('validate', DEFAULT_FIELD_VALIDATE.get(box['name']))
+        if validate and validate not in VALIDATORS:
+            raise KeyError(f"Unknown validate '{validate}' for field '{box['name']}' in {path}")
+        fields.append(TemplateField(box['name'], pmu.Rect(coords[0], coords[1], coords[2], coords[3]), postprocess,
+                                    validate))
+
+    # Resolve the row checks to column indexes, skipping the ones whose fields the template does not have
+    field_indexes = {field.name: index for index, field in enumerate(fields)}
+    row_checks = []
+    for check in form_fields.get("row_checks", DEFAULT_ROW_CHECKS):
+        if check['rule'] not in ROW_RULES:
+            raise KeyError(f"Unknown row check rule '{check['rule']}' in {path}")
+        if all(name in field_indexes for name in check['fields']):
+            row_checks.append(RowCheck(check['rule'], check['fields'], [field_indexes[name]
+                                                                        for name in check['fields']]))
+
+    # The page the boxes were drawn on and the strings to line other pages up with, both optional
+    page_size = tuple(form_fields["page_size"]) if "page_size" in form_fields else None
+    anchors = [(anchor['text'], pmu.Rect(anchor['coords'])) for anchor in form_fields.get("anchors", [])]
+
+    # The form fields each field is read from on a fillable form, one name or a list of them
+    widgets = {}
+    for name, widget_names in form_fields.get("widgets", {}).items():
+        if name not in field_indexes:
+            raise KeyError(f"Form fields are mapped to unknown field '{name}' in {path}")
+        widgets[name] = (widget_names,) if isinstance(widget_names, str) else tuple(widget_names)
+
+    return FormTemplate(path, fields, hashlib.sha256(raw).hexdigest(), mtime, row_checks, page_size, anchors,
+                        widgets)
+
+
+def load_template(path) -> FormTemplate:
+    """
+    Loads a compiled form template, reusing the cached copy if the file has not changed since it was compiled.
+
+    Args:
+        path(str): The path to the form template JSON file.
+
+    Returns:
+        FormTemplate: The compiled template.
+
+    Raises:
+        FileNotFoundError: If the template file does not exist.
+    """
+
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+
+    cached = _template_cache.get(path)
+    if cached is not None and cached.mtime == mtime:
+        return cached
+
+    template = compile_template(path)
+    _template_cache[path] = template
+    return template
@@ -0,0 +1,247 @@
+"""
+    File: Form_Widgets.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Form Widgets
+
+    Reads the values typed into a fillable PDF form straight from its AcroForm fields, for the template fields that are
+    mapped to form fields, instead of finding the text under their boxes. The value of a form field is exactly what was
+    typed, where a box can catch printed labels or clip a long value, and reading it is a dictionary lookup instead of
+    a pass over the page's words. The template keeps a "widgets" mapping from each of its field names to the form
+    fields it is read from; template fields that are not mapped, or whose form fields are not on the page, are
+    extracted from their boxes as before.
+
+        Features
+
+        - Once Per Document: Whether a document is a fillable form is checked when it is opened, flattened and scanned
+          forms never have their widgets looked at.
+        - Direct Reads: Only the mapped form fields are read, from their "V" entries, with the qualified name of each
+          widget worked out once per document.
+        - Comb Fields: A template field can be mapped to several form fields (e.g. one per character box), their
+          values are joined with spaces in the order given, like the words under a box are.
+        - Mapping Builder: Proposes the mapping of a template from a filled reference form, by which widgets sit
+          inside each box (run this file directly), to be checked and edited in the template JSON.
+
+        Usage
+
+        - python Form_Widgets.py "./Form Templates/1348.json" "./Documents/DD-13481a - Expl 1.pdf"
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/widget.html
+        - https://pymupdf.readthedocs.io/en/latest/document.html#Document.xref_get_key
+"""
+
+import sys
+import json
+import argparse
+import pymupdf as pmu
+
+
+# Widgets that hold no typed value
+_VALUELESS_WIDGET_TYPES = (pmu.PDF_WIDGET_TYPE_BUTTON, pmu.PDF_WIDGET_TYPE_SIGNATURE)
+
+# A widget is taken as inside a template box if at least this share of its area is
+MIN_WIDGET_OVERLAP = 0.5
+
+# Widgets inside a box that are smaller than this share of the largest one are taken as belonging to a neighbouring
+#  field that the box happens to overlap, e.g. a date next to the document number
+MIN_WIDGET_AREA_SHARE = 0.25
+
+
+def _parent(doc, xref) -> int:
+    # The xref of a form field's parent, 0 for a top level field
+    kind, value = doc.xref_get_key(xref, "Parent")
+    return int(value.split()[0]) if kind == "xref" else 0
+
+
+class WidgetReader:
+    """
+    Reads the values of the form fields of one document.
+
+    Attributes:
+        doc(pmu.Document): The document.
+        fillable(bool): True if the document has AcroForm fields, checked once when the reader is made.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.fillable = bool(doc.is_form_pdf)
+
+        # widget xref -> the qualified name of its form field, e.g. 'form1[0].#subform[0].TextField2[55]'
+        self._names = {}
+
+    def field_name(self, xref) -> str:
+        """
+        Gets the qualified name of the form field a widget belongs to.
+
+        Args:
+            xref(int): The widget's xref.
+
+        Returns:
+            str: The names of the field and its parents, joined with dots.
+
+        Raises:
+            None.
+        """
+
+        name = self._names.get(xref)
+        if name is None:
+            parts = []
+            node = xref
+            while node:
+                kind, value = self.doc.xref_get_key(node, "T")
+                if kind == "string":
+                    parts.append(value)
+                node = _parent(self.doc, node)
+            name = self._names[xref] = '.'.join(reversed(parts))
+        return name
+
+    def values(self, page, wanted) -> dict:
+        """
+        Reads the values of the form fields on a page.
+
+        Args:
+            page(pmu.Page): The page.
+            wanted(Container[str]): The qualified names of the form fields to read, others are skipped. None to read
+                every form field on the page.
+
+        Returns:
+            dict: The value of each wanted form field on the page, by name. Unchecked boxes and empty fields are ''.
+
+        Raises:
+            None.
+        """
+
+        values = {}
+        if not self.fillable:
+            return values
+        for xref, annot_type, _ in page.annot_xrefs():
+            if annot_type != pmu.PDF_ANNOT_WIDGET:
+                continue
+            name = self.field_name(xref)
+            if (wanted is None or name in wanted) and not values.get(name):
+                values[name] = self._value(page, xref)
+        return values
+
+    def _value(self, page, xref) -> str:
+        # The value of a widget's field, which a kid widget inherits from its parent field
+        node = xref
+        while node:
+            kind, value = self.doc.xref_get_key(node, "V")
+            if kind == "string":
+                return value
+            if kind == "name":
+                # check boxes and radio buttons, '/Off' when not set
+                return '' if value == "/Off" else value.lstrip('/')
+            if kind != "null":
+                # lists and other values are left to PyMuPDF to decode
+                value = page.load_widget(xref).field_value
+                return '' if value in (None, False) else str(value)
+            node = _parent(self.doc, node)
+        return ''
+
+
+def widget_texts(template, values) -> list:
+    """
+    Gets the text of each template field from the values of its form fields.
+
+    Args:
+        template(FormTemplate): The compiled form template with its widget mapping.
+        values(dict): The values read by `WidgetReader.values`.
+
+    Returns:
+        list: The text of each field in template order, None for fields with no mapped form field on the page.
+
+    Raises:
+        None.
+    """
+
+    texts = []
+    for field in template.fields:
+        names = [name for name in template.widgets.get(field.name, ()) if name in values]
+        texts.append(' '.join(values[name] for name in names) if names else None)
+    return texts
+
+
+def map_widgets(template_path, reference_path, page_number=1) -> dict:
+    """
+    Saves to a form template which form fields of a filled reference form each of its boxes holds.
+
+    A widget belongs to a box if most of it is inside the box, leaving out widgets much smaller than the largest one
+    in the box. Boxes with no widget are left out of the mapping and are always extracted from the page.
+
+    Args:
+        template_path(str): The path to the form template JSON file.
+        reference_path(str): The path to a fillable PDF of the form, laid out like the page the boxes were drawn on.
+        page_number(int): The page of the reference PDF, starting at 1.
+
+    Returns:
+        dict: The updated template.
+
+    Raises:
+        ValueError: If the reference PDF has no form fields on the page.
+    """
+
+    with open(template_path, 'r') as file:
+        template = json.load(file)
+
+    with pmu.open(reference_path) as doc:
+        page = doc[page_number - 1]
+        widgets = [(widget.field_name, pmu.Rect(widget.rect)) for widget in page.widgets()
+                   if widget.field_type not in _VALUELESS_WIDGET_TYPES]
+    if not widgets:
+        raise ValueError(f"Page {page_number} of '{reference_path}' has no form fields")
+
+    mapping = {}
+    for box in template["page number: 1"]:
+        rect = pmu.Rect(box['coords'])
+        inside = [(name, widget) for name, widget in widgets
+                  if not widget.is_empty and abs(widget & rect) >= MIN_WIDGET_OVERLAP * abs(widget)]
+        if not inside:
+            continue
+        largest = max(abs(widget) for _, widget in inside)
+        inside = [(name, widget) for name, widget in inside if abs(widget) >= MIN_WIDGET_AREA_SHARE * largest]
+        # in reading order, top to bottom then left to right
+        inside.sort(key=lambda item: (round(item[1].y0), item[1].x0))
+        mapping[box['name']] = [name for name, _ in inside]
+    template["widgets"] = mapping
+
+    with open(template_path, 'w') as file:
+        json.dump(template, file, indent=4)
+    return template
+
+
+def main() -> None:
+    """
+    Saves the form fields each box of a template holds on a fillable reference form, from the command line.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+
+    parser = argparse.ArgumentParser(description="Map the fields of a form template to the form fields of a "
+                                                 "fillable PDF.")
+    parser.add_argument("template", help="form template JSON")
+    parser.add_argument("reference", help="filled, fillable PDF of the form")
+    parser.add_argument("--page", type=int, default=1, help="page of the reference PDF (default: 1)")
+    args = parser.parse_args()
+
+    template = map_widgets(args.template, args.reference, args.page)
+    for field_name, names in template["widgets"].items():
+        print(f"{field_name}: {', '.join(names)}")
+    print(f"Mapped {len(template['widgets'])} fields of '{args.template}', check them before scanning")
+
+
+if __name__ == '__main__':
+
+    main()
+    sys.exit(0)
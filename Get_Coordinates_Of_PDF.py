@@ -1,9 +1,9 @@
 import pymupdf as pmu
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
-from PIL import Image, ImageTk
 import json
-import matplotlib.pyplot as plt
+from Region_Render import RegionRenderer, pixmap_to_image
+from Template_Schema import canvas_to_pdf, pdf_to_canvas, template_document
 
 # TODO: add ability to adjust boxes?
 class PDFViewer(tk.Tk):
@@ -14,11 +14,12 @@ class PDFViewer(tk.Tk):
 
         self.pdf_path = pdf_path
         self.current_page_number = 0
-        self.rectangles = {}  # Dictionary to store rectangles with page numbers
+        self.rectangles = {}  # Dictionary to store rectangles with page numbers, in PDF points
         self.current_rect = None
         self.start_x = self.start_y = 0
 
         self.doc = pmu.open(pdf_path)
+        self.renderer = RegionRenderer()
         self.canvas = tk.Canvas(self, bg='white')
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
@@ -74,7 +75,7 @@ class PDFViewer(tk.Tk):
                     page_key = f"page number: {self.current_page_number + 1}"
                     self.rectangles.setdefault(page_key, []).append({
                         'name': box_name,
-                        'coords': (x1, y1, x2, y2)
+                        'coords': canvas_to_pdf(self.page, (x1, y1, x2, y2))
                     })
             self.current_rect = None
 
@@ -94,8 +95,10 @@ class PDFViewer(tk.Tk):
 
     def load_page(self):
         self.page = self.doc.load_page(self.current_page_number)
-        self.pagemap = self.page.get_pixmap()
-        self.image = Image.frombytes("RGB", [self.pagemap.width, self.pagemap.height], self.pagemap.samples)
+        self.pagemap = self.renderer.render(self.page)
+        self.image = pixmap_to_image(self.pagemap)
+        # PIL is imported with the first page rather than with the module, to keep the viewer's start up fast
+        from PIL import ImageTk
         self.img_tk = ImageTk.PhotoImage(image=self.image)
 
         self.canvas.delete("all")
@@ -107,45 +110,27 @@ class PDFViewer(tk.Tk):
         page_key = f"page number: {self.current_page_number + 1}"
         if page_key in self.rectangles:
             for box in self.rectangles[page_key]:
-                x1, y1, x2, y2 = box['coords']
+                x1, y1, x2, y2 = pdf_to_canvas(self.page, box['coords'])
                 self.canvas.create_rectangle(x1, y1, x2, y2, outline="red", width=2, tags=box['name'])
 
     def save_current_page_boxes(self):
+        # The boxes are kept in PDF points as they are drawn, so the canvas (in pixels) is not read back; only the
+        #  page entry is removed if it has no boxes left
         page_key = f"page number: {self.current_page_number + 1}"
-        if page_key in self.rectangles:
-            updated_boxes = []
-            for box in self.rectangles[page_key]:
-                tag = box['name']
-                item_ids = self.canvas.find_withtag(tag)
-                if item_ids:  # Check if the item exists
-                    coords = self.canvas.coords(item_ids[0])
-                    if len(coords) == 4:  # Ensure the coords tuple has 4 elements
-                        updated_boxes.append({
-                            'name': tag,
-                            'coords': (coords[0], coords[1], coords[2], coords[3])
-                        })
-                else:
-                    print(f"Warning: Rectangle '{tag}' not found on canvas.")
-
-            if updated_boxes:  # Only update if there are valid boxes
-                self.rectangles[page_key] = updated_boxes
-            else:
-                del self.rectangles[page_key]  # Remove page entry if no valid rectangles
+        if page_key in self.rectangles and not self.rectangles[page_key]:
+            del self.rectangles[page_key]
 
     def extract_text_from_boxes(self):
         extracted_text = []
         page_key = f"page number: {self.current_page_number + 1}"
         for box in self.rectangles.get(page_key, []):
-            x1, y1, x2, y2 = box['coords']
-            # Convert canvas coordinates to PDF coordinates
-            page_width, page_height = self.page.rect.width, self.page.rect.height
-            img_width, img_height = self.img_tk.width(), self.img_tk.height()
-            scale_x, scale_y = page_width / img_width, page_height / img_height
-            pdf_rect = pmu.Rect(x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y)
-            text = self.page.get_text("text", clip=pdf_rect)
+            # the boxes are already in PDF points
+            text = self.page.get_text("text", clip=pmu.Rect(box['coords']))
             extracted_text.append(f"{box['name']}: {text}")
 
         if extracted_text:
+            # matplotlib is only needed for this preview and takes longer to import than the rest of the viewer
+            import matplotlib.pyplot as plt
             plt.figure(figsize=(10, 7))
             plt.text(0.5, 0.5, '\n'.join(extracted_text), fontsize=12, ha='center', wrap=True)
             plt.axis('off')
@@ -157,7 +142,7 @@ class PDFViewer(tk.Tk):
             # Remove empty page entries before saving
             self.rectangles = {k: v for k, v in self.rectangles.items() if v}
             with open(save_path, 'w') as file:
-                json.dump(self.rectangles, file, indent=4)
+                json.dump(template_document(self.rectangles, self.doc[0]), file, indent=4)
             messagebox.showinfo("Info", "Boxes saved successfully!")
 
     def delete_top_rectangle(self):
@@ -1,9 +1,9 @@
 import fitz  # PyMuPDF
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
-from PIL import Image, ImageTk
 import json
-import matplotlib.pyplot as plt
+from Page_Image_Cache import PageImageCache
+from Template_Schema import canvas_to_pdf, pdf_to_canvas, template_document
 
 class PDFViewer(tk.Toplevel):  # Use Toplevel instead of Tk
     def __init__(self, pdf_path, on_close_callback):
@@ -13,12 +13,15 @@ class PDFViewer(tk.Toplevel):  # Use Toplevel instead of Tk
 
         self.pdf_path = pdf_path
         self.current_page_number = 0
-        self.rectangles = {}  # Dictionary to store rectangles with page numbers
+        self.rectangles = {}  # Dictionary to store rectangles with page numbers, in PDF points
         self.current_rect = None
         self.start_x = self.start_y = 0
         self.zoom_scale = 1.0  # Initial zoom scale
 
         self.doc = fitz.open(pdf_path)
+        # rendered pages, with the pages around the current one rendered ahead in a background thread; the document
+        #  is shared with that thread, so it is only used while holding self.pages.lock
+        self.pages = PageImageCache(self.doc)
         self.canvas = tk.Canvas(self, bg='white')
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
@@ -35,6 +38,8 @@ class PDFViewer(tk.Toplevel):  # Use Toplevel instead of Tk
 
     def on_close(self):
         # Cleanup and call the provided callback function
+        self.pages.close()
+        self.doc.close()
         self.destroy()
         if self.on_close_callback:
             self.on_close_callback()
@@ -92,20 +97,21 @@ class PDFViewer(tk.Toplevel):  # Use Toplevel instead of Tk
     def on_release(self, event):
         if self.current_rect:
             x1, y1, x2, y2 = self.canvas.coords(self.current_rect)
-            x1 /= self.zoom_scale
-            y1 /= self.zoom_scale
-            x2 /= self.zoom_scale
-            y2 /= self.zoom_scale
             if x1 != x2 and y1 != y2:  # Ensure the rectangle is not degenerate
                 box_name = simpledialog.askstring("Box Name", "Enter a name for the data in the box:")
                 if box_name:
                     page_key = f"page number: {self.current_page_number + 1}"
+                    # saved in PDF points, the same at any zoom and page rotation
+                    with self.pages.lock:
+                        coords = canvas_to_pdf(self.page, (x1, y1, x2, y2), self.zoom_scale)
                     self.rectangles.setdefault(page_key, []).append({
                         'name': box_name,
-                        'coords': (x1, y1, x2, y2)
+                        'coords': coords
                     })
+            # the boxes are canvas items over the page image, so only they are redrawn
+            self.canvas.delete(self.current_rect)
             self.current_rect = None
-            self.load_page()
+            self.draw_rectangles()
 
     def prev_page(self):
         if self.current_page_number > 0:
@@ -121,9 +127,12 @@ class PDFViewer(tk.Toplevel):  # Use Toplevel instead of Tk
 
     def load_page(self):
         try:
-            self.page = self.doc.load_page(self.current_page_number)
-            self.pagemap = self.page.get_pixmap(matrix=fitz.Matrix(self.zoom_scale, self.zoom_scale))
-            self.image = Image.frombytes("RGB", [self.pagemap.width, self.pagemap.height], self.pagemap.samples)
+            with self.pages.lock:
+                self.page = self.doc.load_page(self.current_page_number)
+            # from the cache if it was rendered ahead, the pages around it are then rendered in the background
+            self.image = self.pages.get(self.current_page_number, self.zoom_scale)
+            # PIL is imported with the first page rather than with the module, to keep the app's start up fast
+            from PIL import ImageTk
             self.img_tk = ImageTk.PhotoImage(image=self.image)
 
             self.canvas.delete("all")
@@ -134,52 +143,34 @@ class PDFViewer(tk.Toplevel):  # Use Toplevel instead of Tk
             messagebox.showerror("Error", f"Failed to load page: {e}")
 
     def draw_rectangles(self):
+        # (re)draws the boxes of the current page as overlays, leaving the page image as it is
+        self.canvas.delete("box")
         page_key = f"page number: {self.current_page_number + 1}"
         if page_key in self.rectangles:
             for box in self.rectangles[page_key]:
-                x1, y1, x2, y2 = box['coords']
-                x1 *= self.zoom_scale
-                y1 *= self.zoom_scale
-                x2 *= self.zoom_scale
-                y2 *= self.zoom_scale
-                self.canvas.create_rectangle(x1, y1, x2, y2, outline="red", width=2, tags=box['name'])
+                with self.pages.lock:
+                    x1, y1, x2, y2 = pdf_to_canvas(self.page, box['coords'], self.zoom_scale)
+                self.canvas.create_rectangle(x1, y1, x2, y2, outline="red", width=2, tags=(box['name'], "box"))
 
     def save_current_page_boxes(self):
+        # The boxes are kept in PDF points as they are drawn, so the zoomed canvas is not read back; only the page
+        #  entry is removed if it has no boxes left
         page_key = f"page number: {self.current_page_number + 1}"
-        if page_key in self.rectangles:
-            updated_boxes = []
-            for box in self.rectangles[page_key]:
-                tag = box['name']
-                item_ids = self.canvas.find_withtag(tag)
-                if item_ids:  # Check if the item exists
-                    coords = self.canvas.coords(item_ids[0])
-                    if len(coords) == 4:  # Ensure the coords tuple has 4 elements
-                        updated_boxes.append({
-                            'name': tag,
-                            'coords': (coords[0], coords[1], coords[2], coords[3])
-                        })
-                else:
-                    print(f"Warning: Rectangle '{tag}' not found on canvas.")
-            
-            if updated_boxes:  # Only update if there are valid boxes
-                self.rectangles[page_key] = updated_boxes
-            else:
-                del self.rectangles[page_key]  # Remove page entry if no valid rectangles
+        if page_key in self.rectangles and not self.rectangles[page_key]:
+            del self.rectangles[page_key]
 
     def extract_text_from_boxes(self):
         extracted_text = []
         page_key = f"page number: {self.current_page_number + 1}"
         for box in self.rectangles.get(page_key, []):
-            x1, y1, x2, y2 = box['coords']
-            # Convert canvas coordinates to PDF coordinates
-            page_width, page_height = self.page.rect.width, self.page.rect.height
-            img_width, img_height = self.img_tk.width(), self.img_tk.height()
-            scale_x, scale_y = page_width / img_width, page_height / img_height
-            pdf_rect = fitz.Rect(x1 * scale_x, y1 * scale_y, x2 * scale_x, y2 * scale_y)
-            text = self.page.get_text("text", clip=pdf_rect)
+            # the boxes are already in PDF points
+            with self.pages.lock:
+                text = self.page.get_text("text", clip=fitz.Rect(box['coords']))
             extracted_text.append(f"{box['name']}: {text}")
 
     def display_extracted_text(self, text):
+        # matplotlib is only needed for this preview and takes longer to import than the rest of the app
+        import matplotlib.pyplot as plt
         plt.figure(figsize=(10, 7))
         plt.text(0.5, 0.5, text, fontsize=12, ha='center', wrap=True)
         plt.axis('off')
@@ -190,22 +181,23 @@ class PDFViewer(tk.Toplevel):  # Use Toplevel instead of Tk
         if save_path:
             # Remove empty page entries before saving
             self.rectangles = {k: v for k, v in self.rectangles.items() if v}
+            with self.pages.lock:
+                template = template_document(self.rectangles, self.doc[0])
             with open(save_path, 'w') as file:
-                json.dump(self.rectangles, file, indent=4)
+                json.dump(template, file, indent=4)
             messagebox.showinfo("Info", "Boxes saved successfully!")
 
     def delete_top_rectangle(self):
         page_key = f"page number: {self.current_page_number + 1}"
         if page_key in self.rectangles and self.rectangles[page_key]:
             self.rectangles[page_key].pop()
-        self.load_page()
+        self.draw_rectangles()
 
     def clear_boxes(self):
         page_key = f"page number: {self.current_page_number + 1}"
         if page_key in self.rectangles:
             self.rectangles[page_key] = []
-        self.canvas.delete("all")
-        self.load_page()
+        self.draw_rectangles()
 
     def zoom_in(self):
         self.zoom_scale *= 1.2
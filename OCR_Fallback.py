@@ -0,0 +1,186 @@
+"""
+    File: OCR_Fallback.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    OCR Fallback
+
+    Reads the template boxes of pages that have no text layer, such as scanned 1348-1A forms and imported PNG/JPG files,
+    with Tesseract OCR. Only the boxes are rendered, at the chosen DPI, instead of the whole page, and the results are
+    cached by a hash of the page image so a re-run does not OCR the same scan again.
+
+        Features
+
+        - Text Layer Check: OCR only runs on pages without any text, text pages are read as before.
+        - Box Rendering: Each template box is rendered on its own from the page's display list and OCR'd, not the
+          full page.
+        - Result Cache: Results are kept in a SQLite file next to the workbook, keyed by the page image, the template
+          version, the DPI and the language.
+        - No Extra Packages: Uses the Tesseract support built into PyMuPDF; only Tesseract and its language data need
+          to be installed (set TESSDATA_PREFIX or pass the tessdata folder if it is not found).
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/recipes-ocr.html
+        - https://pymupdf.readthedocs.io/en/latest/pixmap.html#Pixmap.pdfocr_tobytes
+        - https://github.com/tesseract-ocr/tessdata
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import pymupdf as pmu
+
+from Region_Render import RegionRenderer
+
+OCR_CACHE_PATH = "./Scanned/ocr_cache.sqlite"
+
+# The resolution boxes are rendered at for OCR, Tesseract works best at 300 DPI
+OCR_DPI = 300
+
+# Open cache connections of this process, keyed by path, shared by every reader unpickled in a worker
+_connections = {}
+
+
+def page_image_hash(page) -> str:
+    """
+    Hashes what a page without a text layer looks like, from the images drawn on it.
+
+    The raw stream of each image is hashed with where it is drawn and the page's rotation, so the same scan hashes the
+    same in any file. A page with no images is rendered at a low resolution and the pixels are hashed instead.
+
+    Args:
+        page(pmu.Page): The page to hash.
+
+    Returns:
+        str: The SHA-256 hex digest of the page image.
+
+    Raises:
+        None.
+    """
+
+    digest = hashlib.sha256(repr(tuple(page.rect)).encode())
+    # the same scan turned another way reads differently, and boxes of rotated pages were once rendered unturned
+    if page.rotation:
+        digest.update(f"rotation {page.rotation}".encode())
+    images = page.get_images()
+    for xref, *_ in images:
+        digest.update(page.parent.xref_stream_raw(xref) or b'')
+        digest.update(repr([tuple(rect) for rect in page.get_image_rects(xref)]).encode())
+    if not images:
+        digest.update(page.get_pixmap(dpi=36, colorspace=pmu.csGRAY).samples)
+    return digest.hexdigest()
+
+
+class OcrReader:
+    """
+    Reads the template boxes of image only pages with OCR, caching the results.
+
+    The reader is sent to the worker processes with each file, each worker opens the cache for itself.
+
+    Attributes:
+        cache_path(str): The path to the SQLite cache.
+        dpi(int): The resolution the boxes are rendered at.
+        language(str): The Tesseract language, e.g. 'eng'.
+        tessdata(str): The Tesseract language data folder.
+    """
+
+    def __init__(self, cache_path=OCR_CACHE_PATH, dpi=OCR_DPI, language="eng", tessdata=None):
+        # fail now, not on the first scanned page, if Tesseract cannot be found
+        try:
+            self.tessdata = pmu.get_tessdata(tessdata)
+        except RuntimeError as e:
+            raise RuntimeError(f"OCR needs Tesseract and its language data, set TESSDATA_PREFIX: {e}") from e
+        self.cache_path = cache_path
+        self.dpi = dpi
+        self.language = language
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+
+    def _cache(self) -> sqlite3.Connection:
+        # The cache connection of this process, workers may write to the cache at the same time
+        db = _connections.get(self.cache_path)
+        if db is None:
+            db = sqlite3.connect(self.cache_path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS ocr (
+                              image_hash TEXT NOT NULL,
+                              template_hash TEXT NOT NULL,
+                              dpi INTEGER NOT NULL,
+                              language TEXT NOT NULL,
+                              texts TEXT NOT NULL,
+                              PRIMARY KEY (image_hash, template_hash, dpi, language))""")
+            db.commit()
+            _connections[self.cache_path] = db
+        return db
+
+    @staticmethod
+    def is_image_only(page) -> bool:
+        """
+        Checks if a page has no text layer at all.
+
+        Args:
+            page(pmu.Page): The page to check.
+
+        Returns:
+            bool: True if the page has no text, so its boxes can only be read with OCR.
+
+        Raises:
+            None.
+        """
+
+        return not page.get_text("text").strip()
+
+    def read_boxes(self, page, template, boxes=None) -> list:
+        """
+        Reads the text of each box of a form template from a page with OCR, or from the cache if the same page image
+        has been read with the same template, DPI and language before.
+
+        Args:
+            page(pmu.Page): The page to read.
+            template(FormTemplate): The compiled form template.
+            boxes(list): The template's boxes moved onto this page, None to use them as they are.
+
+        Returns:
+            list: The text of each box, in template order.
+
+        Raises:
+            RuntimeError: If Tesseract fails.
+        """
+
+        # the boxes follow from the page and the template, so they do not need to be part of the key
+        key = (page_image_hash(page), template.content_hash, self.dpi, self.language)
+        db = self._cache()
+        cached = db.execute("SELECT texts FROM ocr WHERE image_hash = ? AND template_hash = ? AND dpi = ? AND "
+                            "language = ?", key).fetchone()
+        if cached is not None:
+            return json.loads(cached[0])
+
+        # the page is interpreted once, then each box is rendered from its display list
+        renderer = RegionRenderer(self.dpi, "gray")
+        if boxes is None:
+            boxes = [field.rect for field in template.fields]
+        pixmaps = renderer.render_boxes(page, boxes)
+        texts = [self.read_pixmap(pixmap) if pixmap is not None else "" for pixmap in pixmaps]
+        db.execute("INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?, ?)", key + (json.dumps(texts),))
+        db.commit()
+        return texts
+
+    def read_pixmap(self, pixmap) -> str:
+        """
+        Reads the text in a rendered box with OCR.
+
+        Args:
+            pixmap(pmu.Pixmap): The rendered box.
+
+        Returns:
+            str: The text in the box.
+
+        Raises:
+            RuntimeError: If Tesseract fails.
+        """
+
+        # Tesseract returns a one page PDF with the text it found as an invisible text layer
+        with pmu.open("pdf", pixmap.pdfocr_tobytes(language=self.language, tessdata=self.tessdata)) as ocr_doc:
+            return ocr_doc[0].get_text("text")
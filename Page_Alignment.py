@@ -0,0 +1,231 @@
+"""
+    File: Page_Alignment.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Page Alignment
+
+    Moves the boxes of a form template onto pages that do not have the exact geometry the template was drawn on, such
+    as a form printed with an offset, scanned onto a larger sheet or saved with a different page size. The template
+    keeps the size of its page and one or more anchor strings printed on the form; for each page the anchors are found
+    with `search_for` and a scale and offset is fitted from where they are, then applied to every box. Pages of a
+    document with the same geometry reuse the transform, so the anchors are only searched for once per document.
+
+        Features
+
+        - Page Size Scaling: A page of a different size has the boxes scaled to it, even without anchors.
+        - Anchor Offsets: One anchor gives the print offset; anchors spread across the page also give the scale.
+        - Per Document Cache: The transform is kept per page geometry (media box, crop box and rotation).
+        - Identity Fast Path: Pages that match the template use the template's boxes as they are.
+
+        Usage
+
+        - python Page_Alignment.py "./Form Templates/form.json" reference.pdf "ISSUE RELEASE" "RECEIPT DOCUMENT"
+          (saves the reference page size and where the anchors are on it to the template)
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/page.html#Page.search_for
+        - https://pymupdf.readthedocs.io/en/latest/matrix.html
+"""
+
+import sys
+import json
+import argparse
+import pymupdf as pmu
+
+from Template_Schema import page_size
+
+# Anchors must be at least this fraction of the page apart along an axis to fit its scale, closer ones only give the
+#  offset and the scale comes from the page size
+MIN_ANCHOR_SPREAD = 0.1
+
+# Transforms closer than this to the identity, in points over the page, are treated as the identity
+ALIGN_TOLERANCE = 0.01
+
+
+def page_geometry(page) -> tuple:
+    """
+    Gets what decides where a page's text is, pages with the same geometry share a transform.
+
+    Args:
+        page(pmu.Page): The page.
+
+    Returns:
+        tuple: The media box, crop box and rotation of the page.
+
+    Raises:
+        None.
+    """
+
+    return tuple(page.mediabox), tuple(page.cropbox), page.rotation
+
+
+def _fit_axis(pairs, scale, page_length) -> tuple:
+    # Fits page = scale * template + offset along one axis from (template, page) coordinate pairs. The scale is only
+    #  fitted if the pairs are spread across the page, otherwise the given scale is kept and the offset averaged.
+    if not pairs:
+        return scale, 0.0
+    count = len(pairs)
+    mean_template = sum(template for template, _ in pairs) / count
+    mean_page = sum(page for _, page in pairs) / count
+    spread = max(template for template, _ in pairs) - min(template for template, _ in pairs)
+    if spread * scale >= MIN_ANCHOR_SPREAD * page_length:
+        variance = sum((template - mean_template) ** 2 for template, _ in pairs)
+        scale = sum((template - mean_template) * (page - mean_page) for template, page in pairs) / variance
+    return scale, mean_page - scale * mean_template
+
+
+class PageAligner:
+    """
+    Lines the boxes of a form template up with the pages of one document.
+
+    The pages of a document with the same geometry are taken to share their print offset, as they do when they come
+    from one print or scan job, so the anchors are only searched for on the first of them.
+
+    Attributes:
+        template(FormTemplate): The compiled form template, with its page size and anchors.
+    """
+
+    def __init__(self, template):
+        self.template = template
+
+        # page geometry -> (transform, boxes), None for the transform if it is the identity
+        self._cache = {}
+
+    def matrix(self, page):
+        """
+        Gets the transform from template coordinates to a page's coordinates.
+
+        Args:
+            page(pmu.Page): The page.
+
+        Returns:
+            pmu.Matrix: The scale and offset, or None if the page matches the template.
+
+        Raises:
+            None.
+        """
+
+        return self._aligned(page)[0]
+
+    def boxes(self, page) -> list:
+        """
+        Gets the template's boxes on a page.
+
+        Args:
+            page(pmu.Page): The page.
+
+        Returns:
+            list: The `pmu.Rect` of each field, in template order.
+
+        Raises:
+            None.
+        """
+
+        return self._aligned(page)[1]
+
+    def _aligned(self, page) -> tuple:
+        # The transform and boxes for the page's geometry, worked out on the first page with that geometry
+        geometry = page_geometry(page)
+        aligned = self._cache.get(geometry)
+        if aligned is None:
+            matrix = self._estimate(page)
+            if matrix is None:
+                boxes = [field.rect for field in self.template.fields]
+            else:
+                boxes = [field.rect * matrix for field in self.template.fields]
+            aligned = self._cache[geometry] = (matrix, boxes)
+        return aligned
+
+    def _estimate(self, page):
+        # Fits the transform from the page size and the anchors found on the page, None if it is the identity
+        width, height = page_size(page)
+        scale_x, scale_y = 1.0, 1.0
+        if self.template.page_size:
+            scale_x, scale_y = width / self.template.page_size[0], height / self.template.page_size[1]
+
+        x_pairs, y_pairs = [], []
+        for text, rect in self.template.anchors:
+            hits = page.search_for(text)
+            if not hits:
+                continue
+            # the hit nearest to where the anchor would be after scaling, the text may be on the form more than once
+            hit = min(hits, key=lambda found: abs(found.x0 - rect.x0 * scale_x) + abs(found.y0 - rect.y0 * scale_y))
+            x_pairs += [(rect.x0, hit.x0), (rect.x1, hit.x1)]
+            y_pairs += [(rect.y0, hit.y0), (rect.y1, hit.y1)]
+
+        scale_x, offset_x = _fit_axis(x_pairs, scale_x, width)
+        scale_y, offset_y = _fit_axis(y_pairs, scale_y, height)
+        if (abs(scale_x - 1) * width < ALIGN_TOLERANCE and abs(scale_y - 1) * height < ALIGN_TOLERANCE
+                and abs(offset_x) < ALIGN_TOLERANCE and abs(offset_y) < ALIGN_TOLERANCE):
+            return None
+        return pmu.Matrix(scale_x, 0, 0, scale_y, offset_x, offset_y)
+
+
+def add_anchors(template_path, reference_path, anchor_texts, page_number=1) -> dict:
+    """
+    Saves the size of a reference page and where anchor strings are on it to a form template.
+
+    Args:
+        template_path(str): The path to the form template JSON file, drawn on the reference page.
+        reference_path(str): The path to the PDF the template was drawn on.
+        anchor_texts(list): The strings to line pages up with, printed once on the form and far apart if possible.
+        page_number(int): The page of the reference PDF, starting at 1.
+
+    Returns:
+        dict: The updated template.
+
+    Raises:
+        ValueError: If an anchor string is not on the reference page.
+    """
+
+    with open(template_path, 'r') as file:
+        template = json.load(file)
+
+    with pmu.open(reference_path) as doc:
+        page = doc[page_number - 1]
+        anchors = []
+        for text in anchor_texts:
+            hits = page.search_for(text)
+            if not hits:
+                raise ValueError(f"Anchor '{text}' is not on page {page_number} of '{reference_path}'")
+            anchors.append({"text": text, "coords": list(hits[0])})
+        template["page_size"] = page_size(page)
+    template["anchors"] = anchors
+
+    with open(template_path, 'w') as file:
+        json.dump(template, file, indent=4)
+    return template
+
+
+def main() -> None:
+    """
+    Adds the page size and anchors of a reference PDF to a form template, from the command line.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+
+    parser = argparse.ArgumentParser(description="Save the page size and anchor strings of a form to its template.")
+    parser.add_argument("template", help="form template JSON")
+    parser.add_argument("reference", help="PDF the template was drawn on")
+    parser.add_argument("anchors", nargs="+", help="strings printed on the form to line pages up with")
+    parser.add_argument("--page", type=int, default=1, help="page of the reference PDF (default: 1)")
+    args = parser.parse_args()
+
+    template = add_anchors(args.template, args.reference, args.anchors, args.page)
+    print(f"Saved page size {template['page_size']} and {len(template['anchors'])} anchors to '{args.template}'")
+
+
+if __name__ == '__main__':
+
+    main()
+    sys.exit(0)
@@ -0,0 +1,178 @@
+"""
+    File: Page_Image_Cache.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Page Image Cache
+
+    Keeps the rendered pages of the training viewer in memory and renders the pages next to the one on screen in a
+    background thread, so Next, Previous and going back to a zoom level show a page that is already rendered instead of
+    freezing the window while a large scan is rasterized. The images are ready for `ImageTk.PhotoImage`, which has to
+    be made on the Tk thread.
+
+        Features
+
+        - LRU Cache: Rendered pages are kept by page and zoom, the least recently shown are dropped once the cache is
+          over its byte budget.
+        - Prefetch: A worker thread renders the pages either side of the current page at the current zoom, newer
+          requests replace older ones so it never works on pages the user has already skipped past.
+        - Thread Safety: PyMuPDF is not thread safe, so the worker and the viewer share one lock for every call into
+          the document.
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/recipes-multiprocessing.html
+        - https://docs.python.org/3/library/collections.html#collections.OrderedDict
+"""
+
+import threading
+
+from collections import OrderedDict
+from Region_Render import RegionRenderer, pixmap_to_image
+
+
+# The most memory the rendered pages are kept in, a letter page at 1.2 zoom is about 1.4 MB of RGB
+PAGE_CACHE_BYTES = 256 * 1024 * 1024
+
+# Pages either side of the current page to render ahead
+PREFETCH_PAGES = 2
+
+
+class PageImageCache:
+    """
+    Rendered page images of one document, by page number and zoom, with a background thread rendering ahead.
+
+    Attributes:
+        doc(pmu.Document): The document, only to be used while holding `lock`.
+        lock(threading.RLock): Held for every call into the document, by the worker and by the viewer.
+        max_bytes(int): The byte budget of the cached images.
+        prefetch_pages(int): The pages either side of the current page to render ahead.
+    """
+
+    def __init__(self, doc, max_bytes=PAGE_CACHE_BYTES, prefetch_pages=PREFETCH_PAGES):
+        self.doc = doc
+        self.lock = threading.RLock()
+        self.max_bytes = max_bytes
+        self.prefetch_pages = prefetch_pages
+
+        self._renderer = RegionRenderer()
+        # (page number, zoom) -> (image, size in bytes), most recently used last
+        self._images = OrderedDict()
+        self._bytes = 0
+
+        # the pages the worker is to render next, replaced by each new request
+        self._wanted = []
+        self._wake = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="page-prefetch", daemon=True)
+        self._worker.start()
+
+    def get(self, page_number, zoom):
+        """
+        Gets the image of a page, rendering it now if it is not cached, and starts rendering the pages around it.
+
+        Args:
+            page_number(int): The page, starting at 0.
+            zoom(float): The scale, 1 is 72 DPI.
+
+        Returns:
+            PIL.Image.Image: The rendered page.
+
+        Raises:
+            ImportError: If PIL is not installed.
+        """
+
+        image = self._cached((page_number, zoom))
+        if image is None:
+            image = self._render(page_number, zoom)
+        self.prefetch(page_number, zoom)
+        return image
+
+    def prefetch(self, page_number, zoom) -> None:
+        """
+        Asks the worker to render the pages around a page, nearest first, instead of what it was asked for before.
+
+        Args:
+            page_number(int): The page on screen, starting at 0.
+            zoom(float): The scale the page is shown at.
+
+        Returns:
+            None
+
+        Raises:
+            None.
+        """
+
+        with self.lock:
+            page_count = len(self.doc)
+        wanted = []
+        for distance in range(1, self.prefetch_pages + 1):
+            for neighbour in (page_number + distance, page_number - distance):
+                if 0 <= neighbour < page_count:
+                    wanted.append((neighbour, zoom))
+        with self._wake:
+            self._wanted = wanted
+            self._wake.notify()
+
+    def close(self) -> None:
+        """
+        Stops the worker and drops the cached images. The document is left open for the viewer to close.
+
+        Returns:
+            None
+
+        Raises:
+            None.
+        """
+
+        with self._wake:
+            self._closed = True
+            self._wanted = []
+            self._wake.notify()
+        self._worker.join()
+        with self.lock:
+            self._images.clear()
+            self._bytes = 0
+
+    def _cached(self, key):
+        # The cached image for a key, marked as the most recently used, or None
+        with self.lock:
+            entry = self._images.get(key)
+            if entry is None:
+                return None
+            self._images.move_to_end(key)
+            return entry[0]
+
+    def _render(self, page_number, zoom):
+        # Renders a page and caches it, dropping the least recently used pages over the budget
+        with self.lock:
+            entry = self._images.get((page_number, zoom))
+            if entry is not None:
+                return entry[0]
+            pixmap = self._renderer.render(self.doc.load_page(page_number), zoom=zoom)
+            # PIL keeps its own copy of RGB pixels with a padding byte, so the pixmap is not kept
+            image = pixmap_to_image(pixmap)
+            size = image.width * image.height * 4
+            self._images[(page_number, zoom)] = (image, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, (_, dropped) = self._images.popitem(last=False)
+                self._bytes -= dropped
+            return image
+
+    def _run(self) -> None:
+        # The worker: renders the wanted pages one at a time, picking up a new request between pages
+        while True:
+            with self._wake:
+                while not self._wanted and not self._closed:
+                    self._wake.wait()
+                if self._closed:
+                    return
+                key = self._wanted.pop(0)
+            if self._cached(key) is None:
+                try:
+                    self._render(*key)
+                except Exception:
+                    # a page that cannot be rendered ahead is rendered (and its error shown) when it is opened
+                    continue
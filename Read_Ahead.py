@@ -0,0 +1,139 @@
+"""
+    File: Read_Ahead.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Read Ahead
+
+    Reads the next files of a scan into memory in background threads while the current file is being extracted, so a
+    folder on a network share is not read one file at a time with the CPU idle in between. The scanner opens each file
+    from its bytes with `pmu.open(stream=...)` instead of from its path. The bytes held at once, counting the file being
+    extracted, are kept under a budget; a file larger than the whole budget is not read ahead and is opened from its
+    path as before. Each file is hashed in the reader thread from the bytes it read, so the scan manifest does not
+    read a new file a second time just to hash it.
+
+        Features
+
+        - Byte Budget: At most `max_bytes` of file contents are held, and at most `max_files` files are read ahead.
+        - Order Kept: Files come out in the order they went in, each with its bytes and their SHA-256, or None.
+        - One Read: The content hash the scan manifest keys files by is taken from the bytes already in memory.
+        - Errors Deferred: A file that cannot be read ahead comes out with None, so opening it from its path reports
+          the error against the file like before.
+        - Single Threaded Source: The paths are taken from the source on the caller's thread, so a source that hashes
+          files into the scan manifest (SQLite) is never run in a reader thread.
+
+        Refs
+
+        - https://docs.python.org/3/library/concurrent.futures.html#threadpoolexecutor
+        - https://pymupdf.readthedocs.io/en/latest/document.html#Document
+"""
+
+import os
+import hashlib
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# The most file contents held in memory at once, 0 to not read ahead
+READ_AHEAD_BYTES = 256 * 1024 * 1024
+
+# The most files read ahead of the one being extracted
+READ_AHEAD_FILES = 16
+
+# Threads reading files at the same time, a network share serves a few reads at once faster than one
+READ_AHEAD_THREADS = 2
+
+
+def read_file(path) -> tuple:
+    """
+    Reads the contents of a file and hashes them.
+
+    Args:
+        path(str): The path to the file.
+
+    Returns:
+        tuple: (contents, SHA-256 hex digest of the contents), the digest matches `Scan_Manifest.hash_file`.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+
+    with open(path, 'rb') as file:
+        contents = file.read()
+    return contents, hashlib.sha256(contents).hexdigest()
+
+
+def read_ahead(file_paths, max_bytes=READ_AHEAD_BYTES, max_files=READ_AHEAD_FILES, threads=READ_AHEAD_THREADS):
+    """
+    Reads the contents of the next files in background threads while the caller works on the current one.
+
+    Args:
+        file_paths(Iterable[str]): The paths to the files, taken from on the caller's thread.
+        max_bytes(int): The most file contents held at once, including the file last handed out, 0 to not read
+            ahead.
+        max_files(int): The most files read ahead of the file last handed out.
+        threads(int): The number of threads reading files.
+
+    Returns:
+        Generator[tuple]: (path, contents, content hash) for each file in order, contents and hash are None if the
+            file was not read ahead.
+
+    Raises:
+        None.
+    """
+
+    if max_bytes <= 0 or max_files <= 0:
+        for path in file_paths:
+            yield path, None, None
+        return
+
+    paths = iter(file_paths)
+    # (path, future or None, bytes counted against the budget) for each file read ahead, in order
+    pending = deque()
+    held = 0
+    # a path taken from the source that is waiting for room in the budget
+    waiting = None
+
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="read-ahead")
+    try:
+        current = 0
+        while True:
+            # the previous file has been handed back, so its bytes no longer count
+            held -= current
+            current = 0
+
+            # start reading the next files while there is room
+            while len(pending) < max_files:
+                if waiting is None:
+                    waiting = next(paths, None)
+                    if waiting is None:
+                        break
+                try:
+                    size = os.stat(waiting).st_size
+                except OSError:
+                    # opened from its path later, which reports the error
+                    size = max_bytes + 1
+                if size > max_bytes:
+                    pending.append((waiting, None, 0))
+                elif held + size <= max_bytes:
+                    pending.append((waiting, executor.submit(read_file, waiting), size))
+                    held += size
+                else:
+                    break
+                waiting = None
+
+            if not pending:
+                return
+            path, future, current = pending.popleft()
+            contents = content_hash = None
+            if future is not None:
+                try:
+                    contents, content_hash = future.result()
+                except OSError:
+                    contents = content_hash = None
+            yield path, contents, content_hash
+            contents = None
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,240 @@
+"""
+    File: Region_Render.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Region Render
+
+    Renders only the parts of a page that are needed, such as the template boxes for OCR, instead of a full page pixmap.
+    The page is interpreted once into a display list, then each box (or the union of the boxes) is rasterized from it
+    at the requested DPI. The pixmaps can be handed to NumPy or PIL through the buffer protocol without copying.
+
+        Features
+
+        - Display List Reuse: A page's drawing commands are read once and reused for every box and zoom level, a box
+          renders in well under a millisecond instead of re-running the whole page.
+        - Clip Rendering: Individual boxes, the union of the boxes, or the full page for the viewers.
+        - Rotated Pages: Boxes are given in unrotated PDF points like the template's and the text layer's, and are
+          turned with the page's rotation onto the displayed page the display list draws (run this file to check).
+        - Zero Copy: `pixmap_to_array` and `pixmap_to_image` wrap `Pixmap.samples_mv` instead of copying the samples.
+        - Optional Packages: NumPy and PIL are only imported when a pixmap is converted to them.
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/displaylist.html
+        - https://pymupdf.readthedocs.io/en/latest/pixmap.html#Pixmap.samples_mv
+        - https://pillow.readthedocs.io/en/stable/reference/Image.html#PIL.Image.frombuffer
+        - https://pymupdf.readthedocs.io/en/latest/page.html#Page.rotation_matrix
+"""
+
+import sys
+import pymupdf as pmu
+
+
+# Colour spaces a renderer can produce, gray is a third of the memory of RGB and is what OCR wants
+RENDER_COLORSPACES = {"gray": pmu.csGRAY, "rgb": pmu.csRGB}
+
+# PIL modes for each number of pixmap channels (without alpha, with alpha)
+_PIL_MODES = {1: ("L", "LA"), 3: ("RGB", "RGBA")}
+
+
+class RegionRenderer:
+    """
+    Renders regions of pages from a display list kept for the most recently rendered page.
+
+    Attributes:
+        dpi(int): The default resolution to render at.
+        colorspace(str): One of RENDER_COLORSPACES.
+    """
+
+    def __init__(self, dpi=72, colorspace="rgb"):
+        if colorspace not in RENDER_COLORSPACES:
+            raise ValueError(f"Unknown colorspace '{colorspace}', expected one of {tuple(RENDER_COLORSPACES)}")
+        self.dpi = dpi
+        self.colorspace = colorspace
+
+        # the display list of the last page rendered, with the document and page number it belongs to
+        self._doc = None
+        self._page_number = None
+        self._display_list = None
+
+    def display_list(self, page) -> pmu.DisplayList:
+        """
+        Gets the display list of a page, reusing it while the same page of the same document is rendered.
+
+        Args:
+            page(pmu.Page): The page.
+
+        Returns:
+            pmu.DisplayList: The page's drawing commands.
+
+        Raises:
+            None.
+        """
+
+        if page.parent is not self._doc or page.number != self._page_number:
+            self._display_list = page.get_displaylist()
+            self._doc = page.parent
+            self._page_number = page.number
+        return self._display_list
+
+    def render(self, page, clip=None, dpi=None, zoom=None) -> pmu.Pixmap:
+        """
+        Renders a region of a page.
+
+        Args:
+            page(pmu.Page): The page.
+            clip(pmu.Rect): The region in unrotated PDF points, None for the whole page.
+            dpi(int): The resolution, None for the renderer's.
+            zoom(float): The scale instead of a resolution, e.g. 1.2 for the viewers' zoom, 1 is 72 DPI.
+
+        Returns:
+            pmu.Pixmap: The rendered region, its origin is the top left of the region at that scale.
+
+        Raises:
+            None.
+        """
+
+        if zoom is None:
+            zoom = (dpi or self.dpi) / 72
+        if clip is not None:
+            clip = _displayed_rect(page, clip)
+        return self.display_list(page).get_pixmap(matrix=pmu.Matrix(zoom, zoom),
+                                                  colorspace=RENDER_COLORSPACES[self.colorspace], clip=clip)
+
+    def render_boxes(self, page, rects, dpi=None) -> list:
+        """
+        Renders each of a list of boxes of a page on its own.
+
+        Args:
+            page(pmu.Page): The page.
+            rects(Iterable[pmu.Rect]): The boxes in unrotated PDF points.
+            dpi(int): The resolution, None for the renderer's.
+
+        Returns:
+            list: A pixmap per box, None for a box that is outside the page.
+
+        Raises:
+            None.
+        """
+
+        pixmaps = []
+        for rect in rects:
+            if _displayed_rect(page, rect).is_empty:
+                pixmaps.append(None)
+                continue
+            pixmaps.append(self.render(page, rect, dpi))
+        return pixmaps
+
+    def render_union(self, page, rects, dpi=None) -> pmu.Pixmap:
+        """
+        Renders the smallest region of a page that holds all of a list of boxes.
+
+        Args:
+            page(pmu.Page): The page.
+            rects(Iterable[pmu.Rect]): The boxes in unrotated PDF points.
+            dpi(int): The resolution, None for the renderer's.
+
+        Returns:
+            pmu.Pixmap: The rendered region.
+
+        Raises:
+            ValueError: If no boxes are given.
+        """
+
+        union = None
+        for rect in rects:
+            union = pmu.Rect(rect) if union is None else union | rect
+        if union is None:
+            raise ValueError("No boxes to render")
+        return self.render(page, union, dpi)
+
+
+def _displayed_rect(page, rect) -> pmu.Rect:
+    # A box in unrotated PDF points turned onto the page as displayed, which the display list draws, and clipped to it
+    return (pmu.Rect(rect) * page.rotation_matrix) & page.rect
+
+
+def pixmap_to_array(pixmap):
+    """
+    Wraps a pixmap's samples in a NumPy array without copying them. The array is only valid while the pixmap is.
+
+    Args:
+        pixmap(pmu.Pixmap): The pixmap.
+
+    Returns:
+        numpy.ndarray: A (height, width, channels) uint8 array over the pixmap's memory.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+    """
+
+    import numpy as np
+
+    array = np.frombuffer(pixmap.samples_mv, dtype=np.uint8)
+    return array.reshape(pixmap.height, pixmap.stride // pixmap.n, pixmap.n)[:, :pixmap.width]
+
+
+def pixmap_to_image(pixmap):
+    """
+    Wraps a pixmap's samples in a PIL image. Gray and RGBA pixmaps share the pixmap's memory, PIL copies RGB ones
+    because it stores them with a padding byte.
+
+    Args:
+        pixmap(pmu.Pixmap): The pixmap.
+
+    Returns:
+        PIL.Image.Image: The image.
+
+    Raises:
+        ImportError: If PIL is not installed.
+        ValueError: If the pixmap is not gray or RGB.
+    """
+
+    from PIL import Image
+
+    modes = _PIL_MODES.get(pixmap.n - pixmap.alpha)
+    if modes is None:
+        raise ValueError(f"Cannot convert a pixmap with {pixmap.n} channels to an image")
+    mode = modes[pixmap.alpha]
+    return Image.frombuffer(mode, (pixmap.width, pixmap.height), pixmap.samples_mv, "raw", mode, pixmap.stride, 1)
+
+
+def main() -> None:
+    """
+    Checks that a box is rendered from the same part of a page at each rotation.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+
+    box = pmu.Rect(400, 50, 600, 100)
+    failed = 0
+    for rotation in (0, 90, 180, 270):
+        # a black box drawn on the unrotated page, then the page is turned
+        doc = pmu.open()
+        page = doc.new_page(width=612, height=792)
+        page.draw_rect(box, color=(0, 0, 0), fill=(0, 0, 0))
+        page.set_rotation(rotation)
+
+        pixmap = RegionRenderer(colorspace="gray").render_boxes(page, [box])[0]
+        dark = sum(1 for sample in pixmap.samples if sample < 128) / len(pixmap.samples) if pixmap else 0.0
+        size = sorted((pixmap.width, pixmap.height)) if pixmap else None
+        if dark < 0.99 or size != [50, 200]:
+            failed += 1
+            print(f"Rotation {rotation}: {dark:.0%} of the box rendered, size {size}")
+        doc.close()
+    print(f"Checked 4 rotations, {failed} rendered the wrong region")
+
+
+if __name__ == '__main__':
+
+    main()
+    sys.exit(0)
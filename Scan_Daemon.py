@@ -0,0 +1,365 @@
+"""
+    File: Scan_Daemon.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Scan Daemon
+
+    A headless, long running scanner that watches the 'To Scan' folder and extracts new files a few seconds after they
+    are dropped in, without any dialogs. Each file is moved to the 'Scanned' folder once its rows have been flushed to
+    disk and recorded in the scan manifest.
+
+        Features
+
+        - Watch Folder: Polls the folder with `walk_folder`, no extra packages needed.
+        - Debounce: A file is only picked up once its size and modification time have stopped changing, so files that
+          are still being copied in are left alone.
+        - Batching: Every file that settles during a poll is extracted in one run through `process_files`.
+        - Atomic Moves: Files are moved with `os.replace`; across drives they are copied to a temporary name first
+          and renamed into place.
+        - Form Routing: Optionally sends each page to the template of its form from the form index (--forms).
+        - Compaction: The rows of each file are in a CSV part file as soon as it is done; the closed parts are merged
+          into the master workbook a few seconds after the last batch and on shutdown. Parts other scans are still
+          writing are left for later, and a merge blocked by another process is tried again.
+
+        Usage
+
+        - python Scan_Daemon.py --template "./Form Templates/1348.json" [--watch "./To Scan"] [--scanned ./Scanned]
+
+        Refs
+
+        - https://docs.python.org/3/library/os.html#os.replace
+        - https://docs.python.org/3/library/signal.html
+"""
+
+import os
+import time
+import errno
+import shutil
+import signal
+import argparse
+import datetime
+import threading
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from Form_Template import load_template
+from Form_Classifier import FORM_INDEX_PATH, FormIndex
+from Folder_Walker import walk_folder
+from Scan_Manifest import ScanManifest
+from Spreadsheet_Writer import CsvPartWriter, compact_parts, pending_parts
+from Scan_Folder_Extract_Data import EXTRACTION_MODES, process_files, scan_template_hash
+
+
+def move_atomically(file_path, dest_dir) -> str:
+    """
+    Moves a file into a folder so it appears there complete or not at all.
+
+    The file is renamed in one step when both folders are on the same drive. Otherwise it is copied to a temporary
+    name in the destination, flushed, renamed into place and only then removed from the source. A file with the same
+    name already in the destination is never overwritten; a time stamp is added to the new name instead.
+
+    Args:
+        file_path(str): The path to the file to move.
+        dest_dir(str): The folder to move the file to.
+
+    Returns:
+        str: The path the file was moved to.
+
+    Raises:
+        OSError: If the file cannot be moved.
+    """
+
+    os.makedirs(dest_dir, exist_ok=True)
+    name, extension = os.path.splitext(os.path.basename(file_path))
+    dest_path = os.path.join(dest_dir, name + extension)
+    if os.path.exists(dest_path):
+        dest_path = os.path.join(dest_dir, f"{name}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{extension}")
+
+    try:
+        os.replace(file_path, dest_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # different drives: copy to a temporary name, then rename it into place
+        partial_path = dest_path + ".partial"
+        with open(file_path, 'rb') as source, open(partial_path, 'wb') as dest:
+            shutil.copyfileobj(source, dest, 1024 * 1024)
+            dest.flush()
+            os.fsync(dest.fileno())
+        os.replace(partial_path, dest_path)
+        os.remove(file_path)
+
+    return dest_path
+
+
+def _ignore_interrupts() -> None:
+    # Worker process initializer; Ctrl+C is handled by the daemon, which lets the workers finish the current batch
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _is_broken(executor) -> bool:
+    # Whether a worker of the pool died, which leaves the whole pool unusable
+    try:
+        executor.submit(int).result()
+    except BrokenProcessPool:
+        return True
+    return False
+
+
+class ScanDaemon:
+    """
+    Watches a folder and scans the files that are dropped into it.
+
+    Attributes:
+        watch_folder(str): The folder to watch.
+        scanned_folder(str): The folder scanned files are moved to.
+        template_path(str): The path to the form template, reloaded when the file changes.
+        forms_path(str): The path to the form index pages are routed with, reloaded when it changes, or None.
+        stop_event(threading.Event): Set to stop the daemon after the current batch.
+    """
+
+    def __init__(self, watch_folder, scanned_folder, template_path, workers=1, mode="words", settle_seconds=2.0,
+                 poll_seconds=1.0, max_batch=200, compact_seconds=5.0, walk_options=None, forms_path=None):
+        self.watch_folder = watch_folder
+        self.scanned_folder = scanned_folder
+        self.template_path = template_path
+        self.workers = workers
+        self.mode = mode
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        self.max_batch = max_batch
+        self.compact_seconds = compact_seconds
+        self.walk_options = walk_options or {}
+        self.forms_path = forms_path
+        self.stop_event = threading.Event()
+
+        # path -> ((size, mtime_ns), time first seen with that size and mtime)
+        self._settling = {}
+        # path -> (size, mtime_ns) of files that failed, skipped until they change
+        self._failed = {}
+        # when the daemon last scanned or merged, parts are merged once it has been idle for `compact_seconds`
+        self._idle_since = time.monotonic()
+        self._rows_since_compact = False
+        # the last template and form index that loaded, used while an edited copy cannot be read
+        self._template = None
+        self._forms = None
+
+    def _file_signature(self, item) -> tuple:
+        # The size and modification time of a file, stat is cached by the walker's os.DirEntry
+        stat = item.stat()
+        return stat.st_size, stat.st_mtime_ns
+
+    def poll(self) -> list:
+        """
+        Walks the watch folder once and returns the files that have stopped changing.
+
+        Returns:
+            list: The paths of the settled files, at most `max_batch`.
+
+        Raises:
+            OSError: If the watch folder cannot be read.
+        """
+
+        now = time.monotonic()
+        ready = []
+        present = set()
+        for item in walk_folder(self.watch_folder, **self.walk_options):
+            present.add(item.path)
+            try:
+                signature = self._file_signature(item)
+            except OSError:
+                # the file went away between listing and stat
+                continue
+
+            if self._failed.get(item.path) == signature:
+                continue
+
+            settling = self._settling.get(item.path)
+            if settling is None or settling[0] != signature:
+                # new or still being written, start (or restart) its settle timer
+                self._settling[item.path] = (signature, now)
+            elif now - settling[1] >= self.settle_seconds and len(ready) < self.max_batch:
+                ready.append(item.path)
+
+        # forget files that have been moved or deleted
+        for path in list(self._settling):
+            if path not in present:
+                del self._settling[path]
+        for path in list(self._failed):
+            if path not in present:
+                del self._failed[path]
+
+        return ready
+
+    def process_batch(self, file_paths, writer, manifest, executor) -> None:
+        """
+        Scans a batch of settled files and moves each one to the scanned folder once its rows are on disk.
+
+        Args:
+            file_paths(list): The paths of the files to scan.
+            writer(CsvPartWriter): The writer for the extracted rows.
+            manifest(ScanManifest): The record of scanned files.
+            executor(ProcessPoolExecutor): The worker pool, None to extract in this process.
+
+        Returns:
+            None
+
+        Raises:
+            None. A template or form index that cannot be loaded is reported, and the last copy that loaded is used
+            instead; with none loaded yet the batch is left in the folder to try again on the next poll.
+        """
+
+        # picks up an edited template, the compiled copy is reused while the file is unchanged
+        try:
+            self._template = load_template(self.template_path)
+            if self.forms_path is not None:
+                self._forms = FormIndex.load(self.forms_path)
+        except (ValueError, OSError, KeyError) as e:
+            # a template saved with a mistake, or caught half written, must not stop the daemon
+            if self._template is None or (self.forms_path is not None and self._forms is None):
+                print(f"Could not load the template, trying again on the next poll: {e}")
+                self.stop_event.wait(self.poll_seconds)
+                return
+            print(f"Could not load the edited template, scanning with the last one that loaded: {e}")
+        template = self._template
+        forms = self._forms
+        template_hash = scan_template_hash(template, forms)
+
+        def move_to_scanned(file_path):
+            self._settling.pop(file_path, None)
+            moved_to = move_atomically(file_path, self.scanned_folder)
+            print(f"Moved {os.path.basename(file_path)} to '{moved_to}'")
+
+        # a file dropped in again after it was scanned already has its rows, so it only needs moving
+        to_scan = []
+        for file_path in file_paths:
+            try:
+                if manifest.is_scanned(manifest.content_hash(file_path), template_hash):
+                    print(f"File '{os.path.basename(file_path)}' has already been scanned with this template.")
+                    move_to_scanned(file_path)
+                    continue
+            except OSError as e:
+                print(f"Could not check '{file_path}': {e}")
+                continue
+            to_scan.append(file_path)
+
+        if not to_scan:
+            return
+
+        started = time.monotonic()
+        failed = process_files(to_scan, self.watch_folder, template, writer, self.workers, self.mode, manifest,
+                               move_to_scanned, executor, forms=forms)
+        for file_path in failed:
+            try:
+                self._failed[file_path] = self._settling.pop(file_path)[0]
+            except KeyError:
+                continue
+        self._rows_since_compact = True
+        self._idle_since = time.monotonic()
+        print(f"Scanned {len(to_scan) - len(failed)} of {len(to_scan)} files in {time.monotonic() - started:.1f}s")
+
+    def run(self) -> None:
+        """
+        Watches the folder until `stop_event` is set or the process is interrupted, then closes the current part
+        file, merges the part files into the master workbook and closes the manifest.
+
+        Returns:
+            None
+
+        Raises:
+            None.
+        """
+
+        os.makedirs(self.watch_folder, exist_ok=True)
+        print(f"Watching '{self.watch_folder}' for new files, press Ctrl+C to stop")
+
+        manifest = ScanManifest(os.path.join(self.scanned_folder, "scan_manifest.sqlite"))
+        parts_folder = os.path.join(self.scanned_folder, "parts")
+        master_path = os.path.join(self.scanned_folder, "scanned_data.xlsx")
+        writer = CsvPartWriter(parts_folder)
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_ignore_interrupts)
+
+        try:
+            while not self.stop_event.is_set():
+                ready = self.poll()
+                if ready:
+                    self.process_batch(ready, writer, manifest, executor)
+                    if executor is not None and _is_broken(executor):
+                        # the batch finished in a pool of its own, the next one needs new workers too
+                        executor.shutdown(wait=False)
+                        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_ignore_interrupts)
+                elif self._rows_since_compact and time.monotonic() - self._idle_since >= self.compact_seconds:
+                    # merge into the workbook once idle; the open part file is closed first so it is merged too.
+                    #  The rows are already in the CSV part files as soon as each file is done, the workbook follows
+                    #  a few seconds after the last batch.
+                    #  Parts other scans are still writing are left alone, and if another process is merging into
+                    #  the workbook the closed parts are kept to try again after the next interval
+                    writer.close()
+                    compact_parts(parts_folder, master_path)
+                    writer = CsvPartWriter(parts_folder)
+                    self._idle_since = time.monotonic()
+                    self._rows_since_compact = bool(pending_parts(parts_folder))
+                else:
+                    self.stop_event.wait(self.poll_seconds)
+        except KeyboardInterrupt:
+            print("Stopping...")
+        finally:
+            writer.close()
+            if executor is not None:
+                executor.shutdown()
+            compact_parts(parts_folder, master_path)
+            manifest.close()
+
+
+def main() -> None:
+    """
+    Runs the scan daemon with the options given on the command line.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+
+    parser = argparse.ArgumentParser(description="Watch a folder and extract the data of new PDF files to Excel.")
+    parser.add_argument("--watch", default="./To Scan", help="folder to watch (default: ./To Scan)")
+    parser.add_argument("--scanned", default="./Scanned",
+                        help="folder scanned files, the workbook and the manifest go in (default: ./Scanned)")
+    parser.add_argument("--template", required=True, help="form template JSON to extract with")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes to extract with, 0 to use every CPU core (default: 1)")
+    parser.add_argument("--mode", choices=EXTRACTION_MODES, default="words")
+    parser.add_argument("--settle", type=float, default=2.0,
+                        help="seconds a file must stop changing before it is scanned (default: 2)")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between folder checks (default: 1)")
+    parser.add_argument("--compact-every", type=float, default=5.0,
+                        help="seconds idle after a batch before the part files are merged into the workbook, a merge "
+                             "another process blocks is tried again after as long (default: 5)")
+    parser.add_argument("--max-depth", type=int, default=0,
+                        help="levels of subfolders to watch, 0 for only the watch folder, -1 for all (default: 0)")
+    parser.add_argument("--forms", nargs="?", const=FORM_INDEX_PATH, default=None, metavar="INDEX",
+                        help="extract each page with the template of the form it matches in the form index, pages "
+                             f"that match none use --template (default: {FORM_INDEX_PATH})")
+    args = parser.parse_args()
+
+    daemon = ScanDaemon(args.watch, args.scanned, args.template, args.workers or os.cpu_count(), args.mode,
+                        args.settle, args.poll, compact_seconds=args.compact_every,
+                        walk_options={"max_depth": None if args.max_depth < 0 else args.max_depth},
+                        forms_path=args.forms)
+
+    # stop cleanly after the current batch when the service manager asks
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop_event.set())
+    daemon.run()
+
+
+if __name__ == '__main__':
+
+    main()
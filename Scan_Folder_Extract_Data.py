@@ -12,9 +12,36 @@
 
         Features
 
-        - Folder Scanning: Recursively scans a specified folder and its subfolders for PDF files.
+        - Folder Scanning: Streams the PDF files of a folder, optionally its subfolders, filtered by globs, size and
+          modification time (--max-depth, --include, --exclude, --min-size, --modified-after, ...).
         - Text Extraction: Extracts text from PDF files using coordinates defined in a JSON template.
+        - Read Ahead: Reads the next files into memory in background threads, within a byte budget, while the current
+          file is extracted, so a folder on a network share does not stall on each open (--read-ahead).
+        - Parallel Extraction: Optionally extracts files in a pool of worker processes (--workers N), splitting
+          long multi-page files into page range shards so they are extracted by every worker (--shard-pages).
+        - Word Index: Reads each page's words once and resolves every box against a grid index (--mode words).
+        - Form Routing: Sends each page to the template of the form it is on, found from a precomputed index of form
+          fingerprints, so folders and files mixing several forms are scanned in one run (--forms).
+        - Form Fields: Reads the fields of fillable PDF forms from their AcroForm values when the template maps them
+          to form fields, extracting only the unmapped fields from their boxes (see Form_Widgets.py).
+        - Page Alignment: Moves the boxes onto pages of a different size or printed with an offset, from the page size
+          and anchor strings saved in the template (see Page_Alignment.py).
+        - OCR Fallback: Reads the boxes of scanned pages and imported images that have no text layer with Tesseract,
+          caching the results by page image (--ocr, --ocr-dpi, --ocr-language).
+        - Word Layers: Optionally keeps every page's words, their boxes and the page geometry in a columnar store so a
+          new or corrected template can be applied later without reopening the PDFs (--keep-word-layers, then
+          'python Word_Layer_Store.py').
         - Spreadsheet Population: Populates an Excel spreadsheet with the extracted data.
+        - Validation: Cleans and checks each file's rows against the template's formats and row rules, listing any
+          problems in a 'Validation' column.
+        - Incremental Scanning: Skips files already scanned with the same template version, and with --forms the same
+          form index and index templates (--rescan to scan all).
+        - Streaming Output: Streams rows to CSV part files flushed after every file, then merges them into the
+          workbook (--output-format parts, the default) or appends to the workbook in memory (--output-format xlsx).
+        - Run Report: Times each stage of the run and saves a JSON report with throughput and percentiles to the
+          'reports' folder, optionally profiling each file (--profile cprofile).
+        - Progress and Cancel: Reports each file as it is done and stops cleanly after the current file when asked, so
+          the app can run a scan in a background thread with a progress window (see Scan_Progress_Window.py).
         - File Management: Moves processed files to a designated output folder.
         - Error Logging: Logs any files that fail to process.
 
@@ -23,7 +50,9 @@
         - Python 3.x
         - `openpyxl` for Excel file manipulation
         - `pymupdf` for PDF text extraction
-        - `tkinter` for file and folder selection dialogs
+        - `tkinter` for file and folder selection dialogs, only when a folder or template is not given on the
+          command line
+        - Tesseract and its language data, only for --ocr
 
         Usage
 
@@ -32,6 +61,9 @@
         3. Select JSON Template: Choose the JSON file containing the coordinates for text extraction.
         4. Run the Script: The script will process the files and populate the spreadsheet.
 
+        Headless: python Scan_Folder_Extract_Data.py --input "./To Scan" --output ./Scanned
+                      --template "./Form Templates/1348.json" [--workers 0] [--output-format parts]
+
         Refs
 
         - https://pymupdf.readthedocs.io/en/latest/index.html
@@ -40,16 +72,38 @@
 """
 
 import os
-import re
+import sys
 import json
+import queue
+import hashlib
 import shutil  # do not delete, needed for move_file function, commented out for testing
 import datetime
-import openpyxl
-import tkinter as tk
+import argparse
+import threading
 import pymupdf as pmu
 
-from tkinter import filedialog
-from openpyxl.styles import Font, colors
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from Form_Template import load_template
+from Folder_Walker import WALK_ORDERS, walk_folder
+from Scan_Manifest import ScanManifest, hash_file
+from Scan_Metrics import PROFILERS, ScanMetrics
+from Spreadsheet_Writer import OUTPUT_FORMATS, open_writer, compact_parts
+from Word_Index import WordIndex
+from OCR_Fallback import OCR_DPI, OcrReader
+from Form_Classifier import FORM_INDEX_PATH, FormIndex
+from Form_Widgets import WidgetReader, widget_texts
+from Page_Alignment import PageAligner
+from Read_Ahead import READ_AHEAD_BYTES, read_ahead
+from Word_Layer_Store import PageLayer, WordLayerStore
+
+# Extraction modes: "words" reads the page's words once and resolves every box against a grid index, "textbox" calls
+#  get_textbox once per box. Both give the same text.
+EXTRACTION_MODES = ("words", "textbox")
+
+# Files with more pages than this are split into shards of this many pages, extracted by several workers at once
+SHARD_PAGES = 50
 
 
 # TODO: convert to tkinter dialog?
@@ -69,6 +123,9 @@ def open_folder_dialog(title, initialdir) -> str:
         None.
     """
 
+    # tkinter is only loaded when a dialog is needed so headless runs never import it
+    from tkinter import filedialog
+
     selected_folder = None
     while not selected_folder:
         selected_folder = filedialog.askdirectory(initialdir=initialdir, title=title, mustexist=True)
@@ -95,6 +152,9 @@ def open_file_dialog(title, filetypes, initialdir) -> str:
         None.
     """
 
+    # tkinter is only loaded when a dialog is needed so headless runs never import it
+    from tkinter import filedialog
+
     file_path = None
     while not file_path:
         file_path = filedialog.askopenfilename(initialdir=initialdir,  title=title, filetypes=filetypes)
@@ -155,62 +215,84 @@ def create_output_subfolder(base_path: str) -> str:
     return subfolder_path
 
 
-# TODO: add feature to select to include subfolders or not?
-def queue_manager(working_directory, output_directory, json_path, sheet) -> None:
+def log_failed_file(working_directory, filename, error) -> None:
+    """
+    Reports a file that failed to process and appends it to the '_failed_files.log' in the scanned folder.
+
+    Args:
+        working_directory(str): The path to the folder being scanned.
+        filename(str): The name of the file that failed.
+        error(Exception): The error that caused the failure.
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+
+    print(f"Error processing file: {filename} \n\t{error}")
+    # create file name for log file
+    failed_log_filename = os.path.join(working_directory, "_failed_files.log")
+    with open(failed_log_filename, "a") as log_file:
+        log_file.write(f"{filename}\n")
+
+
+def queue_manager(working_directory, output_directory, template, writer, workers=1, mode="words",
+                  manifest=None, walk_options=None, metrics=None, shard_pages=SHARD_PAGES, ocr=None,
+                  forms=None, word_layers=None, read_ahead_bytes=READ_AHEAD_BYTES, progress=None, cancel=None,
+                  found=None) -> list:
     """
     Manages the queue of files in the folder and processes them.
 
+    Files are found by `walk_folder` as extraction runs, by default the PDF files in the folder (not subfolders). If
+    `found` is given the folder is listed in a thread ahead of the scan instead, so the number of files is known long
+    before the scan reaches the last of them, without waiting for the whole tree to be listed before starting.
+    With more than one worker the pages are extracted in a process pool and the rows are written by the writer here,
+    in the same file order as a single worker run. The writer is flushed after each file, before the file is recorded
+    in the manifest and moved.
+
     Args:
         working_directory(str): The path to the folder to scan.
         output_directory(str): The path to the folder to save the scanned files.
-        json_path(str): The path to the form template JSON file.
-        sheet(Worksheet): The Excel worksheet to populate with the extracted data.
+        template(FormTemplate): The compiled form template.
+        writer(CsvPartWriter | WorkbookWriter): The writer for the extracted rows.
+        workers(int): The number of processes to extract with, 1 to process the files in this process.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+        manifest(ScanManifest): The record of scanned files, files already scanned with this template are skipped.
+            None to scan every file.
+        walk_options(dict): Keyword arguments for `walk_folder`, e.g. include, exclude, max_depth, min_size.
+        metrics(ScanMetrics): Collects the stage timings and counters of the run, None to not keep them.
+        shard_pages(int): With more than 1 worker, the pages per shard files longer than this are split into, 0 to
+            extract each file in one worker.
+        ocr(OcrReader): Reads the boxes of pages without a text layer with OCR, None to leave them empty.
+        forms(FormIndex): Routes each page to the template of its form, None to extract every page with `template`.
+        word_layers(WordLayerStore): Stores the word layer of each page of each file, None to not keep them.
+        read_ahead_bytes(int): The most bytes of upcoming files read into memory ahead of extraction, 0 to open each
+            file from its path.
+        progress(Callable[[ScanMetrics, str, Exception], None]): Called after each file, see `process_files`.
+        cancel(threading.Event): Set to stop after the current file, see `process_files`.
+        found(Callable[[int, bool], None]): Called from the listing thread with the number of files found so far, and
+            whether the whole folder has been listed. None to walk the folder lazily as the scan goes.
 
     Returns:
-        None
+        list: The paths of the files that failed to process.
 
     Raises:
         Exception: If an error occurs processing a file.
     """
 
-    # This will process all files in the folder, including subfolders
-    # for root, dirs, files in os.walk(working_directory):
-
-    # Iterate through the files in the folder (not subfolders)
-    for filename in os.listdir(working_directory):
-
-        # Create the full path to the file by using os.path.join()
-        file_path = os.path.join(working_directory, filename)
-
-        # Check if the path is a file (not a directory)
-        if os.path.isfile(file_path):
-
-            # process pdf files
-            if file_path.endswith(".pdf"):
-                # announce processing file
-                print(f"Processing file: {filename}")
-                try:
-                    # process the file, extract text and populate spreadsheet, then move the file to the scanned folder
-                    pdf_processor(file_path, json_path, filename, sheet)
-                    move_file(working_directory, output_directory, filename)
-                except Exception as e:
-                    # log failed file and move to next file
-                    print(f"Error processing file: {filename} \n\t{e}")
-                    # create file name for log file
-                    failed_log_filename = os.path.join(working_directory, "_failed_files.log")
-                    with open(failed_log_filename, "a") as log_file:
-                        log_file.write(f"{filename}\n")
-                    continue
-            # skip non-pdf and move to next file
-            else:
-                print(f"File '{filename}' is not a pdf, skipping.")
-                continue
-        # skip directories and move to next file
-        else:
-            # note: REGEX to replace backslashes with forward slashes for windows paths to display correctly, the odd
-            #  number of backslashes is due to the escape character for the backslash in python being odd.
-            print(f"Path '{re.sub('\\\\', '/', file_path)}' is not a file, skipping.")
-            continue
+    # walk the folder lazily so extraction starts before the whole tree has been listed
+    pdf_files = (item.path for item in walk_folder(working_directory, **(walk_options or {})))
+    if found is not None:
+        pdf_files = _list_ahead(pdf_files, found, cancel)
+
+    def move_to_output(file_path):
+        move_file(os.path.dirname(file_path), output_directory, os.path.basename(file_path))
+
+    failed = process_files(pdf_files, working_directory, template, writer, workers, mode, manifest, move_to_output,
+                           metrics=metrics, shard_pages=shard_pages, ocr=ocr, forms=forms, word_layers=word_layers,
+                           read_ahead_bytes=read_ahead_bytes, progress=progress, cancel=cancel)
 
     # save log file of failed files
     if os.path.exists("failed_files.log"):
@@ -220,17 +302,488 @@ def queue_manager(working_directory, output_directory, json_path, sheet) -> None
             for file in failed_files:
                 print(file)
 
+    return failed
+
+
+def _list_ahead(file_paths, found, cancel=None):
+    # Lists the files in a thread as fast as the folder can be read, counting them with `found`, and yields them to
+    #  the scan in the same order. An error listing the folder is raised here, where the scan would have hit it.
+    listed = queue.Queue()
+
+    def list_files():
+        count = 0
+        try:
+            for file_path in file_paths:
+                if cancel is not None and cancel.is_set():
+                    break
+                listed.put(file_path)
+                count += 1
+                found(count, False)
+        except Exception as e:
+            listed.put(e)
+        finally:
+            found(count, True)
+            listed.put(None)
+
+    threading.Thread(target=list_files, name="list-folder", daemon=True).start()
+    while True:
+        file_path = listed.get()
+        if file_path is None:
+            return
+        if isinstance(file_path, Exception):
+            raise file_path
+        yield file_path
+
+
+def process_files(file_paths, working_directory, template, writer, workers=1, mode="words", manifest=None,
+                  on_written=None, executor=None, metrics=None, shard_pages=SHARD_PAGES, ocr=None, forms=None,
+                  word_layers=None, read_ahead_bytes=READ_AHEAD_BYTES, progress=None, cancel=None) -> list:
+    """
+    Extracts and writes the rows of each file, recording each file in the manifest once its rows are on disk.
 
-# TODO: does this work with multiple 1348s in one pdf? - fixed but doesn't handle PDFs with multiple different forms yet
-def pdf_processor(pdf_path, json_path, pdf_name, sheet) -> None:
+    Args:
+        file_paths(Iterable[str]): The paths to the PDF files.
+        working_directory(str): The path to the folder being scanned, where failures are logged.
+        template(FormTemplate): The compiled form template.
+        writer(CsvPartWriter | WorkbookWriter): The writer for the extracted rows.
+        workers(int): The number of processes to extract with, 1 to process the files in this process.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+        manifest(ScanManifest): The record of scanned files, files already scanned with this template are skipped.
+            None to scan every file.
+        on_written(Callable[[str], None]): Called with the path of each file once its rows have been flushed to disk
+            and recorded, e.g. to move it to the scanned folder.
+        executor(ProcessPoolExecutor): A pool to extract in when workers is more than 1, None to start one.
+        metrics(ScanMetrics): Collects the stage timings and counters of the run, None to not keep them.
+        shard_pages(int): With more than 1 worker, the pages per shard files longer than this are split into, 0 to
+            extract each file in one worker.
+        ocr(OcrReader): Reads the boxes of pages without a text layer with OCR, None to leave them empty.
+        forms(FormIndex): Routes each page to the template of its form, pages that match no form, or every page if
+            None, are extracted with `template`.
+        word_layers(WordLayerStore): Stores the word layer of each page of each file, keyed by its content hash,
+            None to not keep them.
+        read_ahead_bytes(int): The most bytes of upcoming files read into memory ahead of extraction, 0 to open each
+            file from its path.
+        progress(Callable[[ScanMetrics, str, Exception], None]): Called after each file with the run's metrics, the
+            file's path and the error it failed with or None. Called from the thread the scan runs in.
+        cancel(threading.Event): Set, from any thread, to stop once the current file's rows are written. Files
+            already sent to workers are left unrecorded and in place, to be scanned next time. None to scan every file.
+
+    Returns:
+        list: The paths of the files that failed to process.
+
+    Raises:
+        None.
+    """
+
+    failed = []
+    if metrics is None:
+        metrics = ScanMetrics()
+
+    # skip the files whose contents have already been scanned with this version of the templates. The files are read
+    #  and hashed once, in the read-ahead threads; the manifest is only queried on this thread, and files whose cached
+    #  hash is already scanned are skipped before they are read
+    content_hashes = {}
+    template_hash = scan_template_hash(template, forms)
+    if manifest is not None:
+        file_paths = _skip_cached_scanned(file_paths, manifest, template_hash)
+    files = read_ahead(file_paths, read_ahead_bytes)
+    if manifest is not None:
+        files = skip_scanned_files(files, manifest, template_hash, content_hashes, working_directory)
+    else:
+        files = _keep_hashes(files, content_hashes)
+
+    # extraction happens here or in the pool, either way this process is the single writer for the rows
+    keep_layers = word_layers is not None
+    if workers > 1:
+        results = parallel_extract(files, template, workers, mode, executor, metrics, shard_pages, ocr, forms,
+                                   keep_layers)
+    else:
+        results = serial_extract(files, template, mode, metrics, ocr, forms, keep_layers)
+
+    for file_path, rows, layers, error in results:
+        filename = os.path.basename(file_path)
+        try:
+            if error is not None:
+                raise error
+            # clean and validate the file's rows together, a column at a time, per form if its pages were routed
+            with metrics.stage("postprocess"):
+                blocks = list(template_blocks(rows, template, forms is not None))
+            # populate the spreadsheet, then record the file and hand it on once the rows are on disk
+            with metrics.stage("write"):
+                for block_template, block in blocks:
+                    for row in block:
+                        writer.write_row(row, filename, block_template)
+            with metrics.stage("flush"):
+                writer.flush()
+            content_hash = content_hashes.pop(file_path, None)
+            if word_layers is not None:
+                with metrics.stage("store_layers"):
+                    content_hash = content_hash or hash_file(file_path)
+                    word_layers.save(content_hash, filename, layers)
+            metrics.files += 1
+            metrics.pages += len(rows)
+            if manifest is not None:
+                manifest.record(content_hash, template_hash, filename, len(rows))
+            if on_written is not None:
+                on_written(file_path)
+        except Exception as e:
+            # log failed file, by its path relative to the scanned folder, and move to next file
+            log_failed_file(working_directory, os.path.relpath(file_path, working_directory), e)
+            failed.append(file_path)
+            metrics.failed += 1
+            error = e
+
+        if progress is not None:
+            progress(metrics, file_path, error)
+        if cancel is not None and cancel.is_set():
+            # the next file has not been started in this process, stop the extraction and any workers here
+            print("Scan cancelled, the rows of the files done so far are saved")
+            results.close()
+            break
+
+    return failed
+
+
+def template_blocks(rows, template, routed=False):
+    """
+    Cleans and validates the rows of a file, grouping routed pages by the template they were extracted with.
+
+    Args:
+        rows(list): The rows from `extract_pdf_rows`.
+        template(FormTemplate): The compiled form template of the run, used for pages that matched no form.
+        routed(bool): True if the rows are (template path, row) pairs from extracting with a form index.
+
+    Returns:
+        Generator[tuple]: (template, processed rows) for each run of pages of the same form, in page order.
+
+    Raises:
+        OSError: If a routed template cannot be read.
+    """
+
+    if not routed:
+        yield template, template.process_block(rows)
+        return
+
+    block_template, block = template, []
+    for template_path, row in rows:
+        page_template = template if template_path is None else load_template(template_path)
+        if page_template is not block_template and block:
+            yield block_template, block_template.process_block(block)
+            block = []
+        block_template = page_template
+        block.append(row)
+    if block:
+        yield block_template, block_template.process_block(block)
+
+
+def scan_template_hash(template, forms=None) -> str:
     """
-    Extracts text from a PDF file using the coordinates in a JSON file.
+    Gets the hash the scan manifest records files against, which changes whenever any template that can extract a
+    page changes.
+
+    Args:
+        template(FormTemplate): The compiled form template, used for every page or for pages that match no form.
+        forms(FormIndex): The form index pages are routed with, None if every page is extracted with `template`.
+
+    Returns:
+        str: The template's content hash without a form index, otherwise a SHA-256 hex digest of it, the index's
+            fingerprints and the content hash of each template in the index.
+
+    Raises:
+        None.
+    """
+
+    if forms is None:
+        return template.content_hash
+
+    digest = hashlib.sha256(template.content_hash.encode())
+    digest.update(json.dumps(forms.entries, sort_keys=True).encode())
+    for entry in forms.entries:
+        try:
+            digest.update(load_template(forms.template_path(entry)).content_hash.encode())
+        except OSError:
+            # pages routed to a missing template fail, and are scanned again once it is there
+            digest.update(b"missing")
+    return digest.hexdigest()
+
+
+def skip_scanned_files(files, manifest, template_hash, content_hashes, working_directory):
+    """
+    Filters out the files that have already been scanned with this version of the form templates.
+
+    Args:
+        files(Iterable[tuple]): (file_path, contents, content hash) for each PDF file, as yielded by `read_ahead`.
+            A file that was not read ahead is hashed from its path.
+        manifest(ScanManifest): The record of scanned files.
+        template_hash(str): The hash of the templates the files are scanned with, from `scan_template_hash`.
+        content_hashes(dict): Filled with the content hash of each file that is yielded, keyed by its path.
+        working_directory(str): The path to the folder being scanned, where failures are logged.
+
+    Returns:
+        Generator[tuple]: (file_path, contents) for the files that are new, changed, or scanned with an older
+            template.
+
+    Raises:
+        None.
+    """
+
+    for file_path, contents, content_hash in files:
+        filename = os.path.basename(file_path)
+        try:
+            content_hash = manifest.content_hash(file_path, content_hash)
+        except OSError as e:
+            log_failed_file(working_directory, os.path.relpath(file_path, working_directory), e)
+            continue
+
+        if manifest.is_scanned(content_hash, template_hash):
+            print(f"File '{filename}' has already been scanned with this template, skipping.")
+            continue
+
+        content_hashes[file_path] = content_hash
+        yield file_path, contents
+
+
+def _skip_cached_scanned(file_paths, manifest, template_hash):
+    # Skips the files that are unchanged since they were hashed and already scanned, without reading them
+    for file_path in file_paths:
+        try:
+            content_hash = manifest.cached_hash(file_path)
+        except OSError:
+            # reported by skip_scanned_files
+            content_hash = None
+        if content_hash is not None and manifest.is_scanned(content_hash, template_hash):
+            print(f"File '{os.path.basename(file_path)}' has already been scanned with this template, skipping.")
+            continue
+        yield file_path
+
+
+def _keep_hashes(files, content_hashes):
+    # Passes on the files read ahead without a manifest, keeping the hashes taken from their bytes
+    for file_path, contents, content_hash in files:
+        if content_hash is not None:
+            content_hashes[file_path] = content_hash
+        yield file_path, contents
+
+
+def serial_extract(files, template, mode="words", metrics=None, ocr=None, forms=None, keep_layers=False):
+    """
+    Extracts the rows of each PDF file in this process, yielding the results in the order the files were given.
+
+    Args:
+        files(Iterable[tuple]): (file_path, contents) for each PDF file, contents is None to open the file from its
+            path.
+        template(FormTemplate): The compiled form template.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+        metrics(ScanMetrics): Collects the stage timings and profiles each file if it has a profiler.
+        ocr(OcrReader): Reads the boxes of pages without a text layer with OCR, None to leave them empty.
+        forms(FormIndex): Routes each page to the template of its form, None to extract every page with `template`.
+        keep_layers(bool): Whether to return the `PageLayer` of each page with the rows.
+
+    Returns:
+        Generator[tuple]: (file_path, rows, layers, error) for each file, rows and layers are None if error is set,
+            layers is None if they are not kept.
+
+    Raises:
+        None.
+    """
+
+    if metrics is None:
+        metrics = ScanMetrics()
+
+    files = iter(files)
+    while True:
+        # the time spent waiting for the next file to be found and read
+        with metrics.stage("read"):
+            file_path, contents = next(files, (None, None))
+        if file_path is None:
+            break
+        # announce processing file
+        print(f"Processing file: {os.path.basename(file_path)}")
+        try:
+            layers = [] if keep_layers else None
+            with metrics.profile(os.path.basename(file_path)):
+                rows = extract_pdf_rows(file_path, template, mode, metrics, ocr=ocr, forms=forms, layers=layers,
+                                        contents=contents)
+        except Exception as e:
+            yield file_path, None, None, e
+            continue
+        yield file_path, rows, layers, None
+
+
+def parallel_extract(files, template, workers, mode="words", executor=None, metrics=None, shard_pages=SHARD_PAGES,
+                     ocr=None, forms=None, keep_layers=False):
+    """
+    Extracts the rows of each PDF file in a process pool, yielding the results in the order the files were given.
+
+    Files with more than `shard_pages` pages are split into page range shards that each worker opens on its own, so
+    one very long file is extracted by every worker instead of holding up the run in one. The rows of the shards are
+    put back together in page order, and the file fails as a whole if any of its shards fails. Only a few shards per
+    worker are in flight at once so the results of a large folder are not all held in memory. Files read ahead are sent
+    to the workers with their bytes, so the workers do not read them from the share again.
+
+    If a worker process dies (e.g. a crash inside MuPDF or the out of memory killer) the pool breaks. The files in
+    flight in it fail with `BrokenProcessPool` and are logged like any other failure, and the rest of the files are
+    sent to a new pool that is shut down when extraction ends.
+
+    Closing the generator before the last result, as a cancelled scan does, cancels the shards not started yet and
+    shuts down the pools started here without waiting for the ones still running.
+
+    Args:
+        files(Iterable[tuple]): (file_path, contents) for each PDF file, contents is None to have the workers open the
+            file from its path.
+        template(FormTemplate): The compiled form template.
+        workers(int): The number of worker processes.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+        executor(ProcessPoolExecutor): A pool to reuse, None to start one for these files.
+        metrics(ScanMetrics): Collects the stage timings sent back by the workers, whose profiler they use.
+        shard_pages(int): The pages per shard files longer than this are split into, 0 to not split files.
+        ocr(OcrReader): Reads the boxes of pages without a text layer with OCR, None to leave them empty.
+        forms(FormIndex): Routes each page to the template of its form, the workers load the index from its file.
+        keep_layers(bool): Whether the workers send back the `PageLayer` of each page with the rows.
+
+    Returns:
+        Generator[tuple]: (file_path, rows, layers, error) for each file, rows and layers are None if error is set,
+            layers is None if they are not kept.
+
+    Raises:
+        None.
+    """
+
+    if metrics is None:
+        metrics = ScanMetrics()
+
+    if executor is None:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        finished = False
+        try:
+            yield from parallel_extract(files, template, workers, mode, executor, metrics, shard_pages, ocr, forms,
+                                        keep_layers)
+            finished = True
+        finally:
+            executor.shutdown(wait=finished, cancel_futures=True)
+        return
+
+    def submit(file_path, contents):
+        return [executor.submit(_extract_pdf_rows_worker, file_path, template.path, template.content_hash, mode,
+                                metrics.profiler, metrics.profile_dir, start, stop, ocr, forms_path, keep_layers,
+                                contents)
+                for start, stop in _page_shards(file_path, shard_pages, contents)]
+
+    # files in the order they were given, each with the futures of its shards in page order
+    forms_path = forms.path if forms is not None else None
+    pending = deque()
+    in_flight = 0
+    # the pool started here if the one given broke, shut down at the end
+    replacement = None
+    finished = False
+    files = iter(files)
+    try:
+        while True:
+            with metrics.stage("read"):
+                file_path, contents = next(files, (None, None))
+            if file_path is None:
+                break
+            print(f"Processing file: {os.path.basename(file_path)}")
+            try:
+                futures = submit(file_path, contents)
+            except BrokenProcessPool:
+                # a worker died since the last file was sent: the files in flight fail with the pool, which is
+                #  replaced for this file and the rest
+                while pending:
+                    yield _collect_result(*pending.popleft(), metrics)
+                in_flight = 0
+                print("A worker process stopped unexpectedly, starting new workers")
+                if replacement is not None:
+                    replacement.shutdown(wait=False)
+                executor = replacement = ProcessPoolExecutor(max_workers=workers)
+                futures = submit(file_path, contents)
+            pending.append((file_path, futures))
+            in_flight += len(futures)
+
+            # keep the pool busy without queueing the whole folder
+            while in_flight >= workers * 2:
+                file_path, futures = pending.popleft()
+                in_flight -= len(futures)
+                yield _collect_result(file_path, futures, metrics)
+
+        while pending:
+            yield _collect_result(*pending.popleft(), metrics)
+        finished = True
+    finally:
+        if not finished:
+            # closed early, the shards of the files not collected yet are dropped unless they have started
+            for _, futures in pending:
+                for future in futures:
+                    future.cancel()
+        if replacement is not None:
+            replacement.shutdown(wait=finished, cancel_futures=True)
+
+
+def _page_shards(pdf_path, shard_pages, contents=None) -> list:
+    # The (start, stop) page ranges to extract a file in, the whole file in one if it is short enough. A file that
+    #  cannot be opened here is left whole so its worker reports the error.
+    if shard_pages <= 0:
+        return [(0, None)]
+    try:
+        with open_pdf(pdf_path, contents) as doc:
+            page_count = len(doc)
+    except Exception:
+        return [(0, None)]
+    if page_count <= shard_pages:
+        return [(0, None)]
+    return [(start, min(start + shard_pages, page_count)) for start in range(0, page_count, shard_pages)]
+
+
+def _collect_result(file_path, futures, metrics) -> tuple:
+    # Waits for the shards of a file and joins their rows (and word layers) in page order, returning the first error
+    #  instead of raising it so the caller can log the file. Every shard is waited for so none is still running when
+    #  the file is moved.
+    rows = []
+    layers = None
+    error = None
+    for future in futures:
+        try:
+            shard_rows, metrics_state, shard_layers = future.result()
+        except Exception as e:
+            error = error or e
+            continue
+        metrics.merge_state(metrics_state)
+        rows.extend(shard_rows)
+        if shard_layers is not None:
+            layers = (layers or []) + shard_layers
+    if error is not None:
+        return file_path, None, None, error
+    return file_path, rows, layers, None
+
+
+def _extract_pdf_rows_worker(pdf_path, template_path, template_hash, mode, profiler, profile_dir, start=0,
+                             stop=None, ocr=None, forms_path=None, keep_layers=False, contents=None) -> tuple:
+    # Runs in a worker process; the template and form index are loaded once per worker by their caches. Each worker
+    #  opens the file itself, from the bytes read ahead if it was sent them, and returns the rows of its page range
+    #  with the worker's stage timings and, if they are kept, the word layers of its pages.
+    template = load_template(template_path)
+    if template.content_hash != template_hash:
+        raise RuntimeError(f"Form template '{template_path}' changed during the scan")
+    forms = FormIndex.load(forms_path) if forms_path is not None else None
+    metrics = ScanMetrics(profiler, profile_dir)
+    label = os.path.basename(pdf_path) if stop is None else f"{os.path.basename(pdf_path)}_pages_{start + 1}-{stop}"
+    layers = [] if keep_layers else None
+    with metrics.profile(label):
+        rows = extract_pdf_rows(pdf_path, template, mode, metrics, start, stop, ocr, forms, layers, contents)
+    return rows, metrics.state(), layers
+
+
+def pdf_processor(pdf_path, template, pdf_name, writer, mode="words", forms=None) -> None:
+    """
+    Extracts text from a PDF file using the coordinates in a form template.
 
     Args:
         pdf_path(str): The path to the PDF file.
-        json_path(str): The path to the JSON file containing the coordinates.
+        template(FormTemplate): The compiled form template containing the coordinates.
         pdf_name(str): The name of the PDF file.
-        sheet(Worksheet): The Excel worksheet to populate with the extracted data.
+        writer(CsvPartWriter | WorkbookWriter): The writer for the extracted rows.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+        forms(FormIndex): Routes each page to the template of its form, None to extract every page with `template`.
 
     Returns:
         None.
@@ -239,70 +792,185 @@ def pdf_processor(pdf_path, json_path, pdf_name, sheet) -> None:
         Exception: If an error occurs extracting text from the PDF.
     """
 
-    # Open the PDF file
-    doc = pmu.open(pdf_path)
+    # Populate a spreadsheet row with the cleaned and validated data for each page
+    rows = extract_pdf_rows(pdf_path, template, mode, forms=forms)
+    for block_template, block in template_blocks(rows, template, forms is not None):
+        for row in block:
+            writer.write_row(row, pdf_name, block_template)
 
-    # If the PDF has multiple pages, process each page separately
-    if len(doc) > 1:
-        # Iterate through each page in the PDF
-        for page_number in range(len(doc)):
 
-            # Load the page
-            page = doc.load_page(page_number)
+def extract_pdf_rows(pdf_path, template, mode="words", metrics=None, start=0, stop=None, ocr=None,
+                     forms=None, layers=None, contents=None) -> list:
+    """
+    Extracts one row of text per page from a PDF file, or a range of its pages, using the coordinates in a form
+    template.
 
-            # Extract text from the PDF using the JSON template
-            data = extract_text_from_page(page, json_path)
+    Args:
+        pdf_path(str): The path to the PDF file.
+        template(FormTemplate): The compiled form template containing the coordinates.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+        metrics(ScanMetrics): Times the open, load_page and extract stages, None to not time them.
+        start(int): The index of the first page to extract.
+        stop(int): The index after the last page to extract, None for the end of the file.
+        ocr(OcrReader): Reads the boxes of pages without a text layer with OCR, None to leave them empty.
+        forms(FormIndex): Routes each page to the template of its form, pages that match no form are extracted with
+            `template`.
+        layers(list): Filled with the `PageLayer` of each page to store, None to not keep them.
+        contents(bytes): The file's contents if they have been read ahead, None to open it from its path.
 
-            # Populate the spreadsheet row with the extracted data for this page
-            populate_spreadsheet(data, pdf_name, sheet)
+    Returns:
+        rows(list): A tuple per page with the extracted text for each field, in template order. With a form index, a
+            (template path, tuple) pair per page instead, the path is None for pages extracted with `template`.
 
-    # If the PDF has only one page, process the page
-    else:
-        # Extract text from the PDF using the JSON template
-        data = extract_text_from_page(doc.load_page(0), json_path)
+    Raises:
+        Exception: If an error occurs extracting text from the PDF.
+    """
+
+    rows = []
+
+    if metrics is None:
+        metrics = ScanMetrics()
+
+    # the aligner of each template used in this document, which keeps its transforms for the document's pages
+    aligners = {}
+
+    # Open the PDF file, checking once whether it is a fillable form to read mapped fields from
+    with metrics.stage("open"):
+        doc = open_pdf(pdf_path, contents)
+        widget_reader = WidgetReader(doc)
+    try:
+        # Each page of a multi page PDF is a separate form
+        for page_number in range(start, len(doc) if stop is None else stop):
+            with metrics.stage("load_page"):
+                page = doc.load_page(page_number)
+
+            page_template, template_path, word_index = template, None, None
+            if forms is not None:
+                # the page's words are read once, to find its form and then to extract its boxes
+                with metrics.stage("classify"):
+                    word_index = WordIndex(page) if mode == "words" else None
+                    template_path, _ = forms.classify(page, word_index.words if word_index is not None else None)
+                    if template_path is not None:
+                        page_template = load_template(template_path)
+
+            with metrics.stage("extract"):
+                if layers is not None and word_index is None and mode == "words":
+                    # built here so the stored layer reuses the words the boxes are extracted from
+                    word_index = WordIndex(page)
+                boxes = aligned_boxes(page, page_template, aligners)
+                widget_values = None
+                if widget_reader.fillable and (page_template.widgets or layers is not None):
+                    # every form field is read for a stored layer, so a later template can map any of them
+                    widget_values = widget_reader.values(page, None if layers is not None else
+                                                         page_template.widget_names)
+                data = extract_text_from_page(page, page_template, mode, ocr, word_index, boxes, widget_values)
+            texts = tuple(item['text'] for item in data)
+            rows.append(texts if forms is None else (template_path, texts))
+            if layers is not None:
+                layers.append(PageLayer.from_page(page, word_index.words if word_index is not None else None,
+                                                  widget_values))
+    finally:
+        doc.close()
+
+    return rows
+
+
+def open_pdf(pdf_path, contents=None) -> pmu.Document:
+    """
+    Opens a PDF file from its contents if they have been read into memory, otherwise from its path.
+
+    Args:
+        pdf_path(str): The path to the PDF file.
+        contents(bytes): The file's contents, None to read them from the path.
+
+    Returns:
+        pmu.Document: The open document.
+
+    Raises:
+        Exception: If the file cannot be opened.
+    """
+
+    if contents is None:
+        return pmu.open(pdf_path)
+    return pmu.open(stream=contents, filetype="pdf")
 
-        # Populate the spreadsheet row with the extracted data for this page
-        populate_spreadsheet(data, pdf_name, sheet)
 
-    doc.close()
+def aligned_boxes(page, template, aligners):
+    """
+    Gets a template's boxes moved onto a page, if the template has a page size or anchors to line pages up with.
+
+    Args:
+        page(pmu.Page): The PDF page object.
+        template(FormTemplate): The compiled form template.
+        aligners(dict): The `PageAligner` of each template used in the page's document, keyed by template path.
+
+    Returns:
+        list: The `pmu.Rect` of each field on the page, or None to use the template's boxes as they are.
+
+    Raises:
+        None.
+    """
 
+    if template.page_size is None and not template.anchors:
+        return None
+    aligner = aligners.get(template.path)
+    if aligner is None or aligner.template is not template:
+        aligner = aligners[template.path] = PageAligner(template)
+    return aligner.boxes(page)
 
-def extract_text_from_page(pdf_page, json_path) -> list:
+
+def extract_text_from_page(pdf_page, template, mode="words", ocr=None, word_index=None, boxes=None,
+                           widget_values=None) -> list:
     """
-    Extracts text from a PDF file using the coordinates in a JSON file.
+    Extracts text from a PDF file using the coordinates in a form template.
 
     Args:
         pdf_page(pmu.Page): The PDF page object.
-        json_path(str): The path to the JSON file containing the coordinates.
+        template(FormTemplate): The compiled form template containing the coordinates.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+        ocr(OcrReader): Reads the boxes with OCR if the page has no text layer at all, None to leave them empty.
+        word_index(WordIndex): The page's word index if it has already been built, for the words mode.
+        boxes(list): The template's boxes moved onto this page by `aligned_boxes`, None to use them as they are.
+        widget_values(dict): The values of the page's form fields from `WidgetReader.values`, the fields mapped to one
+            of them are read from it instead of their box. None to read every field from its box.
 
     Returns:
         extracted_data(list): A list of dictionaries containing the extracted data.
 
     Raises:
+        ValueError: If the extraction mode is unknown.
         Exception: If an error occurs extracting text from the PDF.
     """
 
     # Initialize the list to store the extracted data for this page
     extracted_data = []
 
-    # Load the JSON file containing the coordinates of the fields to extract
-    with open(json_path, 'r') as file:
-        form_fields = json.load(file)
+    if mode not in EXTRACTION_MODES:
+        raise ValueError(f"Unknown extraction mode '{mode}', expected one of {EXTRACTION_MODES}")
+
+    # the fields of a fillable form that are mapped to its form fields are taken as typed, None for the rest
+    if boxes is None:
+        boxes = [field.rect for field in template.fields]
+    texts = widget_texts(template, widget_values) if widget_values else [None] * len(boxes)
+
+    if None in texts:
+        # read the page's text layer once for all boxes, or once per box with get_textbox
+        if mode == "words":
+            get_textbox = (word_index or WordIndex(pdf_page)).get_textbox
+        else:
+            get_textbox = pdf_page.get_textbox
 
-    # Get the boxes for the first page
-    boxes = form_fields["page number: 1"]
+        # cycle through the compiled boxes of the template and extract the text from the pdf for each box
+        texts = [get_textbox(rect) if text is None else text for rect, text in zip(boxes, texts)]
 
-    # cycle through the boxes in the json file and extract the text from the pdf for each box
-    for box in boxes:
-        name = box['name']
-        coords = box['coords']
-        # Convert coordinates to a PyMuPDF Rect object
-        pdf_rect = pmu.Rect(coords[0], coords[1], coords[2], coords[3])
+    # a scan or imported image has no text layer, read its boxes with OCR if it is turned on
+    if ocr is not None and not any(text.strip() for text in texts) and ocr.is_image_only(pdf_page):
+        texts = ocr.read_boxes(pdf_page, template, boxes)
 
-        text = pdf_page.get_textbox(pdf_rect).strip()
+    for field, text in zip(template.fields, texts):
         # Remove newline characters and excessive whitespace
         text = ' '.join(text.split())
-        extracted_data.append({'name': name, 'text': text})
+        extracted_data.append({'name': field.name, 'text': text})
 
     # # Print the extracted data in the specified format
     # for item in extracted_data:
@@ -311,115 +979,253 @@ def extract_text_from_page(pdf_page, json_path) -> list:
     return extracted_data
 
 
-# TODO: uncomment before production ************************************************************************************
-def populate_spreadsheet(fields, pdf_name, sheet) -> None:
+def build_parser() -> argparse.ArgumentParser:
     """
-    Populates a spreadsheet with the extracted data from a PDF file.
+    Builds the command line parser for the scanner.
 
     Args:
-        fields(list): A list of dictionaries containing the extracted data.
-        pdf_name(str): The name of the PDF file.
-        sheet(Worksheet): The Excel worksheet to populate with the extracted data.
+        N/A
 
     Returns:
+        argparse.ArgumentParser: The parser.
+
+    Raises:
         None
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Scan a folder of PDF files and extract their data to Excel. Any of --input, --output or "
+                    "--template that is not given is asked for with a dialog, give all three to run without a GUI.")
+    parser.add_argument("--input", metavar="FOLDER", help="folder to scan")
+    parser.add_argument("--output", metavar="FOLDER",
+                        help="folder for the scanned files, the workbook, its part files and the scan manifest")
+    parser.add_argument("--template", metavar="JSON", help="form template to extract with")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes to extract with, 0 to use every CPU core (default: 1)")
+    parser.add_argument("--mode", choices=EXTRACTION_MODES, default="words",
+                        help="read each page's words once (words) or call get_textbox per box (textbox)")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="parts",
+                        help="stream rows to CSV part files (parts) or append to the workbook in memory (xlsx)")
+    parser.add_argument("--no-compact", dest="compact", action="store_false",
+                        help="leave the CSV part files for a later 'python Spreadsheet_Writer.py' compaction")
+    parser.add_argument("--rescan", action="store_true",
+                        help="scan every file, even ones already scanned with this version of the template")
+    parser.add_argument("--max-depth", type=int, default=0,
+                        help="levels of subfolders to scan, 0 for only the selected folder, -1 for all (default: 0)")
+    parser.add_argument("--include", action="append", default=None, metavar="GLOB",
+                        help="file name or relative path glob to scan, may be repeated (default: *.pdf)")
+    parser.add_argument("--exclude", action="append", default=[], metavar="GLOB",
+                        help="file or folder name or relative path glob to skip, may be repeated")
+    parser.add_argument("--min-size", type=int, default=None, help="skip files smaller than this many bytes")
+    parser.add_argument("--max-size", type=int, default=None, help="skip files larger than this many bytes")
+    parser.add_argument("--modified-after", type=datetime.datetime.fromisoformat, default=None, metavar="DATE",
+                        help="only scan files modified after this ISO date/time")
+    parser.add_argument("--modified-before", type=datetime.datetime.fromisoformat, default=None, metavar="DATE",
+                        help="only scan files modified before this ISO date/time")
+    parser.add_argument("--order", choices=WALK_ORDERS, default="name",
+                        help="order files are scanned in within each folder (default: name)")
+    parser.add_argument("--profile", choices=PROFILERS, default=None,
+                        help="profile each file's extraction, saved to the 'profiles' folder of the output folder")
+    parser.add_argument("--shard-pages", type=int, default=SHARD_PAGES,
+                        help="with more than one worker, split files longer than this into shards of this many pages "
+                             f"extracted at the same time, 0 to never split (default: {SHARD_PAGES})")
+    parser.add_argument("--ocr", action="store_true",
+                        help="read pages without a text layer (scans, images) with Tesseract OCR, results are cached "
+                             "in the output folder")
+    parser.add_argument("--ocr-dpi", type=int, default=OCR_DPI,
+                        help=f"resolution the boxes are rendered at for OCR (default: {OCR_DPI})")
+    parser.add_argument("--ocr-language", default="eng", help="Tesseract language (default: eng)")
+    parser.add_argument("--tessdata", metavar="FOLDER", default=None,
+                        help="Tesseract language data folder, if TESSDATA_PREFIX is not set")
+    parser.add_argument("--forms", nargs="?", const=FORM_INDEX_PATH, default=None, metavar="INDEX",
+                        help="extract each page with the template of the form it matches in the form index built by "
+                             f"Form_Classifier.py, pages that match none use --template (default: {FORM_INDEX_PATH})")
+    parser.add_argument("--read-ahead", type=int, default=READ_AHEAD_BYTES // (1024 * 1024), metavar="MB",
+                        help="read upcoming files into memory while the current one is extracted, up to this many "
+                             f"megabytes, 0 to open each file from disk (default: {READ_AHEAD_BYTES // (1024 * 1024)})")
+    parser.add_argument("--keep-word-layers", action="store_true",
+                        help="store each page's words in the 'word_layers' folder of the output folder, to re-extract "
+                             "with another template later with 'python Word_Layer_Store.py'")
+    return parser
+
+
+def run_scan(to_scan_folder, scanned_folder, json_path, workers=1, mode="words", output_format="parts",
+             compact=True, rescan=False, walk_options=None, profiler=None, shard_pages=SHARD_PAGES,
+             ocr_options=None, forms_path=None, keep_word_layers=False, read_ahead_bytes=READ_AHEAD_BYTES,
+             progress=None, cancel=None, found=None) -> list:
+    """
+    Scans a folder and writes the extracted data to the workbook in the scanned folder, without any dialogs.
+
+    Args:
+        to_scan_folder(str): The path to the folder to scan.
+        scanned_folder(str): The folder for the scanned files, the workbook, its part files and the scan manifest.
+        json_path(str): The path to the form template JSON file.
+        workers(int): The number of processes to extract with, 0 to use every CPU core.
+        mode(str): The extraction mode, one of EXTRACTION_MODES.
+        output_format(str): The output backend, one of OUTPUT_FORMATS.
+        compact(bool): Whether to merge the CSV part files into the master workbook at the end of the run.
+        rescan(bool): Whether to scan every file, including the ones already recorded in the scan manifest.
+        walk_options(dict): Keyword arguments for `walk_folder`, None to scan the PDF files in the top folder.
+        profiler(str): One of PROFILERS to profile each file's extraction with, None to not profile.
+        shard_pages(int): With more than 1 worker, the pages per shard long files are split into, 0 to not split.
+        ocr_options(dict): Keyword arguments for `OcrReader` (dpi, language, tessdata) to read pages without a text
+            layer with OCR, None to leave them empty.
+        forms_path(str): The path to a form index to route each page to the template of its form, None to extract
+            every page with the template.
+        keep_word_layers(bool): Whether to store the word layer of each page in the 'word_layers' folder.
+        read_ahead_bytes(int): The most bytes of upcoming files read into memory ahead of extraction, 0 to open each
+            file from its path.
+        progress(Callable[[ScanMetrics, str, Exception], None]): Called after each file, see `process_files`.
+        cancel(threading.Event): Set to stop after the current file, the rows written so far are still saved and
+            compacted into the workbook.
+        found(Callable[[int, bool], None]): Called as the folder is listed ahead of the scan, see `queue_manager`.
+
+    Returns:
+        list: The paths of the files that failed to process.
+
+    Raises:
+        OSError: If the folder to scan cannot be read.
+        RuntimeError: If OCR is asked for but Tesseract cannot be found, or the form index has no forms.
+    """
+
+    os.makedirs(scanned_folder, exist_ok=True)
+    master_path = os.path.join(scanned_folder, "scanned_data.xlsx")
+    parts_folder = os.path.join(scanned_folder, "parts")
+
+    # Time each stage of the run, reported in the 'reports' folder at the end
+    metrics = ScanMetrics(profiler, os.path.join(scanned_folder, "profiles"))
+
+    # Compile the form template once for the whole run
+    template = load_template(json_path)
+
+    # Set up OCR before anything is opened, so a missing Tesseract stops the run straight away
+    ocr = None
+    if ocr_options is not None:
+        ocr = OcrReader(os.path.join(scanned_folder, "ocr_cache.sqlite"), **ocr_options)
+
+    # Load the form fingerprints once, the workers load their own copy from the same file
+    forms = None
+    if forms_path is not None:
+        forms = FormIndex.load(forms_path)
+        if not forms.entries:
+            raise RuntimeError(f"The form index '{forms.path}' has no forms, add them with 'python Form_Classifier.py "
+                               f"add TEMPLATE SAMPLE.pdf'")
+
+    # Open the store of word layers to re-extract from later
+    word_layers = WordLayerStore(os.path.join(scanned_folder, "word_layers")) if keep_word_layers else None
+
+    # Open the writer, CSV part files streamed to disk or the existing workbook in memory
+    writer = open_writer(output_format, master_path, parts_folder)
+
+    # Open the record of files already scanned, kept next to the workbook
+    manifest = ScanManifest(os.path.join(scanned_folder, "scan_manifest.sqlite"))
+
+    # Process the files in the folder through the queue manager
+    try:
+        failed = queue_manager(to_scan_folder, scanned_folder, template, writer, workers or os.cpu_count(), mode,
+                               None if rescan else manifest, walk_options, metrics, shard_pages, ocr, forms,
+                               word_layers, read_ahead_bytes, progress, cancel, found)
+    finally:
+        # Save the workbook or close the last part file, keeping the rows written before any crash
+        with metrics.stage("save"):
+            writer.close()
+        manifest.close()
+
+    # Merge the part files into the master workbook
+    if output_format == "parts" and compact:
+        with metrics.stage("compact"):
+            compact_parts(parts_folder, master_path)
+    print("Data added to the spreadsheet")
+    metrics.write_report(os.path.join(scanned_folder, "reports"))
+    return failed
+
+
+def scan_options(args) -> dict:
+    """
+    Turns the parsed command line options, other than the folders and template, into keyword arguments for `run_scan`.
+
+    Args:
+        args(argparse.Namespace): The options parsed by `build_parser`, `build_parser().parse_args([])` for the
+            defaults.
+
+    Returns:
+        dict: The keyword arguments.
 
     Raises:
-        Exception: If an error occurs populating the spreadsheet.
-    """
-
-    # Define the hyperlink font style
-    hyper_link_font = Font(color=colors.BLUE, underline='single')
-
-    # Create full file path for hyperlink to the original file
-    pdf_name = pdf_name.replace(" ", "_")
-    # TODO: uncomment before production *******************************************************************************
-    # folder = os.path.abspath("./Scanned")
-    folder = os.path.abspath("./To Scan")
-    pdf_link_name = os.path.join(folder, pdf_name)
-
-    # Check if the sheet already has headers
-    if sheet.dimensions == "A1:A1":
-        # Add headers
-        headers = ["filename"] + [item['name'] for item in fields]
-        sheet.append(headers)
-
-    # Add extracted field data to the sheet
-    row = ['=HYPERLINK("{}","{}")'.format(pdf_link_name, pdf_name),
-           # Document name with hyperlink
-           fields[0]['text'],  # Document number
-           fields[1]['text'],  # Nomenclature
-           fields[2]['text'],  # NSN
-           fields[3]['text'],  # UI
-           fields[4]['text'],  # QTY
-           re.sub(' ', '.', fields[5]['text']),  # Unit Price, replace space with decimal
-           re.sub(' ', '.', fields[6]['text']),  # Total Price, replace space with decimal
-           fields[7]['text'],  # Disposal Authorization Code
-           fields[8]['text'],  # DEMIL Code
-           fields[9]['text'],  # Supply Condition Code
-           fields[10]['text'],  # Shipped From
-           fields[11]['text'],  # Shipped To
-           fields[12]['text'],  # POC name
-           re.sub('Phone ', '', fields[13]['text']),  # POC Phone, strip 'Phone ' from the beginning
-           re.sub('Email ', '', fields[14]['text']),  # POC Email, strip 'Email ' from the beginning
-           ]
-
-    # Append the row to the sheet
-    sheet.append(row)
-    # Get the current row count to allow styling of the hyperlink
-    count = int(sheet.dimensions[4:])
-    # Apply hyperlink style to the pdf link
-    sheet.cell(row=count, column=1).font = hyper_link_font
-
-    print(f"Data from {pdf_name} added to the spreadsheet")
-
-
-def main() -> None:
+        None.
+    """
+
+    walk_options = {
+        "include": args.include or ["*.pdf"],
+        "exclude": args.exclude,
+        "max_depth": None if args.max_depth < 0 else args.max_depth,
+        "min_size": args.min_size,
+        "max_size": args.max_size,
+        "modified_after": args.modified_after.timestamp() if args.modified_after else None,
+        "modified_before": args.modified_before.timestamp() if args.modified_before else None,
+        "order": args.order,
+    }
+
+    ocr_options = None
+    if args.ocr:
+        ocr_options = {"dpi": args.ocr_dpi, "language": args.ocr_language, "tessdata": args.tessdata}
+
+    return {
+        "workers": args.workers,
+        "mode": args.mode,
+        "output_format": args.output_format,
+        "compact": args.compact,
+        "rescan": args.rescan,
+        "walk_options": walk_options,
+        "profiler": args.profile,
+        "shard_pages": args.shard_pages,
+        "ocr_options": ocr_options,
+        "forms_path": args.forms,
+        "keep_word_layers": args.keep_word_layers,
+        "read_ahead_bytes": args.read_ahead * 1024 * 1024,
+    }
+
+
+def main(argv=None) -> int:
     """
     Main function to scan a folder and extract data from PDF files.
 
+    Folders and the template not given on the command line are asked for with dialogs; tkinter is only loaded then.
+
     Args:
-        N/A
+        argv(list): The command line arguments, None to use sys.argv. main.py passes [] to ask for everything.
 
     Returns:
-        None
+        int: The exit code, 2 if the scan could not start, 1 if any file failed to process, otherwise 0.
 
     Raises:
         None
     """
 
-    # Select the folder to scan
-    to_scan_folder = open_folder_dialog("Select Folder to Scan", "./To Scan")
+    args = build_parser().parse_args(argv)
 
-    # Open the existing workbook or create a new one if it doesn't exist
-    if os.path.exists("./Scanned/scanned_data.xlsx"):
-        # Load the existing workbook
-        workbook = openpyxl.load_workbook("./Scanned/scanned_data.xlsx")
-        sheet = workbook.active
-    else:
-        # Create a new workbook and select the active worksheet
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
+    # Select the folder to scan
+    to_scan_folder = args.input or open_folder_dialog("Select Folder to Scan", "./To Scan")
 
     # TODO: make output folder READ ONLY at the end of process to prevent accidental deletion? Can do this with group
     #  membership and permissions but can we rely on what OS and permissions user has? Same issue with making the folder
     #  hidden and read only for the form template folder as well.
     # Select the folder to save the scanned files to
-    scanned_folder = open_folder_dialog("Select Folder to Save Scanned Files to", "./Scanned")
+    scanned_folder = args.output or open_folder_dialog("Select Folder to Save Scanned Files to", "./Scanned")
 
     # Select the form template JSON
-    json_path = open_file_dialog("Select Form Template", [("JSON Files", "*.json")],
-                                 "./Form Templates")
-
-    # Process the files in the folder through the queue manager
-    queue_manager(to_scan_folder, scanned_folder, json_path, sheet)
+    json_path = args.template or open_file_dialog("Select Form Template", [("JSON Files", "*.json")],
+                                                  "./Form Templates")
 
-    # Save the workbook
-    workbook.save("./Scanned/scanned_data.xlsx")
-    print("Data added to the spreadsheet")
-    workbook.close()
+    try:
+        failed = run_scan(to_scan_folder, scanned_folder, json_path, **scan_options(args))
+    except RuntimeError as e:
+        # e.g. --ocr without Tesseract installed, or an empty form index
+        print(e)
+        return 2
+    return 1 if failed else 0
 
 
 if __name__ == '__main__':
 
-    main()
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+    File: Scan_Manifest.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Scan Manifest
+
+    A persistent record of the files that have already been scanned, kept in a SQLite file next to the master workbook.
+    Files are keyed by the hash of their contents and the hash of the form template they were scanned with, so a file is
+    only extracted again if it is new, has changed, or was scanned with an older version of the template.
+
+        Features
+
+        - Content Hashes: Files are identified by the SHA-256 of their contents, not their name or location.
+        - Template Versions: A new version of a form template re-scans the files scanned with the old one.
+        - Hash Cache: The hash of each path is cached with its size and modification time so unchanged files are not
+          read again just to be hashed.
+        - Constant Time Checks: Both tables are loaded into memory when the manifest is opened.
+
+        Refs
+
+        - https://docs.python.org/3/library/sqlite3.html
+        - https://docs.python.org/3/library/hashlib.html
+"""
+
+import os
+import sqlite3
+import hashlib
+import datetime
+
+
+MANIFEST_PATH = "./Scanned/scan_manifest.sqlite"
+
+
+def hash_file(path) -> str:
+    """
+    Hashes the contents of a file.
+
+    Args:
+        path(str): The path to the file.
+
+    Returns:
+        str: The SHA-256 hex digest of the file.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ScanManifest:
+    """
+    The record of scanned files, stored in SQLite and held in memory for lookups.
+
+    Attributes:
+        path(str): The path to the SQLite file.
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._db = sqlite3.connect(path)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS scanned (
+                                content_hash TEXT NOT NULL,
+                                template_hash TEXT NOT NULL,
+                                file_name TEXT NOT NULL,
+                                pages INTEGER NOT NULL,
+                                scanned_at TEXT NOT NULL,
+                                PRIMARY KEY (content_hash, template_hash))""")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS file_hashes (
+                                path TEXT PRIMARY KEY,
+                                size INTEGER NOT NULL,
+                                mtime_ns INTEGER NOT NULL,
+                                content_hash TEXT NOT NULL)""")
+        self._db.commit()
+
+        # load both tables so each lookup during a scan is a set or dict lookup
+        self._scanned = set(self._db.execute("SELECT content_hash, template_hash FROM scanned"))
+        self._file_hashes = {path: (size, mtime_ns, content_hash) for path, size, mtime_ns, content_hash
+                             in self._db.execute("SELECT path, size, mtime_ns, content_hash FROM file_hashes")}
+
+    def cached_hash(self, file_path):
+        """
+        Gets the hash of a file's contents if it is cached and the file's size and modification time are unchanged.
+
+        Args:
+            file_path(str): The path to the file.
+
+        Returns:
+            str: The SHA-256 hex digest of the file, None if it is not cached or the file has changed.
+
+        Raises:
+            OSError: If the file cannot be found.
+        """
+
+        stat = os.stat(file_path)
+        cached = self._file_hashes.get(os.path.abspath(file_path))
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        return None
+
+    def content_hash(self, file_path, content_hash=None) -> str:
+        """
+        Gets the hash of a file's contents, only reading the file if its size or modification time has changed.
+
+        Args:
+            file_path(str): The path to the file.
+            content_hash(str): The hash of the file's contents if it is already known, e.g. from the bytes read ahead,
+                so the file is not read again.
+
+        Returns:
+            str: The SHA-256 hex digest of the file.
+
+        Raises:
+            OSError: If the file cannot be read.
+        """
+
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+
+        cached = self._file_hashes.get(file_path)
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        if content_hash is None:
+            content_hash = hash_file(file_path)
+        self._file_hashes[file_path] = (stat.st_size, stat.st_mtime_ns, content_hash)
+        self._db.execute("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?)",
+                         (file_path, stat.st_size, stat.st_mtime_ns, content_hash))
+        self._db.commit()
+        return content_hash
+
+    def is_scanned(self, content_hash, template_hash) -> bool:
+        """
+        Checks if a file has already been scanned with a version of a form template.
+
+        Args:
+            content_hash(str): The hash of the file's contents.
+            template_hash(str): The content hash of the form template.
+
+        Returns:
+            bool: True if the file's rows have already been written with this template.
+
+        Raises:
+            None.
+        """
+
+        return (content_hash, template_hash) in self._scanned
+
+    def record(self, content_hash, template_hash, file_name, pages) -> None:
+        """
+        Records a file as scanned, call once its rows have been written to disk.
+
+        Args:
+            content_hash(str): The hash of the file's contents.
+            template_hash(str): The content hash of the form template.
+            file_name(str): The name of the file, for reference.
+            pages(int): The number of rows written for the file.
+
+        Returns:
+            None
+
+        Raises:
+            sqlite3.Error: If the manifest cannot be written.
+        """
+
+        self._db.execute("INSERT OR REPLACE INTO scanned VALUES (?, ?, ?, ?, ?)",
+                         (content_hash, template_hash, file_name, pages, datetime.datetime.now().isoformat()))
+        self._db.commit()
+        self._scanned.add((content_hash, template_hash))
+
+    def close(self) -> None:
+        """
+        Closes the manifest database.
+
+        Returns:
+            None
+
+        Raises:
+            None.
+        """
+
+        self._db.close()
@@ -0,0 +1,375 @@
+"""
+    File: Scan_Metrics.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Scan Metrics
+
+    Timing and throughput instrumentation for the scan pipeline. Each stage of a scan (waiting for a file to be read,
+    opening the PDF, loading a page, finding its form, extracting the boxes, writing rows, flushing, saving the
+    workbook) is timed into a histogram, worker processes send their histograms back with their rows, and the run ends
+    with a JSON report and a one line summary.
+
+        Features
+
+        - Stage Histograms: Count, total, min, max and approximate percentiles per stage, in power of two buckets.
+        - Throughput: Files and pages per second for the whole run.
+        - Profiling: Optional cProfile or pyinstrument capture of each file's extraction.
+        - Run Report: A machine-readable JSON report plus a summary line.
+
+        Refs
+
+        - https://docs.python.org/3/library/time.html#time.perf_counter
+        - https://docs.python.org/3/library/profile.html
+        - https://pyinstrument.readthedocs.io/
+"""
+
+import os
+import json
+import time
+import datetime
+
+from contextlib import contextmanager
+
+
+# Stages of a scan, in pipeline order
+STAGES = ("read", "open", "load_page", "classify", "extract", "postprocess", "write", "flush", "store_layers", "save",
+          "compact")
+
+# Profilers that can be run on each file's extraction; pyinstrument is only needed if it is chosen
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class StageHistogram:
+    """
+    A histogram of the durations of one stage, bucketed by powers of two microseconds.
+
+    Attributes:
+        count(int): The number of durations added.
+        total(float): The sum of the durations in seconds.
+        min(float): The shortest duration in seconds.
+        max(float): The longest duration in seconds.
+        buckets(dict): The number of durations in each bucket, keyed by the bucket's upper bound in microseconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = {}
+
+    def add(self, seconds) -> None:
+        """
+        Adds a duration.
+
+        Args:
+            seconds(float): The duration in seconds.
+
+        Returns:
+            None
+
+        Raises:
+            None.
+        """
+
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        upper = 1 << max(0, int(seconds * 1e6)).bit_length()
+        self.buckets[upper] = self.buckets.get(upper, 0) + 1
+
+    def merge(self, state) -> None:
+        """
+        Adds the durations of another histogram, given as its `state()`.
+
+        Args:
+            state(dict): The state of the other histogram.
+
+        Returns:
+            None
+
+        Raises:
+            None.
+        """
+
+        if not state["count"]:
+            return
+        self.count += state["count"]
+        self.total += state["total"]
+        self.min = state["min"] if self.min is None else min(self.min, state["min"])
+        self.max = max(self.max, state["max"])
+        for upper, count in state["buckets"].items():
+            self.buckets[int(upper)] = self.buckets.get(int(upper), 0) + count
+
+    def state(self) -> dict:
+        """
+        Gets the histogram as plain data that can be sent between processes.
+
+        Returns:
+            dict: The count, total, min, max and buckets.
+
+        Raises:
+            None.
+        """
+
+        return {"count": self.count, "total": self.total, "min": self.min, "max": self.max,
+                "buckets": dict(self.buckets)}
+
+    def percentile(self, fraction) -> float:
+        """
+        Gets the upper bound of the bucket a percentile falls in.
+
+        Args:
+            fraction(float): The percentile as a fraction, e.g. 0.9.
+
+        Returns:
+            float: The percentile in seconds, rounded up to its bucket, or 0 if the histogram is empty.
+
+        Raises:
+            None.
+        """
+
+        target = fraction * self.count
+        seen = 0
+        for upper in sorted(self.buckets):
+            seen += self.buckets[upper]
+            if seen >= target:
+                return min(upper / 1e6, self.max)
+        return self.max
+
+    def report(self) -> dict:
+        """
+        Gets the histogram's statistics in milliseconds for the run report.
+
+        Returns:
+            dict: The count, total, mean, min, max, p50, p90 and p99, plus the bucket counts.
+
+        Raises:
+            None.
+        """
+
+        def ms(seconds):
+            return round(seconds * 1000, 3)
+
+        return {
+            "count": self.count,
+            "total_ms": ms(self.total),
+            "mean_ms": ms(self.total / self.count) if self.count else 0,
+            "min_ms": ms(self.min or 0),
+            "max_ms": ms(self.max),
+            "p50_ms": ms(self.percentile(0.5)),
+            "p90_ms": ms(self.percentile(0.9)),
+            "p99_ms": ms(self.percentile(0.99)),
+            "histogram_us": {f"<={upper}": self.buckets[upper] for upper in sorted(self.buckets)},
+        }
+
+
+class ScanMetrics:
+    """
+    The stage timings and counters of a scan run.
+
+    Attributes:
+        stages(dict): A `StageHistogram` per stage name.
+        files(int): The number of files written.
+        pages(int): The number of pages written.
+        failed(int): The number of files that failed.
+        profiler(str): One of PROFILERS to profile each file's extraction with, or None.
+        profile_dir(str): The folder profiles are saved to.
+    """
+
+    def __init__(self, profiler=None, profile_dir=None):
+        if profiler is not None and profiler not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{profiler}', expected one of {PROFILERS}")
+        self.stages = {name: StageHistogram() for name in STAGES}
+        self.files = 0
+        self.pages = 0
+        self.failed = 0
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self._started = time.perf_counter()
+        self._started_at = datetime.datetime.now()
+
+    def add(self, stage, seconds) -> None:
+        """
+        Adds a duration to a stage.
+
+        Args:
+            stage(str): The stage name.
+            seconds(float): The duration in seconds.
+
+        Returns:
+            None
+
+        Raises:
+            None.
+        """
+
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = StageHistogram()
+        histogram.add(seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        """
+        Times the block it wraps as one duration of a stage.
+
+        Args:
+            stage(str): The stage name.
+
+        Returns:
+            ContextManager: The timer.
+
+        Raises:
+            None.
+        """
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    @contextmanager
+    def profile(self, label):
+        """
+        Profiles the block it wraps with the chosen profiler and saves the profile, named after the label, to the
+        profile folder. Does nothing if no profiler was chosen.
+
+        Args:
+            label(str): The name of the profile, usually the file being extracted.
+
+        Returns:
+            ContextManager: The profiler.
+
+        Raises:
+            ImportError: If pyinstrument is chosen but not installed.
+        """
+
+        if self.profiler is None:
+            yield
+            return
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base_path = os.path.join(self.profile_dir, label.replace(" ", "_"))
+
+        if self.profiler == "cprofile":
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(base_path + ".prof")
+        else:
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(base_path + ".html", 'w', encoding='utf-8') as file:
+                    file.write(profiler.output_html())
+
+    def state(self) -> dict:
+        """
+        Gets the stage histograms as plain data, to send from a worker process back to the writer.
+
+        Returns:
+            dict: The state of each stage histogram that has durations.
+
+        Raises:
+            None.
+        """
+
+        return {name: histogram.state() for name, histogram in self.stages.items() if histogram.count}
+
+    def merge_state(self, state) -> None:
+        """
+        Adds the stage histograms of a worker, given as its `state()`.
+
+        Args:
+            state(dict): The state of the worker's metrics.
+
+        Returns:
+            None
+
+        Raises:
+            None.
+        """
+
+        for name, histogram_state in state.items():
+            self.stages.setdefault(name, StageHistogram()).merge(histogram_state)
+
+    def report(self) -> dict:
+        """
+        Gets the run report.
+
+        Returns:
+            dict: The run times, counters, throughput and the statistics of each stage.
+
+        Raises:
+            None.
+        """
+
+        elapsed = time.perf_counter() - self._started
+        return {
+            "started": self._started_at.isoformat(timespec="seconds"),
+            "finished": datetime.datetime.now().isoformat(timespec="seconds"),
+            "elapsed_s": round(elapsed, 3),
+            "files": self.files,
+            "pages": self.pages,
+            "failed": self.failed,
+            "files_per_s": round(self.files / elapsed, 2) if elapsed else 0,
+            "pages_per_s": round(self.pages / elapsed, 2) if elapsed else 0,
+            "stages": {name: histogram.report() for name, histogram in self.stages.items() if histogram.count},
+        }
+
+    def summary_line(self, report=None) -> str:
+        """
+        Gets a one line summary of the run.
+
+        Args:
+            report(dict): The run report, None to build it.
+
+        Returns:
+            str: The summary.
+
+        Raises:
+            None.
+        """
+
+        report = report or self.report()
+        stages = " ".join(f"{name}={stats['total_ms'] / 1000:.2f}s" for name, stats in report["stages"].items())
+        return (f"Scanned {report['files']} files ({report['pages']} pages, {report['failed']} failed) in "
+                f"{report['elapsed_s']:.2f}s: {report['pages_per_s']} pages/s, {report['files_per_s']} files/s | "
+                f"{stages}")
+
+    def write_report(self, report_dir) -> str:
+        """
+        Writes the run report as JSON and prints the summary line.
+
+        Args:
+            report_dir(str): The folder to write the report to.
+
+        Returns:
+            str: The path to the report.
+
+        Raises:
+            OSError: If the report cannot be written.
+        """
+
+        report = self.report()
+        os.makedirs(report_dir, exist_ok=True)
+        report_path = os.path.join(report_dir, f"run_report_{self._started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(report_path, 'w') as file:
+            json.dump(report, file, indent=4)
+
+        print(self.summary_line(report))
+        print(f"Run report saved to '{report_path}'")
+        return report_path
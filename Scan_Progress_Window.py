@@ -0,0 +1,321 @@
+"""
+    File: Scan_Progress_Window.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Scan Progress Window
+
+    Runs a folder scan in a background thread and shows its progress in a Tk window, so the app stays responsive for
+    the whole batch instead of freezing until the last file is done. The scan thread sends events through a
+    thread-safe queue that the window reads on the Tk event loop; Tk itself is only ever touched from the main thread.
+
+        Features
+
+        - Progress: Files and pages done out of the files found, with a progress bar. The folder is listed in a
+          thread ahead of the scan, so the scan starts straight away and the total grows until the listing is done.
+        - Throughput and ETA: Pages and files per second, and the time left at the rate so far once every file has
+          been found. Files that were already scanned are skipped quickly, so the ETA is an upper bound.
+        - Failures: The number of failed files and the last error, the full list is in '_failed_files.log' in the
+          folder being scanned, whose path is shown when the scan ends.
+        - Cancel: Stops after the current file. The rows of the files done so far are saved and merged into the
+          workbook, and the files not done stay in the folder to scan next time.
+
+        Usage
+
+        - From main.py's "Scan Folder and Extract Data" button.
+        - python Scan_Progress_Window.py (asks for the folders and template, then shows the window)
+
+        Refs
+
+        - https://docs.python.org/3/library/queue.html
+        - https://docs.python.org/3/library/tkinter.ttk.html#progressbar
+"""
+
+import os
+import sys
+import queue
+import threading
+import tkinter as tk
+
+from tkinter import filedialog, messagebox, ttk
+from Scan_Folder_Extract_Data import build_parser, run_scan, scan_options
+
+
+# How often the window reads the scan thread's events, in milliseconds
+POLL_INTERVAL_MS = 100
+
+
+def format_duration(seconds) -> str:
+    """
+    Formats a duration for display.
+
+    Args:
+        seconds(float): The duration.
+
+    Returns:
+        str: e.g. '45s', '12m 05s' or '2h 03m'.
+
+    Raises:
+        None.
+    """
+
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+
+
+class ScanProgressWindow(tk.Toplevel):
+    """
+    A window that runs one folder scan in a background thread and shows its progress.
+
+    Attributes:
+        events(queue.Queue): The scan thread's events, (kind, data) tuples read on the Tk thread.
+        cancel_event(threading.Event): Set to stop the scan after the current file.
+    """
+
+    def __init__(self, master, to_scan_folder, scanned_folder, json_path, options=None, on_close_callback=None):
+        super().__init__(master)
+        self.title("Scanning")
+        self.geometry("460x230")
+        self.resizable(False, False)
+
+        self.to_scan_folder = to_scan_folder
+        self.scanned_folder = scanned_folder
+        self.json_path = json_path
+        self.options = options if options is not None else scan_options(build_parser().parse_args([]))
+        self.on_close_callback = on_close_callback
+
+        self.events = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.total_files = None
+        # the files found by the listing so far, read on the Tk thread with the events
+        self.found_files = 0
+        self.last_progress = None
+        self.running = True
+        self.close_when_done = False
+
+        self.create_widgets()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.worker = threading.Thread(target=self.run_scan_thread, name="folder-scan", daemon=True)
+        self.worker.start()
+        self.after(POLL_INTERVAL_MS, self.poll_events)
+
+    def create_widgets(self):
+        frame = tk.Frame(self, padx=12, pady=12)
+        frame.pack(fill=tk.BOTH, expand=True)
+
+        self.status_label = tk.Label(frame, text="Finding files...", anchor="w")
+        self.status_label.pack(fill=tk.X)
+
+        self.progress_bar = ttk.Progressbar(frame, mode="indeterminate", length=420)
+        self.progress_bar.pack(fill=tk.X, pady=8)
+        self.progress_bar.start()
+
+        self.counts_label = tk.Label(frame, text="Files: 0   Pages: 0   Failed: 0", anchor="w")
+        self.counts_label.pack(fill=tk.X)
+        self.rate_label = tk.Label(frame, text="Throughput: -   ETA: -", anchor="w")
+        self.rate_label.pack(fill=tk.X)
+        self.error_label = tk.Label(frame, text="", anchor="w", fg="red", wraplength=420, justify="left")
+        self.error_label.pack(fill=tk.X)
+
+        self.cancel_button = tk.Button(frame, text="Cancel", command=self.cancel)
+        self.cancel_button.pack(side=tk.RIGHT, pady=(8, 0))
+
+    def run_scan_thread(self):
+        # Runs in the scan thread: only puts events on the queue, never touches Tk
+        try:
+            failed = run_scan(self.to_scan_folder, self.scanned_folder, self.json_path, **self.options,
+                              progress=self.report_progress, cancel=self.cancel_event, found=self.report_found)
+            self.events.put(("done", {"failed": len(failed), "cancelled": self.cancel_event.is_set()}))
+        except Exception as e:
+            self.events.put(("error", str(e)))
+
+    def report_found(self, count, done):
+        # Called by the scan's folder listing, in its own thread, for each file found and once it is done
+        self.events.put(("total" if done else "found", count))
+
+    def report_progress(self, metrics, file_path, error):
+        # Called by the scan after each file, in the scan thread
+        report = metrics.report()
+        self.events.put(("progress", {
+            "files": report["files"],
+            "pages": report["pages"],
+            "failed": report["failed"],
+            "elapsed_s": report["elapsed_s"],
+            "file": file_path,
+            "error": None if error is None else str(error),
+        }))
+
+    def poll_events(self):
+        # Reads every event waiting on the queue, on the Tk thread
+        found = None
+        while True:
+            try:
+                kind, data = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "found":
+                # only the latest count is shown, a large folder finds thousands of files between polls
+                found = data
+            elif kind == "total":
+                self.show_total(data)
+            elif kind == "progress":
+                self.show_progress(data)
+            elif kind == "done":
+                self.show_done(data)
+            elif kind == "error":
+                self.show_error(data)
+        if found is not None and self.total_files is None:
+            self.show_found(found)
+        if self.running:
+            self.after(POLL_INTERVAL_MS, self.poll_events)
+
+    def show_found(self, found):
+        self.found_files = found
+        if self.last_progress is None:
+            self.status_label.configure(text=f"Scanning, {found} files found so far...")
+        else:
+            self.show_counts(self.last_progress)
+
+    def show_total(self, total):
+        self.total_files = total
+        self.found_files = total
+        self.progress_bar.stop()
+        # the scan has already been going while the folder was listed
+        handled = self.last_progress["files"] + self.last_progress["failed"] if self.last_progress else 0
+        self.progress_bar.configure(mode="determinate", maximum=max(total, 1), value=handled)
+        if self.last_progress is None:
+            self.status_label.configure(text=f"Scanning {total} files...")
+        else:
+            self.show_counts(self.last_progress)
+
+    def show_progress(self, progress):
+        self.last_progress = progress
+        handled = progress["files"] + progress["failed"]
+        elapsed = progress["elapsed_s"]
+        self.progress_bar.configure(value=handled)
+        self.show_counts(progress)
+
+        throughput = "-"
+        eta = "-"
+        if elapsed > 0 and handled:
+            throughput = f"{progress['pages'] / elapsed:.1f} pages/s, {progress['files'] / elapsed:.1f} files/s"
+            if self.total_files is not None:
+                eta = format_duration(max(self.total_files - handled, 0) * elapsed / handled)
+        self.rate_label.configure(text=f"Throughput: {throughput}   ETA: {eta}")
+
+        if not self.cancel_event.is_set():
+            self.status_label.configure(text=f"Done: {progress['file']}")
+        if progress["error"] is not None:
+            self.error_label.configure(text=f"Failed: {progress['file']}: {progress['error']}")
+
+    def show_counts(self, progress):
+        # the total is the files found so far with a '+' until the whole folder has been listed
+        if self.total_files is not None:
+            total = f"/{self.total_files}"
+        else:
+            total = f"/{self.found_files}+" if self.found_files else ""
+        self.counts_label.configure(text=f"Files: {progress['files']}{total}   Pages: {progress['pages']}   "
+                                         f"Failed: {progress['failed']}")
+
+    def show_done(self, result):
+        self.running = False
+        if self.close_when_done:
+            self.close()
+            return
+        self.progress_bar.stop()
+        status = "Cancelled" if result["cancelled"] else "Finished"
+        self.status_label.configure(text=f"{status}, the data is saved to the spreadsheet")
+        if result["failed"]:
+            log_path = os.path.abspath(os.path.join(self.to_scan_folder, "_failed_files.log"))
+            self.error_label.configure(text=f"{result['failed']} files failed, see '{log_path}'")
+        self.cancel_button.configure(text="Close", state=tk.NORMAL, command=self.close)
+
+    def show_error(self, message):
+        self.running = False
+        self.progress_bar.stop()
+        self.status_label.configure(text="The scan could not run")
+        self.error_label.configure(text=message)
+        self.cancel_button.configure(text="Close", state=tk.NORMAL, command=self.close)
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.cancel_button.configure(state=tk.DISABLED)
+        self.status_label.configure(text="Cancelling after the current file...")
+
+    def on_close(self):
+        # closing while the scan runs cancels it; the window closes once the rows are saved
+        if self.running:
+            if messagebox.askyesno("Cancel Scan", "Stop the scan after the current file?", parent=self):
+                self.close_when_done = True
+                self.cancel()
+            return
+        self.close()
+
+    def close(self):
+        self.destroy()
+        if self.on_close_callback:
+            self.on_close_callback()
+
+
+def ask_scan_paths(parent=None):
+    """
+    Asks for the folder to scan, the folder for the scanned files and the form template.
+
+    Args:
+        parent(tk.Misc): The window the dialogs belong to.
+
+    Returns:
+        tuple: (to_scan_folder, scanned_folder, json_path), or None if any dialog was cancelled.
+
+    Raises:
+        None.
+    """
+
+    to_scan_folder = filedialog.askdirectory(parent=parent, initialdir="./To Scan", title="Select Folder to Scan",
+                                             mustexist=True)
+    if not to_scan_folder:
+        return None
+    scanned_folder = filedialog.askdirectory(parent=parent, initialdir="./Scanned",
+                                             title="Select Folder to Save Scanned Files to")
+    if not scanned_folder:
+        return None
+    json_path = filedialog.askopenfilename(parent=parent, initialdir="./Form Templates", title="Select Form Template",
+                                           filetypes=[("JSON Files", "*.json")])
+    if not json_path:
+        return None
+    return to_scan_folder, scanned_folder, json_path
+
+
+def main() -> None:
+    """
+    Asks for the folders and template, then scans with a progress window.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+
+    root = tk.Tk()
+    root.withdraw()
+    paths = ask_scan_paths(root)
+    if paths is None:
+        return
+    ScanProgressWindow(root, *paths, on_close_callback=root.destroy)
+    root.mainloop()
+
+
+if __name__ == '__main__':
+
+    main()
+    sys.exit(0)
@@ -0,0 +1,746 @@
+"""
+    File: Spreadsheet_Writer.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Spreadsheet Writer
+
+    Output backends for the rows extracted by the scanner. The 'xlsx' backend keeps the original behaviour of loading
+    the master workbook, appending to it in memory and saving it at the end of the run. The 'parts' backend streams the
+    rows to CSV part files as they are produced and flushes them to disk after every file, so memory stays flat and a
+    crash only loses the file being processed. A separate compaction step merges the part files into the master workbook
+    with openpyxl's read-only and write-only modes.
+
+        Features
+
+        - Streaming Output: Rows are written to CSV part files and flushed to disk after every scanned file.
+        - Part Rotation: A new part file is started every `rows_per_part` rows.
+        - Closed Parts Only: A part file is written under a '.open' name and renamed to its '.csv' name when it is
+          closed, so compaction never merges a part another process is still writing. The parts of a writer that
+          crashed are picked up once its lock file is no longer held.
+        - Compaction: Merges the part files into the master workbook without loading it into memory.
+        - Safe To Repeat: One compaction runs at a time per parts folder, and a journal of the merged parts is written
+          before the new workbook is swapped in, so a crash part way through never merges the same rows twice.
+        - Name-Keyed Columns: Rows are placed in the run's columns by field name, not position, so one writer takes
+          rows from any mix of form templates. The column order is fixed by the first template seen, a template with
+          new fields adds them at the end.
+        - New Columns: A master workbook from before a column was added (e.g. 'Validation') gets the new header and
+          keeps its old rows as they are, compaction matches every part file to the master's columns by name.
+
+        Usage
+
+        - python Spreadsheet_Writer.py [parts folder] [master workbook]  (compacts the part files)
+
+        Refs
+
+        - https://openpyxl.readthedocs.io/en/stable/optimized.html
+        - https://docs.python.org/3/library/csv.html
+"""
+
+import os
+import sys
+import csv
+import glob
+import json
+import datetime
+import itertools
+import openpyxl
+
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, NamedStyle, colors
+
+try:
+    import msvcrt
+except ImportError:
+    # not Windows, lock with flock instead
+    msvcrt = None
+    import fcntl
+
+
+SCANNED_DATA_PATH = "./Scanned/scanned_data.xlsx"
+PARTS_FOLDER = "./Scanned/parts"
+
+# Named style shared by every hyperlink cell in the filename column
+LINK_STYLE_NAME = "PDF Link"
+
+# Output backends: 'parts' streams rows to CSV part files, 'xlsx' appends to the master workbook in memory
+OUTPUT_FORMATS = ("parts", "xlsx")
+
+# Suffix a part file is written under until it is closed, compaction only merges parts without it
+OPEN_PART_SUFFIX = ".open"
+
+# Held by the compaction running in a parts folder, and the parts it has swapped into the workbook but not yet removed
+COMPACT_LOCK_NAME = "compact.lock"
+COMPACT_JOURNAL_NAME = "compact.journal"
+
+# Numbers the part writers of this process, so two started in the same second never share a run id or lock file
+_writer_numbers = itertools.count()
+
+
+def _open_lock(path):
+    """
+    Opens a lock file and takes an exclusive lock on it without waiting. The lock is dropped by the OS if the process
+    ends, so a lock that can be taken belongs to no running process. Lock files are removed when they are released,
+    so a lock taken on a file that has been removed in the meantime is given up and taken on a new file.
+
+    Args:
+        path(str): The path to the lock file, created if it does not exist.
+
+    Returns:
+        file: The open, locked file to pass to `_release_lock`, or None if another process holds the lock.
+
+    Raises:
+        OSError: If the lock file cannot be opened.
+    """
+
+    while True:
+        file = open(path, 'a+b')
+        try:
+            if msvcrt is not None:
+                # an open file cannot be removed on Windows, so the file locked is always the one at the path
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                return file
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            file.close()
+            return None
+        try:
+            if os.path.samestat(os.fstat(file.fileno()), os.stat(path)):
+                return file
+        except FileNotFoundError:
+            pass
+        # the holder released and removed the file between opening and locking it
+        file.close()
+
+
+def _release_lock(file, remove=False) -> None:
+    # Releases a lock taken with _open_lock and closes it, removing the lock file if asked. Elsewhere the file is
+    #  removed while still locked, so a process that locks it after it is closed sees it is gone; Windows cannot
+    #  remove an open file, and one another process has opened is left to whoever takes it next
+    if remove and msvcrt is None:
+        _remove_lock_file(file.name)
+    if msvcrt is not None:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    file.close()
+    if remove and msvcrt is not None:
+        _remove_lock_file(file.name)
+
+
+def _remove_lock_file(path) -> None:
+    # Removes a lock file, which may already be gone or be open in another process
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def build_row(fields, pdf_name, template) -> list:
+    """
+    Builds a spreadsheet row for one page of processed data.
+
+    Args:
+        fields(tuple): The cleaned text for each field followed by the validation message, from
+            `FormTemplate.process_block`.
+        pdf_name(str): The name of the PDF file.
+        template(FormTemplate): The compiled form template the data was extracted with.
+
+    Returns:
+        list: The hyperlink to the PDF followed by the values of the row.
+
+    Raises:
+        None.
+    """
+
+    # Create full file path for hyperlink to the original file
+    pdf_name = pdf_name.replace(" ", "_")
+    # TODO: uncomment before production *******************************************************************************
+    # folder = os.path.abspath("./Scanned")
+    folder = os.path.abspath("./To Scan")
+    pdf_link_name = os.path.join(folder, pdf_name)
+
+    # Add extracted field data to the sheet, document name with hyperlink first, then each field as cleaned by the
+    #  template's block processing (e.g. Unit Price '12000 00' -> '12000.00') and the validation message
+    row = ['=HYPERLINK("{}","{}")'.format(pdf_link_name, pdf_name)]
+    row += fields
+    return row
+
+
+def header_row(template) -> list:
+    """
+    Gets the spreadsheet header for the rows of a form template.
+
+    Args:
+        template(FormTemplate): The compiled form template.
+
+    Returns:
+        list: 'filename' followed by the template's column names.
+
+    Raises:
+        None.
+    """
+
+    return ["filename"] + template.column_names
+
+
+class RowSchema:
+    """
+    The columns of the rows of a run, by name, in the order they were first seen.
+
+    Each template's columns are mapped to positions in the schema once, the first time a row of that template is
+    written, so placing a row costs a list copy instead of a lookup per field. Columns are only ever added at the end,
+    so a header written earlier in the run stays a prefix of the current one.
+
+    Attributes:
+        header(list): The column names, 'filename' first.
+    """
+
+    def __init__(self, header=None):
+        self.header = [str(column) if column is not None else "" for column in header] if header else ["filename"]
+        self._positions = {name: index for index, name in enumerate(self.header)}
+        # template content hash -> position of each of its columns, None when they are the schema's first columns
+        self._maps = {}
+
+    def positions(self, template):
+        """
+        Gets where each column of a template's rows goes, adding the template's new columns to the schema.
+
+        Args:
+            template(FormTemplate): The compiled form template.
+
+        Returns:
+            list: The schema position of each value of `header_row(template)`, None if they are the first columns of
+                the schema in the same order.
+
+        Raises:
+            None.
+        """
+
+        if template.content_hash not in self._maps:
+            self._maps[template.content_hash] = self.place(header_row(template))
+        return self._maps[template.content_hash]
+
+    def place(self, names):
+        """
+        Gets where each of a list of columns goes, adding the ones the schema does not have yet at the end.
+
+        Args:
+            names(list): The column names.
+
+        Returns:
+            list: The schema position of each column, None if they are the first columns of the schema in the same
+                order.
+
+        Raises:
+            None.
+        """
+
+        positions = []
+        for name in names:
+            if name not in self._positions:
+                self._positions[name] = len(self.header)
+                self.header.append(name)
+            positions.append(self._positions[name])
+
+        # the usual case, the run's first template, needs no rearranging at all
+        return None if positions == list(range(len(positions))) else positions
+
+    def arrange(self, row, template) -> list:
+        """
+        Places a built row of a template in the schema's columns.
+
+        Args:
+            row(list): The row from `build_row`.
+            template(FormTemplate): The compiled form template the row was extracted with.
+
+        Returns:
+            list: The row in the schema's column order, None in the columns the template does not have.
+
+        Raises:
+            None.
+        """
+
+        positions = self.positions(template)
+        if positions is None:
+            return list(row) + [None] * (len(self.header) - len(row))
+
+        arranged = [None] * len(self.header)
+        for position, value in zip(positions, row):
+            arranged[position] = value
+        return arranged
+
+
+def add_link_style(workbook) -> str:
+    """
+    Registers the named style used for the PDF hyperlink column, if the workbook does not have it yet.
+
+    Args:
+        workbook(Workbook): The workbook to register the style with.
+
+    Returns:
+        str: The name of the style.
+
+    Raises:
+        None.
+    """
+
+    if LINK_STYLE_NAME not in workbook.named_styles:
+        workbook.add_named_style(NamedStyle(name=LINK_STYLE_NAME, font=Font(color=colors.BLUE, underline='single')))
+    return LINK_STYLE_NAME
+
+
+class SheetRowWriter:
+    """
+    Appends rows to a worksheet, keeping its own row count and header state so appending a row does not depend on the
+    size of the sheet.
+
+    Attributes:
+        sheet(Worksheet): The worksheet rows are appended to.
+        row_count(int): The number of rows in the sheet, including the header.
+        has_header(bool): Whether the sheet has its header row.
+        schema(RowSchema): The sheet's columns, starting from its existing header.
+    """
+
+    def __init__(self, workbook, sheet=None):
+        self.sheet = sheet if sheet is not None else workbook.active
+        self.link_style = add_link_style(workbook)
+
+        # work out the starting state once, sheet.dimensions scans every cell of the sheet
+        if self.sheet.dimensions == "A1:A1":
+            self.row_count = 0
+            self.has_header = False
+            self.schema = RowSchema()
+        else:
+            self.row_count = self.sheet.max_row
+            self.has_header = True
+            self.schema = RowSchema(next(self.sheet.iter_rows(max_row=1, values_only=True)))
+        self._header_width = len(self.schema.header) if self.has_header else 0
+
+    def write_row(self, fields, pdf_name, template) -> int:
+        """
+        Appends the extracted data for one page, adding the header first if the sheet has none.
+
+        Args:
+            fields(tuple): The processed row, from `FormTemplate.process_block`.
+            pdf_name(str): The name of the PDF file.
+            template(FormTemplate): The compiled form template the data was extracted with.
+
+        Returns:
+            int: The sheet row number the data was written to.
+
+        Raises:
+            Exception: If an error occurs populating the spreadsheet.
+        """
+
+        row = self.schema.arrange(build_row(fields, pdf_name, template), template)
+
+        if not self.has_header:
+            # Add headers
+            self.sheet.append(self.schema.header)
+            self.row_count += 1
+            self.has_header = True
+        elif len(self.schema.header) > self._header_width:
+            # a template with new fields, or a sheet from before a column was added, gets the new header cells; the
+            #  rows above are left short
+            for column in range(self._header_width + 1, len(self.schema.header) + 1):
+                self.sheet.cell(row=1, column=column, value=self.schema.header[column - 1])
+        self._header_width = len(self.schema.header)
+
+        # Append the row to the sheet and apply the shared hyperlink style to the pdf link
+        self.sheet.append(row)
+        self.row_count += 1
+        self.sheet.cell(row=self.row_count, column=1).style = self.link_style
+        return self.row_count
+
+
+class WorkbookWriter:
+    """
+    Appends rows to the master workbook in memory and saves it when closed.
+
+    Attributes:
+        path(str): The path to the master workbook.
+        workbook(Workbook): The loaded workbook.
+        rows(SheetRowWriter): The row writer for the active worksheet.
+    """
+
+    def __init__(self, path=SCANNED_DATA_PATH):
+        self.path = path
+
+        # Open the existing workbook or create a new one if it doesn't exist
+        if os.path.exists(path):
+            self.workbook = openpyxl.load_workbook(path)
+        else:
+            self.workbook = openpyxl.Workbook()
+        self.rows = SheetRowWriter(self.workbook)
+
+    def write_row(self, fields, pdf_name, template) -> None:
+        """
+        Writes the extracted data for one page.
+
+        Args:
+            fields(tuple): The processed row, from `FormTemplate.process_block`.
+            pdf_name(str): The name of the PDF file.
+            template(FormTemplate): The compiled form template the data was extracted with.
+
+        Returns:
+            None
+
+        Raises:
+            Exception: If an error occurs populating the spreadsheet.
+        """
+
+        self.rows.write_row(fields, pdf_name, template)
+        print(f"Data from {pdf_name} added to the spreadsheet")
+
+    def flush(self) -> None:
+        """
+        Does nothing, the workbook is only written to disk when it is closed.
+        """
+
+    def close(self) -> None:
+        """
+        Saves and closes the workbook.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the workbook cannot be saved.
+        """
+
+        self.workbook.save(self.path)
+        self.workbook.close()
+
+
+class CsvPartWriter:
+    """
+    Streams rows to CSV part files, flushing them to disk after every scanned file.
+
+    A part file's header is the run's columns when it was started; a template with new fields starts a new part with
+    the wider header. Each part is written under its path plus OPEN_PART_SUFFIX and renamed to its path when it is
+    closed. The writer holds a lock file for its run while it is open, so compaction can tell the parts of a writer
+    that crashed from the parts of one that is still running.
+
+    Attributes:
+        parts_folder(str): The folder the part files are written to.
+        rows_per_part(int): The number of rows written to a part file before a new one is started.
+        part_paths(list): The paths of the part files written so far, the current one has them once it is closed.
+        schema(RowSchema): The columns of the run.
+    """
+
+    def __init__(self, parts_folder=PARTS_FOLDER, rows_per_part=50000):
+        self.parts_folder = parts_folder
+        self.rows_per_part = rows_per_part
+        self.part_paths = []
+        self._run_id = (datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{os.getpid()}"
+                        f"_{next(_writer_numbers):03d}")
+        self._file = None
+        self._csv = None
+        self.schema = RowSchema()
+        self._part_width = 0
+        self._rows_in_part = 0
+        os.makedirs(parts_folder, exist_ok=True)
+        self._lock = _open_lock(os.path.join(parts_folder, f"scanned_data_{self._run_id}.lock"))
+
+    def _start_part(self) -> None:
+        # Closes the current part file and opens the next one, headers first
+        self._close_part()
+        part_path = os.path.join(self.parts_folder, f"scanned_data_{self._run_id}_{len(self.part_paths):04d}.csv")
+        self._file = open(part_path + OPEN_PART_SUFFIX, 'w', newline='', encoding='utf-8')
+        self._csv = csv.writer(self._file)
+        self._csv.writerow(self.schema.header)
+        self._part_width = len(self.schema.header)
+        self._rows_in_part = 0
+        self.part_paths.append(part_path)
+
+    def _close_part(self) -> None:
+        # Closes the current part file and gives it its final name, which makes it ready to merge
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+            os.replace(self.part_paths[-1] + OPEN_PART_SUFFIX, self.part_paths[-1])
+
+    def write_row(self, fields, pdf_name, template) -> None:
+        """
+        Writes the extracted data for one page.
+
+        Args:
+            fields(tuple): The processed row, from `FormTemplate.process_block`.
+            pdf_name(str): The name of the PDF file.
+            template(FormTemplate): The compiled form template the data was extracted with.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the part file cannot be written.
+        """
+
+        row = self.schema.arrange(build_row(fields, pdf_name, template), template)
+
+        if self._file is None or self._rows_in_part >= self.rows_per_part or len(row) != self._part_width:
+            self._start_part()
+
+        self._csv.writerow(row)
+        self._rows_in_part += 1
+
+        print(f"Data from {pdf_name} added to the spreadsheet")
+
+    def flush(self) -> None:
+        """
+        Flushes the rows written so far to disk.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the part file cannot be written.
+        """
+
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        """
+        Flushes and closes the current part file and releases the run's lock file.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the part file cannot be written.
+        """
+
+        self._close_part()
+        if self._lock is not None:
+            _release_lock(self._lock, remove=True)
+            self._lock = None
+
+
+def open_writer(output_format, master_path=SCANNED_DATA_PATH, parts_folder=PARTS_FOLDER):
+    """
+    Opens the row writer for an output format.
+
+    Args:
+        output_format(str): One of OUTPUT_FORMATS.
+        master_path(str): The path to the master workbook.
+        parts_folder(str): The folder CSV part files are written to.
+
+    Returns:
+        WorkbookWriter | CsvPartWriter: The writer.
+
+    Raises:
+        ValueError: If the output format is unknown.
+    """
+
+    if output_format == "xlsx":
+        return WorkbookWriter(master_path)
+    if output_format == "parts":
+        return CsvPartWriter(parts_folder)
+    raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+
+
+def compact_parts(parts_folder=PARTS_FOLDER, master_path=SCANNED_DATA_PATH) -> int:
+    """
+    Merges the closed CSV part files into the master workbook and deletes the merged parts.
+
+    The master workbook is streamed in read-only mode into a new write-only workbook, followed by the rows of each part
+    file in the order they were written, then the new workbook replaces the master. Memory use does not grow with the
+    size of the workbook, but the time does: an xlsx file is a zip archive that cannot be appended to in place, so
+    every compaction reads and rewrites every row of the master, however few rows the parts add. The part files hold
+    the rows as soon as they are scanned; compact less often to keep the cost down on a large workbook. Part file
+    columns are matched to the master's by name, columns the master does not have yet are added at the end.
+
+    Parts still open in a running writer are left for next time. Only one compaction runs in a parts folder, and
+    into a master workbook, at a time; another one returns at once and leaves its parts for next time. The parts
+    merged are journaled before the new workbook replaces the master, and a compaction that finds a journal finishes
+    the one that crashed before doing anything else. The lock files ('compact.lock' in the parts folder and the
+    master's path plus '.lock') are removed once the compaction is done.
+
+    Args:
+        parts_folder(str): The folder containing the CSV part files.
+        master_path(str): The path to the master workbook.
+
+    Returns:
+        int: The number of rows merged into the master workbook, 0 if another compaction is running (see
+            `pending_parts`).
+
+    Raises:
+        OSError: If the master workbook cannot be written.
+    """
+
+    if not os.path.isdir(parts_folder):
+        return 0
+    lock = _open_lock(os.path.join(parts_folder, COMPACT_LOCK_NAME))
+    if lock is None:
+        print(f"The part files in '{parts_folder}' are being merged by another process, skipping")
+        return 0
+    try:
+        # parts folders of other scans can be merged into the same workbook
+        master_lock = _open_lock(master_path + ".lock")
+        if master_lock is None:
+            print(f"'{master_path}' is being merged into by another process, skipping")
+            return 0
+        try:
+            _finish_compaction(parts_folder)
+            _recover_parts(parts_folder)
+            return _merge_parts(parts_folder, master_path)
+        finally:
+            _release_lock(master_lock, remove=True)
+    finally:
+        _release_lock(lock, remove=True)
+
+
+def pending_parts(parts_folder=PARTS_FOLDER) -> list:
+    """
+    Lists the closed part files waiting to be merged into the master workbook.
+
+    Args:
+        parts_folder(str): The folder containing the CSV part files.
+
+    Returns:
+        list: The paths of the closed part files, in the order they were written.
+
+    Raises:
+        None.
+    """
+
+    # part names start with the run time stamp so sorting them keeps the order they were written in
+    return sorted(glob.glob(os.path.join(parts_folder, "scanned_data_*.csv")))
+
+
+def _finish_compaction(parts_folder) -> None:
+    # Completes a compaction that stopped after journaling its parts: if the new workbook was swapped in its parts are
+    #  removed, otherwise the workbook was never replaced and the parts are merged again by this compaction
+    journal_path = os.path.join(parts_folder, COMPACT_JOURNAL_NAME)
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path, 'r') as file:
+        journal = json.load(file)
+    if os.path.exists(journal["temp_path"]):
+        os.remove(journal["temp_path"])
+    else:
+        for name in journal["parts"]:
+            try:
+                os.remove(os.path.join(parts_folder, name))
+            except FileNotFoundError:
+                pass
+        print(f"Removed the {len(journal['parts'])} part files of an interrupted merge into '{journal['master_path']}'")
+    os.remove(journal_path)
+
+
+def _recover_parts(parts_folder) -> None:
+    # Closes the open part files of writers whose run lock is no longer held, i.e. that crashed, so they are merged
+    runs = {}
+    for open_path in glob.glob(os.path.join(parts_folder, "scanned_data_*.csv" + OPEN_PART_SUFFIX)):
+        run_prefix = open_path[:-len(OPEN_PART_SUFFIX)].rsplit('_', 1)[0]
+        runs.setdefault(run_prefix, []).append(open_path)
+    for run_prefix, open_paths in runs.items():
+        lock = _open_lock(run_prefix + ".lock")
+        if lock is None:
+            # the writer is still running
+            continue
+        for open_path in open_paths:
+            try:
+                os.replace(open_path, open_path[:-len(OPEN_PART_SUFFIX)])
+            except FileNotFoundError:
+                # the writer closed it just now
+                pass
+        print(f"Recovered {len(open_paths)} part files of a scan that stopped without closing them")
+        _release_lock(lock, remove=True)
+
+
+def _merge_parts(parts_folder, master_path) -> int:
+    # The merge itself, run by compact_parts while it holds the compaction locks
+    part_paths = pending_parts(parts_folder)
+    if not part_paths:
+        return 0
+
+    # the master's columns come first, then any new columns of the part files; the write-only sheet cannot go back to
+    #  the header, so it is worked out before anything is written
+    master_header = None
+    if os.path.exists(master_path):
+        master = openpyxl.load_workbook(master_path, read_only=True)
+        master_header = next(master.active.iter_rows(max_row=1, values_only=True), None)
+        master.close()
+    schema = RowSchema(master_header)
+    part_positions = {}
+    for part_path in part_paths:
+        with open(part_path, newline='', encoding='utf-8') as part_file:
+            part_header = next(csv.reader(part_file), None)
+        if part_header is not None:
+            part_positions[part_path] = schema.place(part_header)
+    header = schema.header
+
+    output = openpyxl.Workbook(write_only=True)
+    out_sheet = output.create_sheet()
+    link_style = add_link_style(output)
+
+    def append(row):
+        # style the pdf hyperlink in the first column like SheetRowWriter does
+        first = WriteOnlyCell(out_sheet, value=row[0])
+        if isinstance(row[0], str) and row[0].startswith("=HYPERLINK("):
+            first.style = link_style
+        out_sheet.append([first] + list(row[1:]))
+
+    out_sheet.append(header)
+
+    # copy the existing master rows first
+    if os.path.exists(master_path):
+        master = openpyxl.load_workbook(master_path, read_only=True)
+        for row in master.active.iter_rows(min_row=2, values_only=True):
+            append(row)
+        master.close()
+
+    merged = 0
+    for part_path in part_paths:
+        with open(part_path, newline='', encoding='utf-8') as part_file:
+            reader = csv.reader(part_file)
+            part_header = next(reader, None)
+            if part_header is None:
+                continue
+            positions = part_positions[part_path]
+
+            for row in reader:
+                # a row cut short by a crash mid write is skipped rather than shifting the columns
+                if len(row) != len(part_header):
+                    print(f"Skipping incomplete row in '{part_path}'")
+                    continue
+                if positions is not None:
+                    arranged = [None] * len(header)
+                    for position, value in zip(positions, row):
+                        arranged[position] = value
+                    row = arranged
+                append(row)
+                merged += 1
+
+    # save beside the master and swap it in so a failed save never leaves a half written master
+    temp_path = master_path + ".tmp"
+    output.save(temp_path)
+
+    # journal the parts the new master holds before swapping it in, so a crash before they are all removed never
+    #  merges them a second time
+    journal_path = os.path.join(parts_folder, COMPACT_JOURNAL_NAME)
+    with open(journal_path + ".tmp", 'w') as file:
+        json.dump({"master_path": os.path.abspath(master_path), "temp_path": os.path.abspath(temp_path),
+                   "parts": [os.path.basename(part_path) for part_path in part_paths]}, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(journal_path + ".tmp", journal_path)
+    os.replace(temp_path, master_path)
+
+    for part_path in part_paths:
+        os.remove(part_path)
+    os.remove(journal_path)
+
+    print(f"Merged {merged} rows from {len(part_paths)} part files into '{master_path}'")
+    return merged
+
+
+if __name__ == '__main__':
+
+    compact_parts(*sys.argv[1:3])
@@ -0,0 +1,222 @@
+"""
+    File: Template_Schema.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Template Schema
+
+    The coordinate space of the form templates, shared by the PDF viewers that draw them and the scanner that reads
+    them. Boxes are saved in PDF points of the unrotated page, the space `get_textbox` and `get_text("words")` use,
+    whatever zoom the viewer was at and however the page is rotated on screen. Version 2 templates say so with a
+    "schema_version" key and record the size of the page they were drawn on.
+
+    Templates saved before version 2 hold the canvas position of each box: `Import_Document_To_Train.py` divided by its
+    zoom, `Get_Coordinates_Of_PDF.py` did not, and neither undid the page rotation. The migration tool converts them
+    using the PDF they were drawn on and the zoom they were drawn at.
+
+        Features
+
+        - Canvas Conversion: Converts between a viewer's canvas at any zoom and PDF points, undoing page rotation.
+        - Template Document: Builds the JSON saved by the viewers, with its schema version and page size.
+        - Migration: Converts old templates in place or to a new file.
+
+        Usage
+
+        - python Template_Schema.py "./Form Templates/1348.json" --reference ./Documents/1348_FILLED_OUT1.pdf
+          [--zoom 1.0] [--output new.json]
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/page.html#Page.rotation_matrix
+        - https://pymupdf.readthedocs.io/en/latest/app3.html#coordinates
+"""
+
+import sys
+import json
+import argparse
+import pymupdf as pmu
+
+
+# The current template schema, templates without a "schema_version" key are version 1
+TEMPLATE_SCHEMA_VERSION = 2
+
+
+def _transform_box(coords, matrix) -> list:
+    # Transforms a box by a matrix in Python floats (pmu.Rect rounds to single precision), returning the box around
+    #  its transformed corners
+    a, b, c, d, e, f = matrix
+    x0, y0, x1, y1 = coords
+    xs, ys = [], []
+    for x, y in ((x0, y0), (x1, y0), (x0, y1), (x1, y1)):
+        xs.append(a * x + c * y + e)
+        ys.append(b * x + d * y + f)
+    return [min(xs), min(ys), max(xs), max(ys)]
+
+
+def canvas_to_pdf(page, coords, zoom=1.0) -> list:
+    """
+    Converts a box drawn on a viewer's canvas to PDF points of the unrotated page.
+
+    Args:
+        page(pmu.Page): The page shown on the canvas.
+        coords(Iterable[float]): The box on the canvas, (x0, y0, x1, y1) in canvas pixels.
+        zoom(float): The scale the page is shown at, 1 is 72 DPI.
+
+    Returns:
+        list: The box in PDF points, [x0, y0, x1, y1].
+
+    Raises:
+        None.
+    """
+
+    return _transform_box(coords, pmu.Matrix(1 / zoom, 1 / zoom) * page.derotation_matrix)
+
+
+def pdf_to_canvas(page, coords, zoom=1.0) -> list:
+    """
+    Converts a box in PDF points of the unrotated page to where it is drawn on a viewer's canvas.
+
+    Args:
+        page(pmu.Page): The page shown on the canvas.
+        coords(Iterable[float]): The box in PDF points, (x0, y0, x1, y1).
+        zoom(float): The scale the page is shown at, 1 is 72 DPI.
+
+    Returns:
+        list: The box on the canvas, [x0, y0, x1, y1] in canvas pixels.
+
+    Raises:
+        None.
+    """
+
+    return _transform_box(coords, page.rotation_matrix * pmu.Matrix(zoom, zoom))
+
+
+def page_size(page) -> list:
+    """
+    Gets the size of a page in the space template boxes are in, which is not affected by the page rotation.
+
+    Args:
+        page(pmu.Page): The page.
+
+    Returns:
+        list: [width, height] in points.
+
+    Raises:
+        None.
+    """
+
+    return [page.cropbox.width, page.cropbox.height]
+
+
+def template_document(rectangles, page) -> dict:
+    """
+    Builds the JSON document of a template from the boxes drawn in a viewer.
+
+    Args:
+        rectangles(dict): The boxes of each page, keyed "page number: N", each a list of {'name', 'coords'} with the
+            coords in PDF points.
+        page(pmu.Page): The page the template was drawn on, for its size.
+
+    Returns:
+        dict: The template, with its schema version and page size before the boxes.
+
+    Raises:
+        None.
+    """
+
+    document = {"schema_version": TEMPLATE_SCHEMA_VERSION, "page_size": page_size(page)}
+    # leave out pages with no boxes
+    document.update((key, boxes) for key, boxes in rectangles.items() if boxes)
+    return document
+
+
+def schema_version(template) -> int:
+    """
+    Gets the schema version of a template.
+
+    Args:
+        template(dict): The template JSON.
+
+    Returns:
+        int: The version, 1 if the template does not say.
+
+    Raises:
+        None.
+    """
+
+    return template.get("schema_version", 1)
+
+
+def migrate_template(template, page, zoom=1.0) -> dict:
+    """
+    Converts a version 1 template to the current schema.
+
+    Args:
+        template(dict): The version 1 template JSON.
+        page(pmu.Page): The page the template was drawn on.
+        zoom(float): The zoom the boxes were saved at, 1 for templates from `Import_Document_To_Train.py` (which
+            divided by its zoom) and for `Get_Coordinates_Of_PDF.py` (which always showed the page at 1).
+
+    Returns:
+        dict: The template in the current schema, other keys such as anchors and row checks are kept.
+
+    Raises:
+        ValueError: If the template is already in the current schema or a newer one.
+    """
+
+    version = schema_version(template)
+    if version >= TEMPLATE_SCHEMA_VERSION:
+        raise ValueError(f"The template is already schema version {version}")
+
+    migrated = {"schema_version": TEMPLATE_SCHEMA_VERSION, "page_size": template.get("page_size", page_size(page))}
+    for key, value in template.items():
+        if key.startswith("page number: "):
+            value = [dict(box, coords=canvas_to_pdf(page, box['coords'], zoom)) for box in value]
+        migrated.setdefault(key, value)
+    return migrated
+
+
+def main() -> None:
+    """
+    Converts old form templates to the current schema, from the command line.
+
+    Args:
+        N/A
+
+    Returns:
+        None
+
+    Raises:
+        None
+    """
+
+    parser = argparse.ArgumentParser(description="Convert form templates to PDF points with their page size.")
+    parser.add_argument("templates", nargs="+", help="form template JSON files, converted in place")
+    parser.add_argument("--reference", required=True, help="PDF the templates were drawn on")
+    parser.add_argument("--page", type=int, default=1, help="page of the reference PDF (default: 1)")
+    parser.add_argument("--zoom", type=float, default=1.0, help="zoom the boxes were saved at (default: 1)")
+    parser.add_argument("--output", default=None, help="file to save the converted template to, for one template")
+    args = parser.parse_args()
+
+    if args.output and len(args.templates) > 1:
+        parser.error("--output can only be used with one template")
+
+    with pmu.open(args.reference) as doc:
+        page = doc[args.page - 1]
+        for template_path in args.templates:
+            with open(template_path, 'r') as file:
+                template = json.load(file)
+            if schema_version(template) >= TEMPLATE_SCHEMA_VERSION:
+                print(f"Skipped '{template_path}', it is already schema version {schema_version(template)}")
+                continue
+            output_path = args.output or template_path
+            with open(output_path, 'w') as file:
+                json.dump(migrate_template(template, page, args.zoom), file, indent=4)
+            print(f"Converted '{template_path}' to schema version {TEMPLATE_SCHEMA_VERSION} in '{output_path}'")
+
+
+if __name__ == '__main__':
+
+    main()
+    sys.exit(0)
@@ -0,0 +1,161 @@
+"""
+    File: Word_Index.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Word Index
+
+    Extracts the text for every box of a form template from a single pass over the page's text layer. The words of the
+    page are read once with `get_text("words")` and bucketed into a grid, then each template box only looks at the
+    words in the grid cells it covers.
+
+        Features
+
+        - Single Pass: One text page and one word list per page, no matter how many boxes the template has.
+        - Grid Index: Words are bucketed by position so a box only tests the words near it.
+        - Same Results: Matches `Page.get_textbox`, which keeps every character whose bbox overlaps the box. Words that
+          only partly overlap a box fall back to `get_textbox` on the same text page for that box.
+        - Stored Words: Also indexes a word list without its page, such as a stored word layer, keeping partly
+          covered words whole.
+        - Parity Check: Compares both extraction paths over a set of PDFs (run this file directly).
+
+        Refs
+
+        - https://pymupdf.readthedocs.io/en/latest/page.html#Page.get_text
+        - https://pymupdf.readthedocs.io/en/latest/page.html#Page.get_textbox
+"""
+
+import sys
+import glob
+import pymupdf as pmu
+
+
+# Size in points of a grid cell, about one line of text on a 1348-1A
+GRID_CELL_SIZE = 24
+
+
+class WordIndex:
+    """
+    A grid index of the words on a PDF page.
+
+    Attributes:
+        page(pmu.Page): The page the words were read from, None for words without a page.
+        textpage(pmu.TextPage): The text page shared by the word list and any `get_textbox` fallback, None without a
+            page.
+        words(list): The words of the page as (x0, y0, x1, y1, text, block_no, line_no, word_no) tuples.
+    """
+
+    def __init__(self, page, cell_size=GRID_CELL_SIZE, words=None):
+        self.page = page
+        self.cell_size = cell_size
+        if page is None:
+            self.textpage = None
+            self.words = words
+        else:
+            self.textpage = page.get_textpage()
+            self.words = page.get_text("words", textpage=self.textpage)
+
+        # bucket each word into every grid cell its bbox touches
+        self._cells = {}
+        for word_id, word in enumerate(self.words):
+            for cell in self._cells_for(word[0], word[1], word[2], word[3]):
+                self._cells.setdefault(cell, []).append(word_id)
+
+    def _cells_for(self, x0, y0, x1, y1):
+        # The grid cells covered by a rectangle
+        size = self.cell_size
+        for cell_x in range(int(x0 // size), int(x1 // size) + 1):
+            for cell_y in range(int(y0 // size), int(y1 // size) + 1):
+                yield cell_x, cell_y
+
+    def get_textbox(self, rect) -> str:
+        """
+        Gets the text in a box, the same as `Page.get_textbox` on the indexed page.
+
+        Args:
+            rect(pmu.Rect): The box to get the text from.
+
+        Returns:
+            str: The text of the words in the box, one line per text line.
+
+        Raises:
+            None.
+        """
+
+        candidates = set()
+        for cell in self._cells_for(rect.x0, rect.y0, rect.x1, rect.y1):
+            candidates.update(self._cells.get(cell, ()))
+
+        inside = []
+        for word_id in candidates:
+            x0, y0, x1, y1 = self.words[word_id][:4]
+            # get_textbox keeps a character if its bbox overlaps the box at all
+            if x0 >= rect.x1 or y0 >= rect.y1 or x1 <= rect.x0 or y1 <= rect.y0:
+                continue
+            # the whole word is only certain to be kept if it is strictly inside the box, anything else is a partial
+            #  word that needs character level extraction; without a page there are no characters to look at
+            if self.page is not None and not (x0 > rect.x0 and y0 > rect.y0 and x1 < rect.x1 and y1 < rect.y1):
+                return self.page.get_textbox(rect, textpage=self.textpage)
+            inside.append(word_id)
+
+        # put the words back in reading order (block, line, word), breaking lines like get_textbox does
+        lines = []
+        last_line = None
+        for word_id in sorted(inside, key=lambda i: self.words[i][5:8]):
+            word = self.words[word_id]
+            if word[5:7] != last_line:
+                lines.append([])
+                last_line = word[5:7]
+            lines[-1].append(word[4])
+
+        return '\n'.join(' '.join(line) for line in lines)
+
+
+def check_extraction_parity(pdf_paths, template) -> list:
+    """
+    Compares word index extraction against `get_textbox` extraction for every page of the given PDFs.
+
+    Args:
+        pdf_paths(list): The paths to the PDF files to compare.
+        template(FormTemplate): The compiled form template to extract with.
+
+    Returns:
+        list: (pdf_path, page_number, field_name, textbox_text, words_text) for every field that differs.
+
+    Raises:
+        Exception: If a PDF cannot be opened.
+    """
+
+    # imported here to avoid a circular import, the scanner imports this module
+    from Scan_Folder_Extract_Data import extract_text_from_page
+
+    mismatches = []
+    for pdf_path in pdf_paths:
+        doc = pmu.open(pdf_path)
+        for page_number in range(len(doc)):
+            page = doc.load_page(page_number)
+            textbox_data = extract_text_from_page(page, template, mode="textbox")
+            words_data = extract_text_from_page(page, template, mode="words")
+            for textbox_item, words_item in zip(textbox_data, words_data):
+                if textbox_item['text'] != words_item['text']:
+                    mismatches.append((pdf_path, page_number + 1, textbox_item['name'],
+                                       textbox_item['text'], words_item['text']))
+        doc.close()
+    return mismatches
+
+
+if __name__ == '__main__':
+
+    from Form_Template import load_template
+
+    # usage: python Word_Index.py [template.json] [pdf glob]
+    template_path = sys.argv[1] if len(sys.argv) > 1 else "./Form Templates/1348.json"
+    pdf_glob = sys.argv[2] if len(sys.argv) > 2 else "./Documents/1348_FILLED_OUT*.pdf"
+
+    pdf_files = sorted(glob.glob(pdf_glob))
+    differences = check_extraction_parity(pdf_files, load_template(template_path))
+    for difference in differences:
+        print("Mismatch in {} page {} field '{}': textbox={!r} words={!r}".format(*difference))
+    print(f"Checked {len(pdf_files)} files, {len(differences)} mismatched fields")
+    sys.exit(1 if differences else 0)
@@ -0,0 +1,445 @@
+"""
+    File: Word_Layer_Store.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Word Layer Store
+
+    Keeps the word layer of every scanned page (its words, their boxes, the page geometry and the values of its form
+    fields) on disk, keyed by the content hash of the PDF, so a new or corrected form template can be applied to
+    everything already scanned without opening a single PDF again. Each file's layers are stored as columns (all the
+    x0s, then all the y0s, ..., then the text) compressed together, which is a fraction of the size of the PDF and loads
+    in a few milliseconds.
+
+        Features
+
+        - Columnar Files: One compressed file per PDF with float32 box columns, integer reading order columns and the
+          words as one text column.
+        - Content Addressed: Files are named by the PDF's SHA-256, like the scan manifest, so a file scanned twice is
+          stored once.
+        - Page Stand-In: Stored pages answer `search_for`, their geometry and the word index like a page does, so
+          form routing, anchor alignment and the grid index run on them unchanged.
+        - Form Fields: The values of every form field of a fillable page are kept, so a template's widget mapping
+          applies to stored pages like it does to a scan.
+        - Re-Extract: Applies a template to every stored layer and writes a new workbook, in the order the files were
+          scanned (run this file directly). Pages with no text layer, which a scan reads with OCR, cannot be
+          re-extracted from their words; they are skipped and counted so their files can be scanned again.
+
+        Usage
+
+        - Scan with: python Scan_Folder_Extract_Data.py ... --keep-word-layers
+        - python Word_Layer_Store.py --template "./Form Templates/1348.json" --output ./Scanned/reextracted.xlsx
+          [--store ./Scanned/word_layers] [--forms]
+
+        Refs
+
+        - https://docs.python.org/3/library/array.html
+        - https://docs.python.org/3/library/zlib.html
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import array
+import struct
+import argparse
+import pymupdf as pmu
+
+
+WORD_LAYER_FOLDER = "./Scanned/word_layers"
+
+# Start of every layer file, then the length of the JSON header and the header itself
+_MAGIC = b"WLS1"
+_HEADER_LENGTH = struct.Struct("<I")
+
+# Version 2 adds the form field values of each page and when the file was stored, version 1 files load without them
+_VERSION = 2
+
+# The box columns are float32, which is what MuPDF measures text in, the reading order columns are uint32
+_FLOAT_COLUMNS = ("x0", "y0", "x1", "y1")
+_INT_COLUMNS = ("block_no", "line_no", "word_no")
+
+
+class PageLayer:
+    """
+    The stored word layer of one page, usable where the scanner expects a page.
+
+    Attributes:
+        words(list): The words as (x0, y0, x1, y1, text, block_no, line_no, word_no) tuples, like `get_text("words")`.
+        rect(pmu.Rect): The page rectangle as displayed.
+        mediabox(pmu.Rect): The page's media box.
+        cropbox(pmu.Rect): The page's crop box.
+        rotation(int): The page rotation.
+        widgets(dict): The value of each form field on the page by qualified name, from `WidgetReader.values`. None if
+            the document is not a fillable form.
+    """
+
+    def __init__(self, words, rect, mediabox, cropbox, rotation, widgets=None):
+        self.words = words
+        self.rect = pmu.Rect(rect)
+        self.mediabox = pmu.Rect(mediabox)
+        self.cropbox = pmu.Rect(cropbox)
+        self.rotation = rotation
+        self.widgets = widgets
+
+    @classmethod
+    def from_page(cls, page, words=None, widgets=None):
+        """
+        Takes the word layer of a page.
+
+        Args:
+            page(pmu.Page): The page.
+            words(list): The page's words if they have already been read, e.g. `WordIndex.words`.
+            widgets(dict): The values of every form field on the page, None if the document is not a fillable form.
+
+        Returns:
+            PageLayer: The layer.
+
+        Raises:
+            None.
+        """
+
+        if words is None:
+            words = page.get_text("words")
+        return cls(words, page.rect, page.mediabox, page.cropbox, page.rotation, widgets)
+
+    @property
+    def image_only(self) -> bool:
+        """
+        True if the page had no text layer and no form field values, so only OCR of the page itself can read it.
+        """
+
+        return not self.words and not self.widgets
+
+    def search_for(self, text) -> list:
+        """
+        Finds a string in the page's words, like `Page.search_for` but matching whole words within a line.
+
+        Args:
+            text(str): The string to find, case is ignored.
+
+        Returns:
+            list: The `pmu.Rect` around each match.
+
+        Raises:
+            None.
+        """
+
+        needle = ' '.join(text.split()).lower()
+        hits = []
+        if not needle:
+            return hits
+
+        # group the words by line, in reading order
+        lines = {}
+        for word in sorted(self.words, key=lambda word: word[5:8]):
+            lines.setdefault(word[5:7], []).append(word)
+
+        for line in lines.values():
+            # the line as text, with where each word starts in it
+            starts, offset = [], 0
+            for word in line:
+                starts.append(offset)
+                offset += len(word[4]) + 1
+            haystack = ' '.join(word[4] for word in line).lower()
+
+            found = haystack.find(needle)
+            while found >= 0:
+                end = found + len(needle)
+                hit = None
+                for start, word in zip(starts, line):
+                    if start < end and start + len(word[4]) > found:
+                        hit = pmu.Rect(word[:4]) if hit is None else hit | pmu.Rect(word[:4])
+                hits.append(hit)
+                found = haystack.find(needle, found + 1)
+        return hits
+
+
+def _encode(file_name, layers) -> bytes:
+    # Packs the layers of a file into the header and the compressed columns
+    columns = {name: array.array('f') for name in _FLOAT_COLUMNS}
+    columns.update({name: array.array('I') for name in _INT_COLUMNS})
+    texts = []
+    pages = []
+    for layer in layers:
+        for word in layer.words:
+            for index, name in enumerate(_FLOAT_COLUMNS):
+                columns[name].append(word[index])
+            for index, name in enumerate(_INT_COLUMNS, start=5):
+                columns[name].append(word[index])
+            texts.append(word[4])
+        pages.append({"words": len(layer.words), "rect": list(layer.rect), "mediabox": list(layer.mediabox),
+                      "cropbox": list(layer.cropbox), "rotation": layer.rotation, "widgets": layer.widgets})
+
+    # stored with the time it was written, which is the order the scan wrote the file's rows in
+    header = json.dumps({"version": _VERSION, "file_name": file_name, "byteorder": sys.byteorder,
+                         "stored_ns": time.time_ns(), "pages": pages}).encode()
+    payload = b"".join(columns[name].tobytes() for name in _FLOAT_COLUMNS + _INT_COLUMNS)
+    payload += '\n'.join(texts).encode('utf-8')
+    return _MAGIC + _HEADER_LENGTH.pack(len(header)) + header + zlib.compress(payload)
+
+
+def _decode_header(data) -> tuple:
+    # Unpacks the header of a layer file, which is all that is needed to list the files, and where the columns start
+    if data[:4] != _MAGIC:
+        raise ValueError("Not a word layer file")
+    (header_length,) = _HEADER_LENGTH.unpack_from(data, 4)
+    if len(data) < 8 + header_length:
+        raise ValueError("Word layer file header is cut short")
+    return json.loads(data[8:8 + header_length]), 8 + header_length
+
+
+def _decode(data) -> tuple:
+    # Unpacks a layer file into its file name and the layer of each page
+    header, header_end = _decode_header(data)
+    payload = zlib.decompress(data[header_end:])
+
+    count = sum(page["words"] for page in header["pages"])
+    columns = []
+    offset = 0
+    for typecode, names in (('f', _FLOAT_COLUMNS), ('I', _INT_COLUMNS)):
+        for _ in names:
+            column = array.array(typecode)
+            size = column.itemsize * count
+            column.frombytes(payload[offset:offset + size])
+            if header["byteorder"] != sys.byteorder:
+                column.byteswap()
+            columns.append(column)
+            offset += size
+    texts = payload[offset:].decode('utf-8').split('\n') if count else []
+
+    x0s, y0s, x1s, y1s, blocks, lines, word_nos = columns
+    words = list(zip(x0s, y0s, x1s, y1s, texts, blocks, lines, word_nos))
+    layers = []
+    start = 0
+    for page in header["pages"]:
+        stop = start + page["words"]
+        layers.append(PageLayer(words[start:stop], page["rect"], page["mediabox"], page["cropbox"], page["rotation"],
+                                page.get("widgets")))
+        start = stop
+    return header["file_name"], layers
+
+
+class WordLayerStore:
+    """
+    A folder of stored word layers, one file per PDF named by its content hash.
+
+    Attributes:
+        folder(str): The path to the folder.
+    """
+
+    def __init__(self, folder=WORD_LAYER_FOLDER):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def path_for(self, content_hash) -> str:
+        # The path of a file's layers
+        return os.path.join(self.folder, content_hash + ".words")
+
+    def has(self, content_hash) -> bool:
+        """
+        Checks if a file's layers are stored.
+
+        Args:
+            content_hash(str): The hash of the file's contents.
+
+        Returns:
+            bool: True if they are stored.
+
+        Raises:
+            None.
+        """
+
+        return os.path.exists(self.path_for(content_hash))
+
+    def save(self, content_hash, file_name, layers) -> None:
+        """
+        Stores the layers of a file, replacing any stored before.
+
+        Args:
+            content_hash(str): The hash of the file's contents.
+            file_name(str): The name of the file, written to the rows of a re-extraction.
+            layers(list): The `PageLayer` of each page, in page order.
+
+        Returns:
+            None
+
+        Raises:
+            OSError: If the layers cannot be written.
+        """
+
+        # written under a temporary name and renamed, so a crash never leaves half a file
+        path = self.path_for(content_hash)
+        with open(path + ".tmp", 'wb') as file:
+            file.write(_encode(file_name, layers))
+        os.replace(path + ".tmp", path)
+
+    def load(self, content_hash) -> tuple:
+        """
+        Loads the layers of a file.
+
+        Args:
+            content_hash(str): The hash of the file's contents.
+
+        Returns:
+            tuple: (file name, list of `PageLayer`).
+
+        Raises:
+            OSError: If the layers are not stored.
+            ValueError: If the file is not a word layer file.
+        """
+
+        with open(self.path_for(content_hash), 'rb') as file:
+            return _decode(file.read())
+
+    def content_hashes(self) -> list:
+        """
+        Lists the files that have stored layers.
+
+        Returns:
+            list: The content hash of each file, sorted.
+
+        Raises:
+            OSError: If the folder cannot be read.
+        """
+
+        return sorted(entry.name[:-len(".words")] for entry in os.scandir(self.folder)
+                      if entry.is_file() and entry.name.endswith(".words"))
+
+    def scan_order(self) -> list:
+        """
+        Lists the files that have stored layers in the order they were scanned, from the time in each file's header.
+        Version 1 files, which have no time, come first in the order they were last modified.
+
+        Returns:
+            list: The content hash of each file.
+
+        Raises:
+            OSError: If the folder or a layer file cannot be read.
+            ValueError: If a file is not a word layer file.
+        """
+
+        order = []
+        for content_hash in self.content_hashes():
+            path = self.path_for(content_hash)
+            with open(path, 'rb') as file:
+                start = file.read(8)
+                if len(start) < 8:
+                    raise ValueError(f"'{path}' is not a word layer file")
+                header, _ = _decode_header(start + file.read(_HEADER_LENGTH.unpack_from(start, 4)[0]))
+            stored_ns = header.get("stored_ns")
+            order.append((stored_ns is not None, stored_ns or os.stat(path).st_mtime_ns, content_hash))
+        order.sort()
+        return [content_hash for _, _, content_hash in order]
+
+
+def reextract(store, template, writer, forms=None) -> tuple:
+    """
+    Applies a form template to every stored word layer and writes the rows, without opening the PDFs.
+
+    Boxes are resolved against each layer's word index like the words mode does, and fields mapped to form fields are
+    taken from the stored form field values. A stored layer has no characters, so a word the box only partly covers is
+    kept whole, where a scan would keep only the characters inside the box. Files are written in the order they were
+    scanned. Pages without a text layer or form field values are skipped, a scan reads them with OCR.
+
+    Args:
+        store(WordLayerStore): The stored layers.
+        template(FormTemplate): The compiled form template to apply.
+        writer(CsvPartWriter | WorkbookWriter): The writer for the rows.
+        forms(FormIndex): Routes each page to the template of its form, None to apply `template` to every page.
+
+    Returns:
+        tuple: (files, pages, skipped) re-extracted, skipped is the number of pages with nothing stored to read.
+
+    Raises:
+        OSError: If a layer file cannot be read.
+    """
+
+    # imported here to avoid a circular import, the scanner imports this module
+    from Word_Index import WordIndex
+    from Form_Template import load_template
+    from Scan_Folder_Extract_Data import aligned_boxes, extract_text_from_page, template_blocks
+
+    files = pages = skipped = 0
+    for content_hash in store.scan_order():
+        file_name, layers = store.load(content_hash)
+        aligners = {}
+        rows = []
+        for layer in layers:
+            if layer.image_only:
+                skipped += 1
+                continue
+            word_index = WordIndex(None, words=layer.words)
+            page_template, template_path = template, None
+            if forms is not None:
+                template_path, _ = forms.classify(layer, layer.words)
+                if template_path is not None:
+                    page_template = load_template(template_path)
+            boxes = aligned_boxes(layer, page_template, aligners)
+            data = extract_text_from_page(layer, page_template, "words", None, word_index, boxes, layer.widgets)
+            texts = tuple(item['text'] for item in data)
+            rows.append(texts if forms is None else (template_path, texts))
+        if not rows:
+            print(f"'{file_name}' has no pages to re-extract")
+            continue
+
+        for block_template, block in template_blocks(rows, template, forms is not None):
+            for row in block:
+                writer.write_row(row, file_name, block_template)
+        writer.flush()
+        files += 1
+        pages += len(rows)
+    return files, pages, skipped
+
+
+def main() -> int:
+    """
+    Re-extracts the stored word layers with a form template into a new workbook, from the command line.
+
+    Args:
+        N/A
+
+    Returns:
+        int: The exit code, 2 if the output already exists, otherwise 0.
+
+    Raises:
+        None
+    """
+
+    # imported here to avoid a circular import, the scanner imports this module
+    from Form_Template import load_template
+    from Form_Classifier import FORM_INDEX_PATH, FormIndex
+    from Spreadsheet_Writer import WorkbookWriter
+
+    parser = argparse.ArgumentParser(description="Apply a form template to the stored word layers of scanned PDFs.")
+    parser.add_argument("--template", required=True, help="form template JSON to extract with")
+    parser.add_argument("--output", required=True, help="new workbook to write the rows to")
+    parser.add_argument("--store", default=WORD_LAYER_FOLDER, help=f"word layer folder (default: {WORD_LAYER_FOLDER})")
+    parser.add_argument("--forms", nargs="?", const=FORM_INDEX_PATH, default=None, metavar="INDEX",
+                        help="route each page to the template of its form, pages that match none use --template")
+    args = parser.parse_args()
+
+    if os.path.exists(args.output):
+        print(f"'{args.output}' already exists, re-extract into a new workbook")
+        return 2
+
+    started = time.perf_counter()
+    writer = WorkbookWriter(args.output)
+    try:
+        forms = FormIndex.load(args.forms) if args.forms else None
+        files, pages, skipped = reextract(WordLayerStore(args.store), load_template(args.template), writer,
+                                          forms=forms)
+    finally:
+        writer.close()
+    print(f"Re-extracted {files} files ({pages} pages) in {time.perf_counter() - started:.2f}s to '{args.output}'")
+    if skipped:
+        print(f"Skipped {skipped} pages with no text layer, scan their files again with OCR to extract them")
+    return 0
+
+
+if __name__ == '__main__':
+
+    sys.exit(main())
@@ -4,12 +4,13 @@
 #
 # Purpose: To create a user friendly way to mass extract data from PDF files into excel.
 
+# Only tkinter is imported up front so the window shows straight away; the viewer (PyMuPDF, PIL, matplotlib) and the
+#  scanner (PyMuPDF, openpyxl) are imported by the button that needs them. Check with:
+#  python Benchmark_Scan.py startup
+
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
-from Import_Document_To_Train import PDFViewer
-import os
-import Scan_Folder_Extract_Data as sfe
 
 # Create the folders if they don't exist
 os.makedirs("To Scan", exist_ok=True)
@@ -23,6 +24,8 @@ print(f"Folders set up: 'To Scan', 'Scanned', 'Form Templates'")
 def import_document():
     pdf_path = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf"), ("Image files", "*.png;*.jpg;*.jpeg")])
     if pdf_path:
+        from Import_Document_To_Train import PDFViewer
+
         # Hide the main window
         root.withdraw()
 
@@ -37,7 +40,17 @@ def import_document():
 
 # Function to scan a folder and extract data
 def scan_folder_extract_data():
-    sfe.main()
+    from Scan_Progress_Window import ScanProgressWindow, ask_scan_paths
+
+    paths = ask_scan_paths(root)
+    if paths:
+        # the scan runs in a background thread so this window stays responsive, one scan at a time
+        btn_scan_folder.configure(state=tk.DISABLED)
+
+        def on_close_scan_window():
+            btn_scan_folder.configure(state=tk.NORMAL)
+
+        ScanProgressWindow(root, *paths, on_close_callback=on_close_scan_window)
 
 
 # Function to import and view in Excel
@@ -0,0 +1,12 @@
+"""
+    Lets the tests import the modules at the top of the repository, and finds the sample documents and templates.
+"""
+
+import os
+import sys
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
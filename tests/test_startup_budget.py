@@ -0,0 +1,33 @@
+"""
+    File: test_startup_budget.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Start Up Budget Tests
+
+    Fails when the app (`main.py`) imports one of the heavy libraries it must leave until a button needs them, or when
+    importing it takes longer than the start up budget, timed with `python -X importtime` in fresh interpreters.
+
+        Usage
+
+        - python -m pytest tests/test_startup_budget.py
+        - python Benchmark_Scan.py startup (the same check with the slowest imports listed)
+"""
+
+from Benchmark_Scan import STARTUP_BUDGET_MS, STARTUP_DEFERRED_MODULES, _import_times, benchmark_startup
+
+
+def test_main_defers_heavy_imports():
+    imported = {name.split('.')[0] for name, _, _, _ in _import_times("main")}
+    assert [name for name in STARTUP_DEFERRED_MODULES if name in imported] == []
+
+
+def test_main_within_budget():
+    result = benchmark_startup("main", runs=3)
+    assert result["import_ms"] <= STARTUP_BUDGET_MS, f"slowest imports: {result['slowest']}"
+
+
+def test_deferred_imports_are_detected():
+    # the scanner needs PyMuPDF straight away, so it shows the check would catch the app doing the same
+    assert "pymupdf" in benchmark_startup("Scan_Folder_Extract_Data", runs=1)["deferred_imported"]
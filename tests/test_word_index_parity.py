@@ -0,0 +1,75 @@
+"""
+    File: test_word_index_parity.py
+    Author: Aaron Fortner
+    Date: 10/17/2026
+    Version: 1.0
+
+    Word Index Parity Tests
+
+    Checks that the words mode gives the same fields as `get_textbox` on every filled in 1348 sample, including the
+    boxes that only partly cover a word and have to fall back to character level extraction.
+
+        Usage
+
+        - python -m pytest tests/test_word_index_parity.py
+"""
+
+import os
+import glob
+import pytest
+import pymupdf as pmu
+
+from conftest import REPO_ROOT
+from Form_Template import load_template
+from Word_Index import WordIndex, check_extraction_parity
+
+
+SAMPLE_PATHS = sorted(glob.glob(os.path.join(REPO_ROOT, "Documents", "1348_FILLED_OUT*.pdf")))
+TEMPLATE_PATH = os.path.join(REPO_ROOT, "Form Templates", "1348.json")
+
+
+def _partly_covered(word, rect) -> bool:
+    # Whether a box overlaps a word without holding it strictly inside, the case the word index falls back on
+    x0, y0, x1, y1 = word[:4]
+    overlaps = not (x0 >= rect.x1 or y0 >= rect.y1 or x1 <= rect.x0 or y1 <= rect.y0)
+    inside = x0 > rect.x0 and y0 > rect.y0 and x1 < rect.x1 and y1 < rect.y1
+    return overlaps and not inside
+
+
+@pytest.fixture(scope="module")
+def template():
+    return load_template(TEMPLATE_PATH)
+
+
+def test_samples_found():
+    assert SAMPLE_PATHS, "no Documents/1348_FILLED_OUT*.pdf samples"
+
+
+@pytest.mark.parametrize("pdf_path", SAMPLE_PATHS, ids=os.path.basename)
+def test_words_mode_matches_textbox(pdf_path, template):
+    assert check_extraction_parity([pdf_path], template) == []
+
+
+def test_samples_have_partly_covered_words(template):
+    # the template boxes cut through words on the samples, so the fallback above is exercised and not just assumed
+    partly = 0
+    for pdf_path in SAMPLE_PATHS:
+        with pmu.open(pdf_path) as doc:
+            for page in doc:
+                words = page.get_text("words")
+                partly += sum(any(_partly_covered(word, field.rect) for word in words) for field in template.fields)
+    assert partly > 0
+
+
+@pytest.mark.parametrize("pdf_path", SAMPLE_PATHS, ids=os.path.basename)
+def test_partly_covered_words_match_textbox(pdf_path):
+    # a box over the left half of each word, and one over its top half, only hold part of its characters
+    with pmu.open(pdf_path) as doc:
+        for page in doc:
+            index = WordIndex(page)
+            for word in index.words:
+                x0, y0, x1, y1 = word[:4]
+                for rect in (pmu.Rect(x0 - 1, y0 - 1, (x0 + x1) / 2, y1 + 1),
+                             pmu.Rect(x0 - 1, y0 - 1, x1 + 1, (y0 + y1) / 2)):
+                    assert index.get_textbox(rect) == page.get_textbox(rect, textpage=index.textpage), \
+                        f"page {page.number + 1} word {word[4]!r} box {rect}"